@@ -26,10 +26,35 @@ class Settings(BaseSettings):
     PARSER_TIMEOUT: int = 60
     PARSER_MAX_PAGES: int = 2
     
+    # Cian crawl plan: регионы × типы сделок × группы комнат
+    CIAN_REGIONS: str = "Москва"  # Названия из cianparser.list_locations() через запятую
+    CIAN_DEAL_TYPES: str = "sale,rent_long"
+    CIAN_ROOM_GROUPS: str = "1,2,3,4,5,6,studio"  # Группы через ";", например "1,2;3,4;5,6,studio"
+    CIAN_CRAWL_WORKERS: int = 1  # Сколько браузеров обрабатывают шарды параллельно
+    
+    # Cian: загородная недвижимость и новостройки (отдельные ленты со своим расписанием)
+    CIAN_SUBURBAN_TYPES: str = "house,townhouse,land-plot"
+    CIAN_SUBURBAN_DEAL_TYPES: str = "sale,rent_long"
+    CIAN_SUBURBAN_INTERVAL_MINUTES: int = 60
+    CIAN_SUBURBAN_MAX_PAGES: int = 1
+    CIAN_NEWOBJECTS_INTERVAL_MINUTES: int = 360
+    CIAN_NEWOBJECTS_MAX_PAGES: int = 1
+    
+    # Cian Proxy
+    CIAN_PROXIES: str = ""  # Через запятую, без авторизации: "ip:port,ip:port"
+    
     # Avito Proxy
     AVITO_PROXY: str = ""  # Format: "login:password@ip:port"
     AVITO_PROXY_CHANGE_URL: str = ""  # URL to change IP
     
+    # Кэш фотографий объявлений на диске (ZIP и /listings/{id}/images/{n})
+    IMAGE_CACHE_DIR: str = "image_cache"
+    IMAGE_CACHE_MAX_MB: int = 2048
+    IMAGE_CACHE_MAX_IMAGE_MB: int = 20  # Фото больше лимита не скачиваются
+    
+    # История изменений объявлений: записи старше стольких полных месяцев уходят в архив
+    HISTORY_RETENTION_MONTHS: int = 6
+    
     # Logging
     LOG_LEVEL: str = "INFO"
 
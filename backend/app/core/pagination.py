@@ -0,0 +1,66 @@
+"""
+Keyset-пагинация (курсор) по (created_at DESC, id DESC)
+
+Курсор - непрозрачная для клиента строка с created_at и id последней строки
+страницы. Следующая страница выбирается условием
+created_at < c OR (created_at = c AND id < id_c) по составному индексу,
+поэтому ее стоимость не зависит от глубины прокрутки (в отличие от OFFSET).
+"""
+
+import base64
+import json
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import and_, or_
+
+
+def encode_cursor(created_at: datetime, item_id: str) -> str:
+    payload = json.dumps([created_at.isoformat(), item_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, item_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(created_at), str(item_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def order_by_newest(query, created_at_column, id_column):
+    """Стабильный порядок страниц: сначала новые, при равном created_at - по id"""
+    return query.order_by(created_at_column.desc(), id_column.desc())
+
+
+def apply_cursor(query, created_at_column, id_column, cursor: Optional[str]):
+    """Строки после курсора в порядке order_by_newest"""
+    if not cursor:
+        return query
+    created_at, item_id = decode_cursor(cursor)
+    return query.filter(or_(
+        created_at_column < created_at,
+        and_(created_at_column == created_at, id_column < item_id),
+    ))
+
+
+def fetch_page(query, per_page: int, page: int = 1, cursor: Optional[str] = None,
+               created_at_attr: str = "created_at", id_attr: str = "id") -> Tuple[List, Optional[str]]:
+    """Страница уже упорядоченного запроса и курсор следующей страницы (None, если страница последняя)
+
+    С курсором страница берется keyset-условием (его должен наложить apply_cursor), без курсора -
+    через OFFSET по номеру страницы (старый режим). Читается на одну строку больше, чтобы понять,
+    есть ли следующая страница, без отдельного запроса.
+    """
+    if not cursor:
+        query = query.offset((page - 1) * per_page)
+    rows = query.limit(per_page + 1).all()
+
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        last = rows[-1]
+        next_cursor = encode_cursor(getattr(last, created_at_attr), getattr(last, id_attr))
+    return rows, next_cursor
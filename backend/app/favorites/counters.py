@@ -0,0 +1,89 @@
+"""
+Счетчики новых (is_new) избранных объявлений пользователя
+
+Раньше после каждого добавления/удаления в избранное считался count() по
+favorites. Теперь счетчик хранится в Redis (ключ favorites_new:{user_id}):
+- при чтении пустой ключ считается одним запросом и кэшируется (SET NX);
+- добавление и удаление меняют его атомарно (INCRBY/DECRBY), только если ключ уже есть;
+- просмотр избранного обнуляет счетчик.
+Если Redis недоступен, значение считается запросом к БД.
+"""
+
+import logging
+
+import redis
+from sqlalchemy.orm import Session
+
+from app.favorites.models import Favorite
+from app.services.redis_service import redis_client
+
+logger = logging.getLogger(__name__)
+
+NEW_COUNT_KEY_PREFIX = "favorites_new"
+# Страховка от пропущенного обновления: счетчик все равно пересчитается раз в NEW_COUNT_TTL_SECONDS
+NEW_COUNT_TTL_SECONDS = 24 * 3600
+
+
+def _key(user_id: str) -> str:
+    return f"{NEW_COUNT_KEY_PREFIX}:{user_id}"
+
+
+def _count_new(db: Session, user_id: str) -> int:
+    return db.query(Favorite).filter(Favorite.user_id == user_id, Favorite.is_new == True).count()
+
+
+def get_new_count(db: Session, user_id: str) -> int:
+    """Количество новых объявлений в избранном пользователя"""
+    key = _key(user_id)
+    try:
+        cached = redis_client.get(key)
+    except redis.exceptions.RedisError as e:
+        logger.warning(f"⚠️ Счетчик избранного {key} недоступен в Redis: {e}")
+        return _count_new(db, user_id)
+    if cached is not None:
+        return max(int(cached), 0)
+
+    count = _count_new(db, user_id)
+    try:
+        # NX: пока считали, счетчик мог завести параллельный запрос
+        if not redis_client.set(key, count, ex=NEW_COUNT_TTL_SECONDS, nx=True):
+            return max(int(redis_client.get(key) or count), 0)
+    except redis.exceptions.RedisError as e:
+        logger.warning(f"⚠️ Не удалось сохранить счетчик избранного {key}: {e}")
+    return count
+
+
+def change_new_count(user_id: str, delta: int):
+    """Меняет уже посчитанный счетчик на delta (WATCH: ключ не должен истечь между проверкой и INCRBY)"""
+    if not delta:
+        return
+    key = _key(user_id)
+
+    def update(pipe):
+        exists = pipe.exists(key)
+        pipe.multi()
+        if exists:
+            pipe.incrby(key, delta)
+
+    try:
+        redis_client.transaction(update, key)
+    except redis.exceptions.RedisError as e:
+        logger.warning(f"⚠️ Не удалось обновить счетчик избранного {key}, сбрасываем: {e}")
+        invalidate_new_count(user_id)
+
+
+def clear_new_count(user_id: str):
+    """Все избранное просмотрено - счетчик 0"""
+    key = _key(user_id)
+    try:
+        redis_client.set(key, 0, ex=NEW_COUNT_TTL_SECONDS)
+    except redis.exceptions.RedisError as e:
+        logger.warning(f"⚠️ Не удалось обнулить счетчик избранного {key}, сбрасываем: {e}")
+        invalidate_new_count(user_id)
+
+
+def invalidate_new_count(user_id: str):
+    try:
+        redis_client.delete(_key(user_id))
+    except redis.exceptions.RedisError as e:
+        logger.warning(f"⚠️ Не удалось сбросить счетчик избранного {_key(user_id)}: {e}")
@@ -1,18 +1,34 @@
 import uuid
-from sqlalchemy import Column, String, DateTime, ForeignKey, Boolean, Text
+from sqlalchemy import Column, String, DateTime, Float, Boolean, Text, Index
 from datetime import datetime
 from app.db import Base
 from pydantic import BaseModel
 
 class Favorite(Base):
     __tablename__ = "favorites"
+    __table_args__ = (
+        # Проверка дубля при добавлении в избранное
+        Index('idx_favorites_user_listing', 'user_id', 'listing_id'),
+        # Страница избранного: ORDER BY listing_created_at DESC, listing_id DESC
+        Index('idx_favorites_user_created_at', 'user_id', 'listing_created_at', 'listing_id'),
+    )
 
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()), unique=True, index=True)
     created_at = Column(DateTime, default=datetime.utcnow)
-    listing_id = Column(String, ForeignKey("listings.id"), nullable=False)
+    # Без внешнего ключа: объявление может быть удалено из listings, избранное отдается из снимка
+    listing_id = Column(String, nullable=False)
     user_id = Column(String, nullable=True)
     is_new = Column(Boolean, default=True, nullable=False)
     listing_snapshot = Column(Text, nullable=True)  # JSON снимок данных листинга
+    # Поля снимка для фильтров и сортировки (см. favorite_snapshot_fields).
+    # listing_created_at - ключ курсора страницы избранного, поэтому не NULL: без даты объявления - дата добавления
+    listing_created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    deal_type = Column(String, nullable=True)
+    price = Column(Float, nullable=True)
+    total_meters = Column(Float, nullable=True)
+    source = Column(String, nullable=True)
+    rooms_count = Column(Float, nullable=True)
+    home_type = Column(String, nullable=True)
 
 class FavoriteRequest(BaseModel):
     listing_id: str
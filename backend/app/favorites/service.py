@@ -1,9 +1,15 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import or_
-from rapidfuzz import fuzz
+from sqlalchemy import Row, exists, func, select
 from app.parsers.models import Listing, ListingFilters, ListingStats
 from app.favorites.models import Favorite
-from typing import List, Tuple
+from app.listings.filters import FilterPlan, compile_filters, FAVORITE_COLUMNS
+from app.core.pagination import apply_cursor, fetch_page, order_by_newest
+from app.listings.stats import get_listing_stats, get_favorite_stats, raise_favorite_stats, invalidate_favorite_stats
+from app.listings.counts import count_listings, bump_favorites_version
+from app.favorites.counters import change_new_count, clear_new_count
+from app.listings.page_cache import cached_listing_page
+from typing import Iterable, List, Optional, Tuple, Union
+import json
 
 def round_up_price(price: float) -> int:
     """Округлить цену вверх до 100,000"""
@@ -17,163 +23,252 @@ def round_up_meters(meters: float) -> int:
         return 0
     return int((meters // 10 + 1) * 10)
 
-def apply_listing_filters(query, deal_type=None, source=None, rooms_count=None, 
-                         min_price=None, max_price=None, min_meters=None, 
-                         max_meters=None, search=None, status=None, responsible=None, 
-                         company_id=None, db=None):
-    """Универсальная функция для применения фильтров к запросу listings"""
-    from app.listings.models import ListingMetadata
-    
-    if deal_type:
-        query = query.filter(Listing.deal_type == deal_type)
-    if source:
-        query = query.filter(Listing.source == source)
-    if min_price is not None:
-        query = query.filter(Listing.price >= min_price)
-    if max_price is not None:
-        query = query.filter(Listing.price <= max_price)
-    if min_meters is not None:
-        query = query.filter(Listing.total_meters >= min_meters)
-    if max_meters is not None:
-        query = query.filter(Listing.total_meters <= max_meters)
-    if rooms_count:
-        rooms_parts = [r.strip() for r in rooms_count.split(',')]
-        rooms_list = [int(r) for r in rooms_parts if r.isdigit() and int(r) <= 6]
-        has_studio = 'studio' in rooms_parts
-        
-        if rooms_list or has_studio:
-            conditions = []
-            if rooms_list:
-                conditions.append(Listing.rooms_count.in_(rooms_list))
-            if has_studio:
-                conditions.append(Listing.home_type == 'studio')
-            query = query.filter(or_(*conditions))
-    if search:
-        all_listings = query.all()
-        search_words = search.lower().split()
-        
-        filtered_ids = []
-        for listing in all_listings:
-            location_words = listing.location.lower().split()
-            for search_word in search_words:
-                for location_word in location_words:
-                    if fuzz.partial_ratio(search_word, location_word) >= 80:
-                        filtered_ids.append(listing.id)
-                        break
-                else:
-                    continue
-                break
-        
-        if filtered_ids:
-            query = query.filter(Listing.id.in_(filtered_ids))
-        else:
-            query = query.filter(Listing.id == None)
-    
-    # Фильтры по метаданным (используем JOIN для производительности)
-    if (status or responsible or company_id) and company_id and db:
-        query = query.outerjoin(
-            ListingMetadata,
-            (Listing.id == ListingMetadata.listing_id) & 
-            (ListingMetadata.company_id == company_id)
-        )
-        
-        if status:
-            query = query.filter(
-                (ListingMetadata.status == status) | 
-                ((ListingMetadata.status == None) & (status == 'new'))
-            )
-        
-        if responsible:
-            query = query.filter(ListingMetadata.responsible_user_id == responsible)
-    
-    return query
+# Колонки Listing, которые отдает ListingResponse
+LISTING_PAGE_COLUMNS = (
+    Listing.id, Listing.created_at, Listing.deal_type, Listing.price, Listing.total_meters, Listing.floor,
+    Listing.location, Listing.source, Listing.url, Listing.phone_number, Listing.rooms_count,
+    Listing.home_type, Listing.is_favorite, Listing.images,
+)
 
-def get_paginated_listings(db: Session, page: int, per_page: int = 10, **filters) -> Tuple[List[Listing], int, int, ListingFilters, ListingStats]:
-    """Получает пагинированные listings с фильтрами и статистикой"""
-    skip = (page - 1) * per_page
-    
-    query = db.query(Listing)
-    query = apply_listing_filters(query, db=db, **filters)
-    
-    total = query.count()
-    listings = query.offset(skip).limit(per_page).all()
-    total_pages = (total + per_page - 1) // per_page
-    
+def _with_company_metadata(db: Session, columns, company_id: Optional[str], listing_id=None):
+    """Запрос columns + ответственный и статус компании (LEFT JOIN) и флаг аренды (EXISTS)
 
+    listing_id - колонка id объявления, по которой присоединяются метаданные (по умолчанию Listing.id)
+    """
+    from app.listings.models import ListingMetadata
+    from app.rent.models import RentListing
     
-    # Общая статистика по всем listings (без фильтров)
-    max_price_listing = db.query(Listing).filter(Listing.price.isnot(None)).order_by(Listing.price.desc()).first()
-    max_meters_listing = db.query(Listing).filter(Listing.total_meters.isnot(None)).order_by(Listing.total_meters.desc()).first()
-    
-    current_filters = ListingFilters(
-        deal_type=filters.get('deal_type'),
-        source=filters.get('source'),
-        rooms_count=[r.strip() for r in filters.get('rooms_count', '').split(',') if r.strip().isdigit() or r.strip() == 'studio'] if filters.get('rooms_count') else None,
-        min_price=filters.get('min_price'),
-        max_price=filters.get('max_price'),
-        min_meters=filters.get('min_meters'),
-        max_meters=filters.get('max_meters'),
-        search=filters.get('search')
+    if listing_id is None:
+        listing_id = Listing.id
+    is_in_rent = exists().where(RentListing.listing_id == listing_id, RentListing.company_id == company_id)
+    return db.query(
+        *columns,
+        ListingMetadata.responsible_user_id.label("responsible"),
+        func.coalesce(ListingMetadata.status, "new").label("status"),
+        is_in_rent.label("is_in_rent"),
+    ).outerjoin(
+        ListingMetadata,
+        (listing_id == ListingMetadata.listing_id) & (ListingMetadata.company_id == company_id)
     )
+
+def listing_page_query(db: Session, company_id: Optional[str]):
+    """Запрос строк страницы: колонки ListingResponse, метаданные компании (LEFT JOIN) и флаг аренды (EXISTS)
+
+    Страница собирается одним запросом без загрузки ORM-объектов в identity map
+    """
+    return _with_company_metadata(db, LISTING_PAGE_COLUMNS, company_id)
+
+def overlay_company_metadata(db: Session, items: List[dict], company_id: Optional[str]) -> List[dict]:
+    """Дописывает к общим для всех компаний элементам страницы responsible, status и is_in_rent компании"""
+    if not items:
+        return items
+    rows = _with_company_metadata(db, (Listing.id,), company_id).filter(
+        Listing.id.in_([item['id'] for item in items])
+    ).all()
+    overlay = {row.id: row for row in rows}
+    for item in items:
+        row = overlay.get(item['id'])
+        item['responsible'] = row.responsible if row else None
+        item['status'] = row.status if row else "new"
+        item['is_in_rent'] = bool(row.is_in_rent) if row else False
+    return items
+
+def _fetch_listing_page(db: Session, plan: FilterPlan, page: int, per_page: int, cursor: Optional[str]):
+    """Строки страницы (см. listing_page_query) и курсор следующей"""
+    query = plan.apply(listing_page_query(db, plan.company_id), metadata_joined=True)
+    query = order_by_newest(apply_cursor(query, Listing.created_at, Listing.id, cursor), Listing.created_at, Listing.id)
+    return fetch_page(query, per_page, page, cursor)
+
+def _fetch_shared_listing_page(db: Session, plan: FilterPlan, filters: dict, page: int, per_page: int,
+                               cursor: Optional[str]):
+    """Страница без фильтров по метаданным: общая для всех компаний часть из кэша (см. page_cache.py)
+    и метаданные компании поверх нее"""
+    shared_filters = {k: v for k, v in filters.items() if k != 'company_id'}
     
-    max_price = max_price_listing.price if max_price_listing else None
-    rounded_max_price = round_up_price(max_price) if max_price else None
-    
-    max_meters = max_meters_listing.total_meters if max_meters_listing else None
-    rounded_max_meters = round_up_meters(max_meters) if max_meters else None
+    def load():
+        query = plan.apply(db.query(*LISTING_PAGE_COLUMNS))
+        query = order_by_newest(apply_cursor(query, Listing.created_at, Listing.id, cursor), Listing.created_at, Listing.id)
+        rows, next_cursor = fetch_page(query, per_page, page, cursor)
+        return [dict(row._mapping) for row in rows], next_cursor
     
-    stats = ListingStats(
-        max_price=rounded_max_price,
-        max_meters=rounded_max_meters
+    items, next_cursor = cached_listing_page(shared_filters, page, per_page, cursor, load)
+    return overlay_company_metadata(db, items, plan.company_id), next_cursor
+
+def _listing_stats(max_price: Optional[float], max_meters: Optional[float]) -> ListingStats:
+    """Статистика для слайдеров, округленная вверх"""
+    return ListingStats(
+        max_price=round_up_price(max_price) if max_price else None,
+        max_meters=round_up_meters(max_meters) if max_meters else None
     )
-    
-    return listings, total, total_pages, current_filters, stats
 
-def get_favorite_listings(db: Session, user_id: str, page: int, per_page: int = 10, **filters):
-    """Получает пагинированные фавориты с фильтрами для конкретного пользователя"""
-    skip = (page - 1) * per_page
-    
-    # Получаем ID избранных объявлений для конкретного пользователя
-    favorite_ids = db.query(Favorite.listing_id).filter(Favorite.user_id == user_id).all()
-    favorite_listing_ids = [fav.listing_id for fav in favorite_ids]
-    
-    if not favorite_listing_ids:
-        return [], 0, 0, ListingFilters(**filters), ListingStats(max_price=None, max_meters=None)
-    
-    # Применяем фильтры к избранным объявлениям
-    query = db.query(Listing).filter(Listing.id.in_(favorite_listing_ids))
-    query = apply_listing_filters(query, db=db, **filters)
-    
-    total = query.count()
-    listings = query.offset(skip).limit(per_page).all()
+def get_paginated_listings(db: Session, page: int, per_page: int = 10, cursor: Optional[str] = None,
+                           count_mode: str = "exact",
+                           **filters) -> Tuple[List[Union[Row, dict]], int, int, ListingFilters, ListingStats, Optional[str], bool]:
+    """Получает пагинированные listings с фильтрами и статистикой
+
+    Страницы упорядочены по (created_at DESC, id DESC). С cursor страница выбирается
+    keyset-условием, без него - по номеру page; в обоих случаях возвращается курсор следующей страницы.
+    Элементы - строки listing_page_query (или словари с теми же ключами из общего кэша страниц)
+    с уже заполненными responsible, status и is_in_rent.
+    total берется из кэша количества, с count_mode="estimate" - из оценки планировщика (последний элемент - признак оценки)
+    """
+    plan = compile_filters(**filters)
+    total, total_is_estimate = count_listings(plan.apply(db.query(Listing.id)), filters, mode=count_mode)
+    if plan.uses_metadata:
+        listings, next_cursor = _fetch_listing_page(db, plan, page, per_page, cursor)
+    else:
+        listings, next_cursor = _fetch_shared_listing_page(db, plan, filters, page, per_page, cursor)
     total_pages = (total + per_page - 1) // per_page
     
+    # Общая статистика по всем listings (без фильтров), из кэша
+    stats = _listing_stats(*get_listing_stats(db))
+    return listings, total, total_pages, plan.response_filters(), stats, next_cursor, total_is_estimate
 
+# Поля объявления, которые хранятся в колонках Favorite (фильтры и сортировка страницы избранного)
+FAVORITE_SNAPSHOT_COLUMNS = ("deal_type", "price", "total_meters", "source", "rooms_count", "home_type")
+
+def favorite_snapshot_fields(listing: Listing) -> dict:
+    """Снимок объявления для Favorite: JSON со всеми полями карточки и колонки для фильтров"""
+    snapshot = json.dumps({
+        "deal_type": listing.deal_type,
+        "price": listing.price,
+        "total_meters": listing.total_meters,
+        "floor": listing.floor,
+        "location": listing.location,
+        "source": listing.source,
+        "url": listing.url,
+        "phone_number": listing.phone_number,
+        "rooms_count": listing.rooms_count,
+        "home_type": listing.home_type,
+        "images": listing.images,
+        "created_at": listing.created_at.isoformat() if listing.created_at else None
+    }, ensure_ascii=False)
+    fields = {name: getattr(listing, name) for name in FAVORITE_SNAPSHOT_COLUMNS}
+    if listing.created_at is not None:
+        fields["listing_created_at"] = listing.created_at
+    return {"listing_snapshot": snapshot, **fields}
+
+def refresh_favorite_snapshots(db: Session, listings_query) -> int:
+    """Обновляет снимки избранного по текущим данным объявлений из listings_query (запрос по Listing)
+
+    Вызывается перед удалением объявлений из listings, чтобы в избранном остались последние данные.
+    Возвращает число обновленных записей избранного
+    """
+    refreshed = 0
+    favorited = listings_query.filter(Listing.id.in_(select(Favorite.listing_id)))
+    for listing in favorited.yield_per(500):
+        refreshed += db.query(Favorite).filter(Favorite.listing_id == listing.id).update(
+            favorite_snapshot_fields(listing), synchronize_session=False
+        )
+    return refreshed
+
+# Максимум объявлений в одном сообщении add_many / remove_many
+FAVORITES_BATCH_LIMIT = 500
+
+def add_favorites(db: Session, user_id: str, listing_ids: Iterable[str]) -> Tuple[List[str], List[str]]:
+    """Добавляет объявления в избранное одной транзакцией: (добавленные, уже бывшие в избранном)
+
+    Снимок берется из listings; счетчик новых, статистика и версия количества обновляются после коммита
+    """
+    listing_ids = list(dict.fromkeys(listing_ids))
+    existing = {row.listing_id for row in db.query(Favorite.listing_id).filter(
+        Favorite.user_id == user_id, Favorite.listing_id.in_(listing_ids)
+    )}
+    added = [listing_id for listing_id in listing_ids if listing_id not in existing]
+    if not added:
+        return [], list(existing)
     
-    # Общая статистика по всем фаворитам (без дополнительных фильтров)
-    max_price_listing = db.query(Listing).filter(Listing.id.in_(favorite_listing_ids), Listing.price.isnot(None)).order_by(Listing.price.desc()).first()
-    max_meters_listing = db.query(Listing).filter(Listing.id.in_(favorite_listing_ids), Listing.total_meters.isnot(None)).order_by(Listing.total_meters.desc()).first()
-    
-    current_filters = ListingFilters(
-        deal_type=filters.get('deal_type'),
-        source=filters.get('source'),
-        rooms_count=[r.strip() for r in filters.get('rooms_count', '').split(',') if r.strip().isdigit() or r.strip() == 'studio'] if filters.get('rooms_count') else None,
-        min_price=filters.get('min_price'),
-        max_price=filters.get('max_price'),
-        min_meters=filters.get('min_meters'),
-        max_meters=filters.get('max_meters'),
-        search=filters.get('search')
-    )
+    listings = {listing.id: listing for listing in db.query(Listing).filter(Listing.id.in_(added))}
+    for listing_id in added:
+        listing = listings.get(listing_id)
+        snapshot = favorite_snapshot_fields(listing) if listing else {}
+        db.add(Favorite(listing_id=listing_id, user_id=user_id, **snapshot))
+    db.commit()
     
-    max_price = max_price_listing.price if max_price_listing else None
-    rounded_max_price = round_up_price(max_price) if max_price else None
+    for listing in listings.values():
+        raise_favorite_stats(user_id, listing)
+    bump_favorites_version(user_id)
+    change_new_count(user_id, len(added))
+    return added, [listing_id for listing_id in listing_ids if listing_id in existing]
+
+def remove_favorites(db: Session, user_id: str, listing_ids: Iterable[str]) -> Tuple[List[str], List[str]]:
+    """Удаляет объявления из избранного одной транзакцией: (удаленные, не найденные в избранном)"""
+    listing_ids = list(dict.fromkeys(listing_ids))
+    favorites = db.query(Favorite.id, Favorite.listing_id, Favorite.is_new).filter(
+        Favorite.user_id == user_id, Favorite.listing_id.in_(listing_ids)
+    ).all()
+    if not favorites:
+        return [], listing_ids
     
-    max_meters = max_meters_listing.total_meters if max_meters_listing else None
-    rounded_max_meters = round_up_meters(max_meters) if max_meters else None
+    db.query(Favorite).filter(Favorite.id.in_([favorite.id for favorite in favorites])).delete(synchronize_session=False)
+    db.commit()
     
-    stats = ListingStats(
-        max_price=rounded_max_price,
-        max_meters=rounded_max_meters
+    removed = {favorite.listing_id for favorite in favorites}
+    invalidate_favorite_stats(user_id)
+    bump_favorites_version(user_id)
+    change_new_count(user_id, -sum(1 for favorite in favorites if favorite.is_new))
+    return ([listing_id for listing_id in listing_ids if listing_id in removed],
+            [listing_id for listing_id in listing_ids if listing_id not in removed])
+
+def mark_favorites_viewed(db: Session, user_id: str):
+    """Снимает признак is_new со всего избранного пользователя"""
+    db.query(Favorite).filter(Favorite.user_id == user_id, Favorite.is_new == True).update({"is_new": False})
+    db.commit()
+    clear_new_count(user_id)
+
+def _favorite_item(row) -> dict:
+    """Строка страницы избранного -> элемент в формате ListingResponse (как строки listing_page_query)"""
+    snapshot = json.loads(row.listing_snapshot)
+    return {
+        "id": row.id,
+        "created_at": row.created_at,
+        "deal_type": row.deal_type,
+        "price": row.price,
+        "total_meters": row.total_meters,
+        "floor": snapshot.get("floor"),
+        "location": snapshot.get("location"),
+        "source": row.source,
+        "url": snapshot.get("url"),
+        "phone_number": snapshot.get("phone_number"),
+        "rooms_count": row.rooms_count,
+        "home_type": row.home_type,
+        "is_favorite": True,
+        "images": snapshot.get("images"),
+        "responsible": row.responsible,
+        "status": row.status,
+        "is_in_rent": row.is_in_rent,
+    }
+
+def _fetch_favorite_page(db: Session, user_id: str, plan: FilterPlan, page: int, per_page: int, cursor: Optional[str]):
+    """Страница избранного из снимков (без чтения listings) и курсор следующей"""
+    query = _with_company_metadata(db, (
+        Favorite.listing_id.label("id"), Favorite.listing_created_at.label("created_at"),
+        Favorite.listing_snapshot, *[getattr(Favorite, name) for name in FAVORITE_SNAPSHOT_COLUMNS],
+    ), plan.company_id, listing_id=Favorite.listing_id).filter(
+        Favorite.user_id == user_id, Favorite.listing_snapshot.isnot(None)
     )
+    query = plan.apply(query, FAVORITE_COLUMNS, metadata_joined=True)
+    query = apply_cursor(query, Favorite.listing_created_at, Favorite.listing_id, cursor)
+    query = order_by_newest(query, Favorite.listing_created_at, Favorite.listing_id)
+    rows, next_cursor = fetch_page(query, per_page, page, cursor)
+    return [_favorite_item(row) for row in rows], next_cursor
+
+def get_favorite_listings(db: Session, user_id: str, page: int, per_page: int = 10, cursor: Optional[str] = None,
+                          **filters):
+    """Получает пагинированные фавориты с фильтрами для конкретного пользователя (порядок и cursor - как в get_paginated_listings)
+
+    Избранное отдается из снимков в favorites (см. favorite_snapshot_fields), поэтому
+    объявления из избранного могут удаляться из listings при очистке старых
+    """
+    plan = compile_filters(**filters)
+    count_query = plan.apply(
+        db.query(Favorite.listing_id).filter(Favorite.user_id == user_id, Favorite.listing_snapshot.isnot(None)),
+        FAVORITE_COLUMNS,
+    )
+    total, _ = count_listings(count_query, filters, user_id=user_id)
+    listings, next_cursor = _fetch_favorite_page(db, user_id, plan, page, per_page, cursor)
+    total_pages = (total + per_page - 1) // per_page
     
-    return listings, total, total_pages, current_filters, stats
\ No newline at end of file
+    # Общая статистика по всем фаворитам (без дополнительных фильтров), из кэша
+    stats = _listing_stats(*get_favorite_stats(db, user_id))
+    return listings, total, total_pages, plan.response_filters(), stats, next_cursor, False
@@ -0,0 +1,149 @@
+"""
+Кэш общего числа объявлений для пагинации
+
+query.count() по отфильтрованному запросу (с поиском и JOIN на метаданные)
+стоит столько же, сколько сама страница. Результат кэшируется в Redis по
+нормализованному набору фильтров и версиям данных, от которых он зависит:
+- listings - растет при сохранении новых объявлений парсером и при удалении объявлений;
+- metadata:<company_id> - при смене статуса или ответственного (только для фильтров status/responsible);
+- favorites:<user_id> - при изменении избранного пользователя.
+Новая версия меняет ключ, поэтому старые значения просто истекают по TTL.
+
+В режиме estimate на PostgreSQL число строк берется из оценки планировщика
+(EXPLAIN без выполнения запроса); на других СУБД используется точный кэшированный count.
+"""
+
+import hashlib
+import json
+import logging
+from typing import Dict, List, Optional, Tuple
+
+import redis
+
+from app.services.redis_service import redis_client
+
+logger = logging.getLogger(__name__)
+
+COUNT_KEY_PREFIX = "listing_count"
+VERSION_KEY_PREFIX = "listing_version"
+COUNT_TTL_SECONDS = 600
+# Фильтры, для которых число зависит от метаданных компании
+METADATA_FILTERS = ("status", "responsible")
+
+
+def _bump_version(scope: str):
+    try:
+        redis_client.incr(f"{VERSION_KEY_PREFIX}:{scope}")
+    except redis.exceptions.RedisError as e:
+        logger.warning(f"⚠️ Не удалось обновить версию {scope}: {e}")
+
+
+def bump_listings_version():
+    """Вызывать после сохранения или удаления объявлений"""
+    _bump_version("listings")
+
+
+def bump_metadata_version(company_id: str):
+    """Вызывать после смены статуса или ответственного в компании"""
+    _bump_version(f"metadata:{company_id}")
+
+
+def bump_favorites_version(user_id: str):
+    _bump_version(f"favorites:{user_id}")
+
+
+def count_scopes(filters: Dict, user_id: Optional[str] = None) -> List[str]:
+    """Версии данных, от которых зависит число объявлений с такими фильтрами"""
+    scopes = ["listings"]
+    if any(filters.get(name) for name in METADATA_FILTERS) and filters.get("company_id"):
+        scopes.append(f"metadata:{filters['company_id']}")
+    if user_id:
+        scopes.append(f"favorites:{user_id}")
+    return scopes
+
+
+def normalize_filters(filters: Dict) -> str:
+    """Одинаковые по смыслу наборы фильтров дают одну строку (без пустых значений, порядка комнат и регистра поиска)"""
+    normalized = {}
+    for name, value in filters.items():
+        if value is None or value == "":
+            continue
+        if name == "rooms_count":
+            value = ",".join(sorted({part.strip() for part in str(value).split(",") if part.strip()}))
+        elif name == "search":
+            value = " ".join(str(value).lower().split())
+        elif isinstance(value, float) and value.is_integer():
+            value = int(value)
+        normalized[name] = value
+    # company_id влияет на число только вместе с фильтрами по метаданным - иначе кэш общий для всех компаний
+    if not any(normalized.get(name) for name in METADATA_FILTERS):
+        normalized.pop("company_id", None)
+    return json.dumps(normalized, sort_keys=True, ensure_ascii=False, default=str)
+
+
+def get_data_version(scopes: List[str]) -> str:
+    """Текущие версии данных одной строкой для ключа кэша (RedisError пробрасывается)"""
+    versions = redis_client.mget([f"{VERSION_KEY_PREFIX}:{scope}" for scope in scopes])
+    return ".".join(v or "0" for v in versions)
+
+
+def filters_digest(filters: Dict) -> str:
+    return hashlib.sha1(normalize_filters(filters).encode()).hexdigest()
+
+
+def cached_count(query, filters: Dict, user_id: Optional[str] = None) -> int:
+    """query.count() из кэша, если данные с тех пор не менялись"""
+    scopes = count_scopes(filters, user_id)
+    try:
+        version = get_data_version(scopes)
+    except redis.exceptions.RedisError as e:
+        logger.warning(f"⚠️ Кэш количества недоступен: {e}")
+        return query.count()
+
+    key = f"{COUNT_KEY_PREFIX}:{':'.join(scopes)}:{version}:{filters_digest(filters)}"
+
+    try:
+        cached = redis_client.get(key)
+        if cached is not None:
+            return int(cached)
+    except redis.exceptions.RedisError as e:
+        logger.warning(f"⚠️ Кэш количества недоступен: {e}")
+        return query.count()
+
+    total = query.count()
+    try:
+        redis_client.setex(key, COUNT_TTL_SECONDS, total)
+    except redis.exceptions.RedisError as e:
+        logger.warning(f"⚠️ Не удалось сохранить количество: {e}")
+    return total
+
+
+def estimate_count(query) -> Optional[int]:
+    """Оценка числа строк планировщиком PostgreSQL. None, если СУБД другая или оценка не удалась"""
+    bind = query.session.get_bind()
+    if bind.dialect.name != "postgresql":
+        return None
+
+    compiled = query.statement.compile(dialect=bind.dialect, compile_kwargs={"render_postcompile": True})
+    try:
+        # Отдельное соединение: ошибка EXPLAIN не должна прерывать транзакцию запроса страницы
+        with bind.connect() as connection:
+            plan = connection.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled}", compiled.params).scalar()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]["Plan"]["Plan Rows"])
+    except Exception as e:
+        logger.warning(f"⚠️ Не удалось получить оценку количества: {e}")
+        return None
+
+
+def count_listings(query, filters: Dict, user_id: Optional[str] = None, mode: str = "exact") -> Tuple[int, bool]:
+    """Число объявлений для пагинации и признак того, что это оценка
+
+    mode="estimate" - оценка планировщика (PostgreSQL), иначе точное число из кэша
+    """
+    if mode == "estimate":
+        estimate = estimate_count(query)
+        if estimate is not None:
+            return estimate, True
+    return cached_count(query, filters, user_id), False
@@ -0,0 +1,224 @@
+"""
+Фасеты для фильтров ленты: количество объявлений по типу сделки, источнику,
+комнатам и гистограммы цены и площади
+
+Считать их запросом на каждый вызов - полное чтение listings. Вместо этого
+счетчики хранятся в одном хэше Redis (поле "<тип сделки>|<фасет>:<корзина>",
+тип сделки "*" - все объявления):
+- при чтении пустой ключ строится одним GROUP BY по таблице и кэшируется;
+- новые объявления парсера увеличивают счетчики (HINCRBY), удаленные - уменьшают,
+  если ключ уже построен;
+- ответ собирается из хэша за O(корзин), а не O(объявлений).
+Если Redis недоступен, фасеты считаются запросом к БД.
+"""
+
+import logging
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import redis
+from sqlalchemy import case, func
+from sqlalchemy.orm import Session
+
+from app.listings.filters import MAX_ROOMS
+from app.parsers.models import Listing
+from app.services.redis_service import redis_client
+
+logger = logging.getLogger(__name__)
+
+FACETS_KEY = "listing_facets"
+# Страховка от пропущенного обновления: ключ все равно перестроится раз в FACETS_TTL_SECONDS
+FACETS_TTL_SECONDS = 3600
+ALL_DEAL_TYPES = "*"
+
+# Нижние границы корзин гистограмм. Цены аренды и продажи отличаются на порядки,
+# поэтому шкала цены общая и почти логарифмическая
+PRICE_EDGES = (
+    0, 10_000, 20_000, 30_000, 50_000, 70_000, 100_000, 150_000, 200_000, 300_000, 500_000,
+    1_000_000, 2_000_000, 3_000_000, 5_000_000, 7_000_000, 10_000_000, 15_000_000,
+    20_000_000, 30_000_000, 50_000_000, 100_000_000,
+)
+METERS_EDGES = (0, 20, 30, 40, 50, 60, 80, 100, 150, 200)
+
+FacetRow = Tuple[Optional[str], Optional[str], Optional[float], Optional[str], Optional[float], Optional[float]]
+
+
+def _bucket(value: Optional[float], edges: Tuple) -> Optional[int]:
+    """Нижняя граница корзины для значения"""
+    if value is None or value < 0:
+        return None
+    bucket = edges[0]
+    for edge in edges:
+        if value < edge:
+            break
+        bucket = edge
+    return bucket
+
+
+def _bucket_expression(column, edges: Tuple):
+    """То же, что _bucket, но в SQL - для построения фасетов одним GROUP BY"""
+    return case(
+        *[(column >= edge, edge) for edge in reversed(edges)],
+        else_=None,
+    )
+
+
+def _listing_fields(deal_type, source, rooms_count, home_type, price_bucket, meters_bucket) -> List[str]:
+    """Поля хэша (без типа сделки), в которые попадает одно объявление"""
+    fields = ["total"]
+    if deal_type:
+        fields.append(f"deal_type:{deal_type}")
+    if source:
+        fields.append(f"source:{source}")
+    # Студия может одновременно считаться однокомнатной - как и в фильтре
+    if home_type == "studio":
+        fields.append("rooms:studio")
+    if rooms_count is not None and rooms_count == int(rooms_count) and 1 <= rooms_count <= MAX_ROOMS:
+        fields.append(f"rooms:{int(rooms_count)}")
+    if price_bucket is not None:
+        fields.append(f"price:{price_bucket}")
+    if meters_bucket is not None:
+        fields.append(f"meters:{meters_bucket}")
+    return fields
+
+
+def _add_counts(counts: Counter, row: FacetRow, amount: int):
+    deal_type = row[0]
+    for field in _listing_fields(*row):
+        counts[f"{ALL_DEAL_TYPES}|{field}"] += amount
+        if deal_type:
+            counts[f"{deal_type}|{field}"] += amount
+
+
+def compute_facets(db: Session) -> Dict[str, int]:
+    """Счетчики всех фасетов одним GROUP BY (корзины цены и площади считаются в БД)"""
+    price_bucket = _bucket_expression(Listing.price, PRICE_EDGES)
+    meters_bucket = _bucket_expression(Listing.total_meters, METERS_EDGES)
+    rows = db.query(
+        Listing.deal_type, Listing.source, Listing.rooms_count, Listing.home_type,
+        price_bucket, meters_bucket, func.count(),
+    ).group_by(
+        Listing.deal_type, Listing.source, Listing.rooms_count, Listing.home_type,
+        price_bucket, meters_bucket,
+    ).all()
+
+    counts = Counter()
+    for *row, amount in rows:
+        _add_counts(counts, tuple(row), amount)
+    return dict(counts)
+
+
+def _get_counts(db: Session) -> Dict[str, int]:
+    try:
+        cached = redis_client.hgetall(FACETS_KEY)
+    except redis.exceptions.RedisError as e:
+        logger.warning(f"⚠️ Фасеты недоступны в Redis: {e}")
+        return compute_facets(db)
+
+    if cached:
+        return {field: int(value) for field, value in cached.items()}
+
+    counts = compute_facets(db)
+    try:
+        pipe = redis_client.pipeline()
+        pipe.delete(FACETS_KEY)
+        # Пустая таблица - хэш с нулевым total, чтобы не пересчитывать на каждый запрос
+        pipe.hset(FACETS_KEY, mapping=counts or {f"{ALL_DEAL_TYPES}|total": 0})
+        pipe.expire(FACETS_KEY, FACETS_TTL_SECONDS)
+        pipe.execute()
+    except redis.exceptions.RedisError as e:
+        logger.warning(f"⚠️ Не удалось сохранить фасеты: {e}")
+    return counts
+
+
+def _histogram(counts: Dict[str, int], scope: str, name: str, edges: Tuple) -> List[Dict]:
+    histogram = []
+    for index, edge in enumerate(edges):
+        count = counts.get(f"{scope}|{name}:{edge}", 0)
+        if count > 0:
+            upper = edges[index + 1] if index + 1 < len(edges) else None
+            histogram.append({"min": edge, "max": upper, "count": count})
+    return histogram
+
+
+def _values(counts: Dict[str, int], scope: str, name: str) -> Dict[str, int]:
+    prefix = f"{scope}|{name}:"
+    return {
+        field[len(prefix):]: count for field, count in counts.items()
+        if field.startswith(prefix) and count > 0
+    }
+
+
+def get_facets(db: Session, deal_type: Optional[str] = None) -> Dict:
+    """Фасеты для фильтров; при заданном deal_type - внутри этого типа сделки
+
+    Счетчики по типу сделки всегда общие, чтобы переключатель показывал оба варианта
+    """
+    counts = _get_counts(db)
+    scope = deal_type or ALL_DEAL_TYPES
+    rooms = _values(counts, scope, "rooms")
+    return {
+        "total": counts.get(f"{scope}|total", 0),
+        "deal_type": _values(counts, ALL_DEAL_TYPES, "deal_type"),
+        "source": _values(counts, scope, "source"),
+        "rooms_count": dict(sorted(rooms.items(), key=lambda item: (not item[0].isdigit(), item[0]))),
+        "price": _histogram(counts, scope, "price", PRICE_EDGES),
+        "meters": _histogram(counts, scope, "meters", METERS_EDGES),
+    }
+
+
+def facet_row(listing: Listing) -> FacetRow:
+    return (
+        listing.deal_type, listing.source, listing.rooms_count, listing.home_type,
+        _bucket(listing.price, PRICE_EDGES), _bucket(listing.total_meters, METERS_EDGES),
+    )
+
+
+def _apply_delta(rows: Iterable[FacetRow], amount: int):
+    counts = Counter()
+    for row in rows:
+        _add_counts(counts, row, amount)
+    if not counts:
+        return
+
+    def update(pipe):
+        exists = pipe.exists(FACETS_KEY)
+        pipe.multi()
+        if not exists:
+            return  # еще не строили - построится при чтении
+        for field, value in counts.items():
+            pipe.hincrby(FACETS_KEY, field, value)
+
+    try:
+        redis_client.transaction(update, FACETS_KEY)
+    except redis.exceptions.RedisError as e:
+        logger.warning(f"⚠️ Не удалось обновить фасеты, сбрасываем: {e}")
+        invalidate_facets()
+
+
+def add_listing_facets(listings: Iterable[Listing]):
+    """Учитывает новые объявления парсера"""
+    _apply_delta((facet_row(listing) for listing in listings), 1)
+
+
+def remove_listing_facets(rows: Iterable[FacetRow]):
+    """Вычитает удаленные объявления (строки из facet_columns или facet_row)"""
+    _apply_delta(rows, -1)
+
+
+def facet_columns(query):
+    """Колонки для remove_listing_facets: выбираются тем же запросом, что и удаляемые объявления"""
+    return [
+        (deal_type, source, rooms_count, home_type, _bucket(price, PRICE_EDGES), _bucket(meters, METERS_EDGES))
+        for deal_type, source, rooms_count, home_type, price, meters in query.with_entities(
+            Listing.deal_type, Listing.source, Listing.rooms_count, Listing.home_type,
+            Listing.price, Listing.total_meters,
+        ).all()
+    ]
+
+
+def invalidate_facets():
+    try:
+        redis_client.delete(FACETS_KEY)
+    except redis.exceptions.RedisError as e:
+        logger.warning(f"⚠️ Не удалось сбросить фасеты: {e}")
@@ -0,0 +1,158 @@
+"""
+Компилятор фильтров ленты для /listings, /favorites и /rent
+
+Параметры запроса (deal_type, source, rooms_count, диапазоны цены и площади,
+search, status, responsible) разбираются один раз в FilterPlan, после чего план
+добавляет условия в любой запрос. Колонки, к которым применяются условия,
+задаются FilterColumns:
+- LISTING_COLUMNS - таблица listings;
+- FAVORITE_COLUMNS - снимки в favorites (избранное не читает listings);
+- RENT_COLUMNS - listings, присоединенная к rent_listings, но цена - rent_price аренды.
+Так каждый эндпоинт строит один SQL-запрос страницы (и один для количества)
+без промежуточной выборки id.
+"""
+
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+from sqlalchemy import or_
+
+from app.favorites.models import Favorite
+from app.listings.models import ListingMetadata
+from app.listings.search import apply_search_filter
+from app.parsers.models import Listing, ListingFilters
+from app.rent.models import RentListing
+
+# Комнаты, по которым можно фильтровать (больше - только в ответе, как раньше)
+MAX_ROOMS = 6
+
+
+@dataclass(frozen=True)
+class FilterColumns:
+    """Колонки, к которым применяется план: id объявления и поля фильтров"""
+    listing_id: object
+    deal_type: object
+    source: object
+    price: object
+    total_meters: object
+    rooms_count: object
+    home_type: object
+
+
+LISTING_COLUMNS = FilterColumns(
+    listing_id=Listing.id, deal_type=Listing.deal_type, source=Listing.source, price=Listing.price,
+    total_meters=Listing.total_meters, rooms_count=Listing.rooms_count, home_type=Listing.home_type,
+)
+FAVORITE_COLUMNS = FilterColumns(
+    listing_id=Favorite.listing_id, deal_type=Favorite.deal_type, source=Favorite.source, price=Favorite.price,
+    total_meters=Favorite.total_meters, rooms_count=Favorite.rooms_count, home_type=Favorite.home_type,
+)
+# Фильтр цены в аренде - по цене аренды, остальные - по объявлению
+RENT_COLUMNS = FilterColumns(
+    listing_id=Listing.id, deal_type=Listing.deal_type, source=Listing.source, price=RentListing.rent_price,
+    total_meters=Listing.total_meters, rooms_count=Listing.rooms_count, home_type=Listing.home_type,
+)
+
+
+@dataclass(frozen=True)
+class FilterPlan:
+    """Разобранные фильтры запроса"""
+    deal_type: Optional[str] = None
+    source: Optional[str] = None
+    # Значения rooms_count как в запросе (цифры и studio) - для ответа
+    rooms_values: Tuple[str, ...] = ()
+    rooms: Tuple[int, ...] = ()
+    studio: bool = False
+    min_price: Optional[float] = None
+    max_price: Optional[float] = None
+    min_meters: Optional[float] = None
+    max_meters: Optional[float] = None
+    search: Optional[str] = None
+    status: Optional[str] = None
+    responsible: Optional[str] = None
+    company_id: Optional[str] = None
+
+    @property
+    def uses_metadata(self) -> bool:
+        """Есть фильтры по метаданным компании (нужен JOIN listing_metadata)"""
+        return bool((self.status or self.responsible) and self.company_id)
+
+    def apply(self, query, columns: FilterColumns = LISTING_COLUMNS, metadata_joined: bool = False):
+        """Добавляет условия плана в запрос
+
+        metadata_joined - ListingMetadata компании уже присоединена к запросу (см. listing_page_query)
+        """
+        if self.deal_type:
+            query = query.filter(columns.deal_type == self.deal_type)
+        if self.source:
+            query = query.filter(columns.source == self.source)
+        if self.min_price is not None:
+            query = query.filter(columns.price >= self.min_price)
+        if self.max_price is not None:
+            query = query.filter(columns.price <= self.max_price)
+        if self.min_meters is not None:
+            query = query.filter(columns.total_meters >= self.min_meters)
+        if self.max_meters is not None:
+            query = query.filter(columns.total_meters <= self.max_meters)
+        if self.rooms or self.studio:
+            conditions = []
+            if self.rooms:
+                conditions.append(columns.rooms_count.in_(self.rooms))
+            if self.studio:
+                conditions.append(columns.home_type == 'studio')
+            query = query.filter(or_(*conditions))
+        if self.search:
+            # Нечеткий поиск по адресу через обратный индекс слов (без загрузки всех объявлений)
+            query = apply_search_filter(query, self.search, listing_id=columns.listing_id)
+
+        # Фильтры по метаданным (JOIN только если они заданы)
+        if self.uses_metadata:
+            if not metadata_joined:
+                query = query.outerjoin(
+                    ListingMetadata,
+                    (columns.listing_id == ListingMetadata.listing_id) &
+                    (ListingMetadata.company_id == self.company_id)
+                )
+            if self.status:
+                query = query.filter(
+                    (ListingMetadata.status == self.status) |
+                    ((ListingMetadata.status == None) & (self.status == 'new'))
+                )
+            if self.responsible:
+                query = query.filter(ListingMetadata.responsible_user_id == self.responsible)
+        return query
+
+    def response_filters(self) -> ListingFilters:
+        """Текущие фильтры для ответа (PaginatedListingsResponse.filters)"""
+        return ListingFilters(
+            deal_type=self.deal_type,
+            source=self.source,
+            rooms_count=list(self.rooms_values) or None,
+            min_price=self.min_price,
+            max_price=self.max_price,
+            min_meters=self.min_meters,
+            max_meters=self.max_meters,
+            search=self.search,
+        )
+
+
+def compile_filters(deal_type=None, source=None, rooms_count=None, min_price=None, max_price=None,
+                    min_meters=None, max_meters=None, search=None, status=None, responsible=None,
+                    company_id=None) -> FilterPlan:
+    """Разбирает параметры запроса (rooms_count - строка "1,2,studio") в FilterPlan"""
+    rooms_parts = [r.strip() for r in rooms_count.split(',')] if rooms_count else []
+    return FilterPlan(
+        deal_type=deal_type,
+        source=source,
+        rooms_values=tuple(r for r in rooms_parts if r.isdigit() or r == 'studio'),
+        rooms=tuple(int(r) for r in rooms_parts if r.isdigit() and int(r) <= MAX_ROOMS),
+        studio='studio' in rooms_parts,
+        min_price=min_price,
+        max_price=max_price,
+        min_meters=min_meters,
+        max_meters=max_meters,
+        search=search,
+        status=status,
+        responsible=responsible,
+        company_id=company_id,
+    )
@@ -0,0 +1,77 @@
+"""
+Помесячная архивация истории изменений объявлений
+
+listing_history только дописывается (каждое назначение и смена статуса), а
+запросы к ней нужны в основном по свежим записям. Раз в месяц записи старше
+HISTORY_RETENTION_MONTHS полных месяцев переносятся пачками в
+listing_history_archive (те же колонки и индексы), так что рабочая таблица
+остается размером в несколько месяцев. Статистика сотрудников историю не
+читает (назначения по дням - в user_daily_assignments, см.
+app/users/stats_service.py), история объявления (GET /listings/{id}/history) читается
+из обеих таблиц, а удаление объявления удаляет историю из обеих таблиц.
+"""
+
+import logging
+from datetime import datetime
+from typing import List, Optional
+
+from sqlalchemy import insert, select, union_all
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.listings.models import ListingHistory, ListingHistoryArchive
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_BATCH_SIZE = 5000
+HISTORY_COLUMNS = ("id", "listing_id", "company_id", "user_id", "action", "old_value", "new_value", "comment",
+                   "created_at")
+
+
+def archive_cutoff(now: Optional[datetime] = None, months: Optional[int] = None) -> datetime:
+    """Начало месяца, раньше которого записи уходят в архив"""
+    now = now or datetime.utcnow()
+    months = settings.HISTORY_RETENTION_MONTHS if months is None else months
+    month_index = now.year * 12 + now.month - 1 - months
+    return datetime(month_index // 12, month_index % 12 + 1, 1)
+
+
+def archive_listing_history(db: Session, before: Optional[datetime] = None,
+                            batch_size: int = ARCHIVE_BATCH_SIZE) -> int:
+    """Переносит записи истории раньше before (по умолчанию archive_cutoff()) в архив, коммитя по пачкам"""
+    before = before or archive_cutoff()
+    moved = 0
+    while True:
+        ids = [row.id for row in db.query(ListingHistory.id).filter(
+            ListingHistory.created_at < before
+        ).order_by(ListingHistory.created_at).limit(batch_size).all()]
+        if not ids:
+            break
+        columns = [getattr(ListingHistory, name) for name in HISTORY_COLUMNS]
+        db.execute(insert(ListingHistoryArchive).from_select(
+            list(HISTORY_COLUMNS), select(*columns).where(ListingHistory.id.in_(ids))
+        ))
+        db.query(ListingHistory).filter(ListingHistory.id.in_(ids)).delete(synchronize_session=False)
+        db.commit()
+        moved += len(ids)
+
+    if moved:
+        logger.info(f"🗄️ В архив истории перенесено {moved} записей (раньше {before:%Y-%m-%d})")
+    return moved
+
+
+def get_listing_history(db: Session, listing_id: str, company_id: str) -> List:
+    """История объявления компании из рабочей таблицы и архива, новые записи первыми"""
+    history = union_all(*[
+        select(*[getattr(model, name) for name in HISTORY_COLUMNS]).where(
+            model.listing_id == listing_id, model.company_id == company_id
+        )
+        for model in (ListingHistory, ListingHistoryArchive)
+    ]).subquery()
+    return db.execute(select(history).order_by(history.c.created_at.desc(), history.c.id.desc())).all()
+
+
+def delete_listing_history(db: Session, listing_id: str, company_id: str):
+    """Удаляет историю объявления компании из обеих таблиц"""
+    for model in (ListingHistory, ListingHistoryArchive):
+        db.query(model).filter(model.listing_id == listing_id, model.company_id == company_id).delete()
@@ -0,0 +1,282 @@
+"""
+Кэш фотографий объявлений на диске
+
+ZIP с фотографиями и /listings/{id}/images/{n} раньше каждый раз скачивали фото
+с CDN Циан/Авито. Теперь фото скачивается один раз и хранится на диске:
+- blobs/<sha256[:2]>/<sha256 содержимого> - файлы по хэшу содержимого
+  (одинаковые фото под разными URL хранятся один раз, хэш - ETag ответа);
+- urls/<sha256(url)[:2]>/<sha256(url)> - ссылка URL -> хэш содержимого и Content-Type.
+Кэш заполняется при первом обращении. Файлы пишутся во временный файл и
+переименовываются, поэтому кэш можно делить между процессами. Обращение к фото
+обновляет mtime файла, и при превышении IMAGE_CACHE_MAX_MB удаляются давно не
+читавшиеся файлы (LRU), пока кэш не уменьшится до EVICT_TO доли лимита.
+Ссылки URL на удаленные файлы считаются промахом и удаляются при чтении.
+Для ответа клиенту файл открывается сразу (get): если его вытеснят после открытия,
+открытый файл дочитывается, а если до - фото скачивается заново.
+В кэш попадают только фото: ответ CDN скачивается потоком и обрывается после
+IMAGE_CACHE_MAX_IMAGE_MB, Content-Type должен быть image/*, а начало файла -
+сигнатурой JPEG, PNG, GIF или WebP (страница капчи с кодом 200 - не фото).
+Content-Type ответа клиенту берется по сигнатуре, а не из заголовка CDN.
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+from typing import BinaryIO, Iterator, NamedTuple, Optional, Tuple
+
+import httpx
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Байты начала файла, достаточные для сигнатуры (image_type)
+IMAGE_HEAD_BYTES = 12
+# После вытеснения кэш занимает не больше этой доли лимита (чтобы не вытеснять на каждой записи)
+EVICT_TO = 0.9
+
+
+class CachedImage(NamedTuple):
+    path: str
+    digest: str
+    content_type: str
+
+
+class ServedImage(NamedTuple):
+    """Фото для ответа: открытый файл из кэша или только что скачанное содержимое"""
+    digest: str
+    content_type: str
+    file: Optional[BinaryIO] = None
+    size: int = 0
+    content: Optional[bytes] = None
+
+
+def _sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def image_type(head: bytes) -> Optional[str]:
+    """Content-Type фото по сигнатуре начала файла или None, если это не фото"""
+    if head.startswith(b"\xff\xd8\xff"):
+        return "image/jpeg"
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "image/png"
+    if head.startswith((b"GIF87a", b"GIF89a")):
+        return "image/gif"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    return None
+
+
+def _write_atomic(path: str, data: bytes):
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as tmp_file:
+            tmp_file.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+class ImageCache:
+    """Файлы фото по хэшу содержимого с ограничением размера и LRU-вытеснением"""
+
+    def __init__(self, root: str, max_bytes: int, max_image_bytes: int):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.max_image_bytes = max_image_bytes
+        # Оценка занятого места: считается обходом при первой записи, дальше - по записям процесса
+        self._size: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def _blob_path(self, digest: str) -> str:
+        return os.path.join(self.root, "blobs", digest[:2], digest)
+
+    def _url_path(self, url: str) -> str:
+        key = _sha256(url.encode())
+        return os.path.join(self.root, "urls", key[:2], key)
+
+    def lookup(self, url: str) -> Optional[CachedImage]:
+        """Фото из кэша (и отметка об обращении для LRU) или None"""
+        url_path = self._url_path(url)
+        try:
+            with open(url_path, encoding="utf-8") as url_file:
+                digest, content_type = url_file.read().split("\n", 1)
+        except (OSError, ValueError):
+            return None
+
+        path = self._blob_path(digest)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            # Файл вытеснен - ссылка больше не нужна
+            try:
+                os.unlink(url_path)
+            except OSError:
+                pass
+            return None
+        return CachedImage(path, digest, content_type)
+
+    def store(self, url: str, content: bytes, content_type: str) -> Optional[CachedImage]:
+        """Сохраняет фото; None, если фото больше IMAGE_CACHE_MAX_IMAGE_MB"""
+        if len(content) > self.max_image_bytes:
+            return None
+        digest = _sha256(content)
+        path = self._blob_path(digest)
+        added = 0
+        if os.path.exists(path):
+            os.utime(path)
+        else:
+            _write_atomic(path, content)
+            added = len(content)
+        _write_atomic(self._url_path(url), f"{digest}\n{content_type}".encode("utf-8"))
+        self._account(added)
+        return CachedImage(path, digest, content_type)
+
+    def _account(self, added: int):
+        with self._lock:
+            if self._size is None:
+                self._size = self._scan()[0]
+            else:
+                self._size += added
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _scan(self) -> Tuple[int, list]:
+        total, blobs = 0, []
+        for directory, _, files in os.walk(os.path.join(self.root, "blobs")):
+            for name in files:
+                path = os.path.join(directory, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                total += stat.st_size
+                blobs.append((stat.st_mtime, stat.st_size, path))
+        return total, blobs
+
+    def _evict(self):
+        # Кэш могут пополнять другие процессы - размер пересчитывается обходом
+        total, blobs = self._scan()
+        target = self.max_bytes * EVICT_TO
+        removed = 0
+        for _, size, path in sorted(blobs):
+            if total <= target:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            removed += 1
+        self._size = total
+        if removed:
+            logger.info(f"🧹 Из кэша фото вытеснено {removed} файлов, занято {total / 1024 / 1024:.0f} МБ")
+
+    async def _read_image(self, client: httpx.AsyncClient, url: str) -> Optional[bytes]:
+        """Тело ответа CDN, если это фото не больше max_image_bytes (иначе загрузка обрывается)"""
+        async with client.stream("GET", url) as response:
+            if response.status_code != 200:
+                logger.warning(f"Image {url} returned {response.status_code}")
+                return None
+            header_type = response.headers.get("content-type")
+            if header_type and not header_type.lower().startswith("image/"):
+                logger.warning(f"⚠️ {url} вернул не фото: {header_type}")
+                return None
+            length = response.headers.get("content-length", "")
+            if length.isdigit() and int(length) > self.max_image_bytes:
+                logger.warning(f"⚠️ Фото {url} больше лимита: {length} байт")
+                return None
+            chunks, size = [], 0
+            async for chunk in response.aiter_bytes():
+                size += len(chunk)
+                if size > self.max_image_bytes:
+                    logger.warning(f"⚠️ Фото {url} больше лимита, загрузка прервана")
+                    return None
+                chunks.append(chunk)
+        return b"".join(chunks)
+
+    async def _download(self, client: httpx.AsyncClient, url: str) -> Tuple[Optional[bytes], Optional[str], Optional[CachedImage]]:
+        content = await self._read_image(client, url)
+        if content is None:
+            return None, None, None
+        content_type = image_type(content)
+        if content_type is None:
+            logger.warning(f"⚠️ {url} вернул не фото: неизвестная сигнатура")
+            return None, None, None
+        try:
+            cached = await asyncio.to_thread(self.store, url, content, content_type)
+        except OSError as e:
+            logger.warning(f"⚠️ Не удалось сохранить фото в кэш: {e}")
+            cached = None
+        return content, content_type, cached
+
+    async def fetch(self, client: httpx.AsyncClient, url: str) -> Optional[bytes]:
+        """Содержимое фото: с диска, а при промахе - с CDN с сохранением в кэш"""
+        cached = await asyncio.to_thread(self.lookup, url)
+        if cached:
+            try:
+                content = await asyncio.to_thread(_read_file, cached.path)
+                # Записи до проверки сигнатуры могли сохранить не фото - они скачиваются заново
+                if image_type(content):
+                    return content
+            except FileNotFoundError:
+                pass  # вытеснен между lookup и чтением
+        content, _, _ = await self._download(client, url)
+        return content
+
+    def _open(self, url: str) -> Optional[ServedImage]:
+        cached = self.lookup(url)
+        if not cached:
+            return None
+        try:
+            image_file = open(cached.path, "rb")
+        except FileNotFoundError:
+            return None  # вытеснен между lookup и открытием
+        content_type = image_type(image_file.read(IMAGE_HEAD_BYTES))
+        if content_type is None:
+            # Записи до проверки сигнатуры могли сохранить не фото - скачивается заново
+            image_file.close()
+            return None
+        image_file.seek(0)
+        return ServedImage(cached.digest, content_type, file=image_file, size=os.fstat(image_file.fileno()).st_size)
+
+    async def get(self, client: httpx.AsyncClient, url: str) -> Optional[ServedImage]:
+        """Фото для отдачи клиенту (открытый файл закрывает iter_file); None - CDN не отдал фото"""
+        served = await asyncio.to_thread(self._open, url)
+        if served:
+            return served
+        content, content_type, cached = await self._download(client, url)
+        if content is None:
+            return None
+        return ServedImage(cached.digest if cached else _sha256(content), content_type, content=content)
+
+
+def _read_file(path: str) -> bytes:
+    with open(path, "rb") as image_file:
+        return image_file.read()
+
+
+def iter_file(image_file: BinaryIO, chunk_size: int = 64 * 1024) -> Iterator[bytes]:
+    """Читает открытый файл кусками и закрывает его"""
+    try:
+        while chunk := image_file.read(chunk_size):
+            yield chunk
+    finally:
+        image_file.close()
+
+
+image_cache = ImageCache(
+    settings.IMAGE_CACHE_DIR,
+    settings.IMAGE_CACHE_MAX_MB * 1024 * 1024,
+    settings.IMAGE_CACHE_MAX_IMAGE_MB * 1024 * 1024,
+)
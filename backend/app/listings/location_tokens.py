@@ -0,0 +1,123 @@
+"""
+Нормализованные токены адреса объявления
+
+Считаются один раз при сохранении объявления и пишутся в поисковый индекс
+(listing_search_tokens) с полем, из которого взяты: address (весь адрес),
+street, district, metro, complex. Слово нормализуется так же и в запросе:
+нижний регистр, ё -> е, без пунктуации по краям, латиница -> кириллица
+(tverskaya -> тверская) и начальная форма через pymorphy2 (Тверской -> тверской,
+Тверская -> тверской).
+"""
+
+import logging
+import re
+from functools import lru_cache
+from typing import Dict, Optional, Set, Tuple
+
+from transliterate import translit
+
+logger = logging.getLogger(__name__)
+
+LOCATION_FIELDS = ("address", "street", "district", "metro", "complex")
+
+# Признаки частей адреса (отдельные слова) в строке вида "Москва, р-н Хамовники, ул. Остоженка, 12, м. Парк культуры"
+STREET_MARKERS = {"ул", "улица", "просп", "проспект", "пр-т", "пер", "переулок", "ш", "шоссе", "бул", "бульвар",
+                  "наб", "набережная", "проезд", "пл", "площадь", "туп", "тупик", "аллея", "вал"}
+DISTRICT_MARKERS = {"р-н", "район", "поселение", "округ"}
+METRO_MARKERS = {"м", "метро"}
+COMPLEX_MARKERS = {"жк"}
+# Служебные слова адреса в индекс не попадают: без точки "м", "пер", "просп" похожи почти на любое слово
+# ("вал" - часть названия улицы, "неизвестно" - заглушка улицы в CianAdapter)
+MARKER_WORDS = (STREET_MARKERS | DISTRICT_MARKERS | METRO_MARKERS | COMPLEX_MARKERS |
+                {"д", "дом", "к", "корп", "стр", "неизвестно"}) - {"вал"}
+
+# Латинские сочетания, которые transliterate разбирает неверно (ya -> "ыа")
+LATIN_DIGRAPHS = (("shch", "щ"), ("sch", "щ"), ("zh", "ж"), ("kh", "х"), ("ts", "ц"), ("ch", "ч"), ("sh", "ш"),
+                  ("ya", "я"), ("yu", "ю"), ("iy", "ий"), ("yy", "ый"), ("oy", "ой"), ("ey", "ей"), ("ay", "ай"))
+
+_EDGE_PUNCTUATION = ".,;:!?\"'«»()[]"
+_LATIN = re.compile(r"[a-z]")
+
+_morph = None
+_morph_failed = False
+
+
+def _get_morph():
+    """MorphAnalyzer создается один раз. Если pymorphy2 не работает, поиск идет без лемм"""
+    global _morph, _morph_failed
+    if _morph is None and not _morph_failed:
+        try:
+            import pymorphy2
+            _morph = pymorphy2.MorphAnalyzer()
+        except Exception as e:
+            _morph_failed = True
+            logger.warning(f"⚠️ pymorphy2 недоступен, адреса индексируются без лемматизации: {e}")
+    return _morph
+
+
+def clean_word(word: str) -> str:
+    return word.lower().replace("ё", "е").strip(_EDGE_PUNCTUATION)
+
+
+def to_cyrillic(word: str) -> str:
+    if not _LATIN.search(word):
+        return word
+    for latin, cyrillic in LATIN_DIGRAPHS:
+        word = word.replace(latin, cyrillic)
+    return translit(word, "ru").lower()
+
+
+@lru_cache(maxsize=100_000)
+def word_variants(word: str) -> Tuple[str, ...]:
+    """Формы слова для индекса и запроса: очищенное слово, кириллица и начальная форма"""
+    cleaned = clean_word(word)
+    if not cleaned:
+        return ()
+
+    variants = {cleaned}
+    cyrillic = to_cyrillic(cleaned)
+    variants.add(cyrillic)
+
+    morph = _get_morph()
+    if morph is not None and not cyrillic.isdigit():
+        variants.add(morph.parse(cyrillic)[0].normal_form.replace("ё", "е"))
+    return tuple(sorted(variants))
+
+
+def parse_address_parts(address: str) -> Dict[str, str]:
+    """Улица, район, метро и ЖК из строки адреса (части через запятую)"""
+    parts = {}
+    for part in (address or "").split(","):
+        part = part.strip()
+        words = {clean_word(word) for word in part.split()}
+        if not part:
+            continue
+        if words & METRO_MARKERS:
+            parts.setdefault("metro", part)
+        elif words & DISTRICT_MARKERS:
+            parts.setdefault("district", part)
+        elif words & COMPLEX_MARKERS:
+            parts.setdefault("complex", part)
+        elif words & STREET_MARKERS:
+            parts.setdefault("street", part)
+    return parts
+
+
+def location_tokens(location: str, location_parts: Optional[Dict[str, str]] = None) -> Set[Tuple[str, str]]:
+    """Пары (поле, токен) для индекса
+
+    location_parts - части адреса, которые разобрал парсер (например, define_location_data у Циан);
+    они дополняют то, что удалось разобрать из самой строки адреса
+    """
+    parts = parse_address_parts(location)
+    for field, value in (location_parts or {}).items():
+        if field in LOCATION_FIELDS and value:
+            parts[field] = value
+
+    tokens = set()
+    for field, value in [("address", location or "")] + list(parts.items()):
+        for word in value.split():
+            tokens.update(
+                (field, variant) for variant in word_variants(word) if variant not in MARKER_WORDS
+            )
+    return tokens
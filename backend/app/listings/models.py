@@ -2,8 +2,8 @@ import uuid
 from sqlalchemy import Column, String, DateTime, ForeignKey, Index
 from datetime import datetime
 from app.db import Base
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field
+from typing import Dict, List, Optional
 
 class ListingMetadata(Base):
     """Метаданные объявления для команды (ответственный, статус)"""
@@ -19,15 +19,19 @@ class ListingMetadata(Base):
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     __table_args__ = (
-        Index('idx_listing_company', 'listing_id', 'company_id'),
+        # Одна запись метаданных объявления на компанию (UPSERT в update_metadata_bulk)
+        Index('uq_listing_metadata_listing_company', 'listing_id', 'company_id', unique=True),
+        # Фильтры status/responsible в /listings
+        Index('idx_listing_metadata_company_status', 'company_id', 'status', 'listing_id'),
+        Index('idx_listing_metadata_company_responsible', 'company_id', 'responsible_user_id', 'listing_id'),
     )
 
 class ListingHistory(Base):
-    """История изменений объявления"""
+    """История изменений объявления (записи старше HISTORY_RETENTION_MONTHS переносятся в архив, см. history.py)"""
     __tablename__ = "listing_history"
 
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
-    listing_id = Column(String, ForeignKey("listings.id"), nullable=False, index=True)
+    listing_id = Column(String, ForeignKey("listings.id"), nullable=False)
     company_id = Column(String, ForeignKey("users.id"), nullable=False)
     user_id = Column(String, ForeignKey("users.id"), nullable=True)
     action = Column(String, nullable=False)  # assigned, status_changed, etc
@@ -36,10 +40,61 @@ class ListingHistory(Base):
     comment = Column(String, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow, index=True)
 
+    __table_args__ = (
+        # Назначения сотрудникам за период (аудит).
+        # listing_id в конце - выборка объявлений сотрудника читает только индекс
+        Index('idx_listing_history_action_value_created', 'action', 'new_value', 'created_at', 'listing_id'),
+        # История объявления
+        Index('idx_listing_history_listing_action', 'listing_id', 'action'),
+    )
+
+class ListingHistoryArchive(Base):
+    """Архив истории изменений: те же колонки, без внешнего ключа на listings"""
+    __tablename__ = "listing_history_archive"
+
+    id = Column(String, primary_key=True)
+    listing_id = Column(String, nullable=False)
+    company_id = Column(String, nullable=False)
+    user_id = Column(String, nullable=True)
+    action = Column(String, nullable=False)
+    old_value = Column(String, nullable=True)
+    new_value = Column(String, nullable=True)
+    comment = Column(String, nullable=True)
+    created_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index('idx_listing_history_archive_action_value_created', 'action', 'new_value', 'created_at', 'listing_id'),
+        Index('idx_listing_history_archive_listing_action', 'listing_id', 'action'),
+    )
+
+class ListingSearchToken(Base):
+    """Нормализованный токен адреса объявления - обратный индекс для нечеткого поиска (см. app/listings/search.py)
+
+    field - часть адреса, из которой взят токен: address, street, district, metro, complex.
+    Без внешнего ключа: индекс производный, строки удаленных объявлений чистит prune_search_index
+    """
+    __tablename__ = "listing_search_tokens"
+
+    word = Column(String, primary_key=True)
+    listing_id = Column(String, primary_key=True, index=True)
+    field = Column(String, primary_key=True, default="address")
+
+class SearchVocabulary(Base):
+    """Все различные токены адресов - по ним считается rapidfuzz при поиске"""
+    __tablename__ = "search_vocabulary"
+
+    word = Column(String, primary_key=True)
+
+# Сколько объявлений можно обновить одним запросом PATCH /listings/metadata
+METADATA_BATCH_LIMIT = 500
+
 class ListingMetadataUpdate(BaseModel):
     responsible_user_id: Optional[str] = None
     status: Optional[str] = None
 
+class ListingMetadataBulkUpdate(ListingMetadataUpdate):
+    listing_ids: List[str] = Field(..., min_length=1, max_length=METADATA_BATCH_LIMIT)
+
 class ListingMetadataResponse(BaseModel):
     id: str
     listing_id: str
@@ -51,3 +106,33 @@ class ListingMetadataResponse(BaseModel):
     
     class Config:
         from_attributes = True
+
+class ListingMetadataBulkResponse(BaseModel):
+    updated: List[ListingMetadataResponse]
+    # id, которых нет в listings
+    not_found: List[str]
+
+class ListingHistoryResponse(BaseModel):
+    id: str
+    user_id: Optional[str]
+    action: str
+    old_value: Optional[str]
+    new_value: Optional[str]
+    comment: Optional[str]
+    created_at: Optional[datetime]
+    
+    class Config:
+        from_attributes = True
+
+class FacetBucket(BaseModel):
+    min: float
+    max: Optional[float]
+    count: int
+
+class ListingFacetsResponse(BaseModel):
+    total: int
+    deal_type: Dict[str, int]
+    source: Dict[str, int]
+    rooms_count: Dict[str, int]
+    price: List[FacetBucket]
+    meters: List[FacetBucket]
@@ -0,0 +1,65 @@
+"""
+Общий кэш страниц ленты /listings
+
+Агенты всех компаний опрашивают /listings с почти одинаковыми фильтрами, и
+первые страницы каждый раз собирались заново. Данные объявлений одинаковы для
+всех компаний, поэтому страница (колонки LISTING_PAGE_COLUMNS и курсор
+следующей страницы) кэшируется в Redis по ключу
+(версия listings, нормализованные фильтры, page или cursor, per_page),
+а метаданные компании (ответственный, статус, аренда) накладываются поверх
+отдельным запросом по id объявлений страницы.
+
+Версия listings растет при сохранении новых объявлений и при удалении
+(см. app/listings/counts.py), поэтому все закэшированные страницы
+перестают использоваться одним INCR; старые ключи истекают по TTL.
+Запросы с фильтрами status/responsible зависят от компании и не кэшируются.
+"""
+
+import logging
+from typing import Callable, Dict, List, Optional, Tuple
+
+import orjson
+import redis
+
+from app.listings.counts import filters_digest, get_data_version
+from app.services.redis_service import redis_client
+
+logger = logging.getLogger(__name__)
+
+PAGE_KEY_PREFIX = "listing_page"
+PAGE_TTL_SECONDS = 300
+
+Page = Tuple[List[Dict], Optional[str]]
+
+
+def cached_listing_page(filters: Dict, page: int, per_page: int, cursor: Optional[str],
+                        load: Callable[[], Page]) -> Page:
+    """Страница из кэша или load() с сохранением в кэш
+
+    filters - только фильтры по данным объявлений (без company_id и метаданных).
+    Значения datetime из кэша возвращаются строками ISO - в ответе они выглядят так же
+    """
+    try:
+        version = get_data_version(["listings"])
+    except redis.exceptions.RedisError as e:
+        logger.warning(f"⚠️ Кэш страниц недоступен: {e}")
+        return load()
+
+    position = f"c{cursor}" if cursor else f"p{page}"
+    key = f"{PAGE_KEY_PREFIX}:{version}:{filters_digest(filters)}:{position}:{per_page}"
+
+    try:
+        cached = redis_client.get(key)
+    except redis.exceptions.RedisError as e:
+        logger.warning(f"⚠️ Кэш страниц недоступен: {e}")
+        return load()
+    if cached is not None:
+        items, next_cursor = orjson.loads(cached)
+        return items, next_cursor
+
+    items, next_cursor = load()
+    try:
+        redis_client.setex(key, PAGE_TTL_SECONDS, orjson.dumps([items, next_cursor]))
+    except (redis.exceptions.RedisError, TypeError) as e:
+        logger.warning(f"⚠️ Не удалось сохранить страницу в кэш: {e}")
+    return items, next_cursor
@@ -0,0 +1,130 @@
+"""
+ZIP с фотографиями объявления (GET /listings/{id}/photos)
+
+Фотографии читаются из кэша на диске (image_cache.py), а отсутствующие в нем
+скачиваются параллельно (не больше PHOTO_DOWNLOAD_CONCURRENCY одновременно), и
+пишутся в архив в порядке готовности: каждая запись отдается клиенту сразу
+после записи, не дожидаясь остальных. JPEG/WebP уже сжаты,
+поэтому записи хранятся без сжатия (ZIP_STORED) - архив отдается без затрат CPU.
+Скачанные, но еще не записанные фото ждут в очереди размером с число загрузок:
+если клиент читает медленно, загрузки останавливаются, и в памяти не больше
+2 * PHOTO_DOWNLOAD_CONCURRENCY фотографий.
+Загрузки идут через общий на время работы приложения клиент httpx (get_photo_client):
+соединения с CDN переиспользуются между запросами, а их общее число ограничено
+PHOTO_CLIENT_MAX_CONNECTIONS. Клиент закрывается при остановке приложения.
+Замер времени до первого байта и пиковой памяти: python -m benchmarks.photos_zip_bench
+"""
+
+import asyncio
+import logging
+import zipfile
+from typing import AsyncGenerator, List, Optional
+
+import httpx
+
+from app.listings.image_cache import ImageCache, image_cache
+
+logger = logging.getLogger(__name__)
+
+MAX_PHOTOS = 20
+PHOTO_DOWNLOAD_CONCURRENCY = 5
+PHOTO_DOWNLOAD_TIMEOUT = 30.0
+# Соединений с CDN на процесс (ZIP и /listings/{id}/images/{n} всех запросов вместе)
+PHOTO_CLIENT_MAX_CONNECTIONS = 50
+
+_photo_client: Optional[httpx.AsyncClient] = None
+
+
+def get_photo_client() -> httpx.AsyncClient:
+    """Общий клиент загрузки фото (создается при первом обращении)"""
+    global _photo_client
+    if _photo_client is None or _photo_client.is_closed:
+        _photo_client = httpx.AsyncClient(
+            timeout=PHOTO_DOWNLOAD_TIMEOUT,
+            limits=httpx.Limits(max_connections=PHOTO_CLIENT_MAX_CONNECTIONS),
+        )
+    return _photo_client
+
+
+async def close_photo_client():
+    global _photo_client
+    if _photo_client is not None:
+        await _photo_client.aclose()
+        _photo_client = None
+
+
+class _ZipStream:
+    """Приемник ZipFile без seek: копит записанные куски до отдачи клиенту"""
+
+    def __init__(self):
+        self.chunks: List[bytes] = []
+
+    def write(self, data) -> int:
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def pop_chunks(self) -> List[bytes]:
+        chunks, self.chunks = self.chunks, []
+        return chunks
+
+
+def photo_name(index: int, image_url: str) -> str:
+    ext = image_url.split('.')[-1].split('?')[0][:4] or 'jpg'
+    return f"photo_{index}.{ext}"
+
+
+async def _download_photos(client: httpx.AsyncClient, cache: ImageCache, images: List[str], results: asyncio.Queue):
+    """Загружает фото (из кэша или с CDN) воркерами и кладет (номер, url, содержимое или None) в results"""
+    pending: asyncio.Queue = asyncio.Queue()
+    for index, image_url in enumerate(images, 1):
+        pending.put_nowait((index, image_url))
+
+    async def worker():
+        while True:
+            try:
+                index, image_url = pending.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            content = None
+            try:
+                content = await cache.fetch(client, image_url)
+            except Exception as e:
+                logger.error(f"Failed to download image {index}: {e}")
+            await results.put((index, image_url, content))
+
+    await asyncio.gather(*[worker() for _ in range(min(PHOTO_DOWNLOAD_CONCURRENCY, len(images)))])
+
+
+async def generate_photos_zip(images: list[str], listing_id: str, client: Optional[httpx.AsyncClient] = None,
+                              cache: ImageCache = image_cache) -> AsyncGenerator[bytes, None]:
+    """Генератор для потоковой отправки ZIP с фотографиями (макс MAX_PHOTOS)"""
+    images = images[:MAX_PHOTOS]
+    if client is None:
+        client = get_photo_client()
+
+    results: asyncio.Queue = asyncio.Queue(maxsize=PHOTO_DOWNLOAD_CONCURRENCY)
+    downloads = asyncio.create_task(_download_photos(client, cache, images, results))
+    stream = _ZipStream()
+    try:
+        with zipfile.ZipFile(stream, 'w', zipfile.ZIP_STORED) as zip_file:
+            for _ in range(len(images)):
+                index, image_url, content = await results.get()
+                if content is None:
+                    continue
+                zip_file.writestr(photo_name(index, image_url), content)
+                del content
+                for chunk in stream.pop_chunks():
+                    yield chunk
+        # Центральный каталог архива
+        for chunk in stream.pop_chunks():
+            yield chunk
+        await downloads
+    finally:
+        # Клиент оборвал загрузку - оставшиеся фото не нужны
+        if not downloads.done():
+            downloads.cancel()
+            await asyncio.gather(downloads, return_exceptions=True)
+    logger.info(f"📦 ZIP с фото объявления {listing_id} отдан")
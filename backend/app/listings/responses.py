@@ -0,0 +1,61 @@
+"""
+Быстрая сериализация страниц объявлений (/listings, /favorites)
+
+Строки listing_page_query кодируются в JSON через orjson напрямую, без
+построения и повторной валидации pydantic-моделей. Готовые байты отдаются
+обычным Response (ORJSONResponse в новых версиях FastAPI устарел).
+
+Колонка images уже хранит JSON-массив (build_listing в parsers/manager.py
+проверяет его при сохранении, старые строки нормализованы миграцией 0010), поэтому
+вставляется в ответ как есть через orjson.Fragment - без json.loads и обратного
+кодирования на каждый запрос. Текст, который не похож на массив (записан в
+обход парсера), заменяется пустым массивом, чтобы не сломать весь ответ.
+Формат ответа совпадает с PaginatedListingsResponse.
+"""
+
+from typing import Iterable, Optional
+
+import orjson
+from fastapi import Response
+from pydantic import BaseModel
+
+EMPTY_IMAGES = orjson.Fragment(b"[]")
+
+
+def images_fragment(images) -> orjson.Fragment:
+    """JSON-массив из колонки images для вставки в ответ без разбора"""
+    if isinstance(images, bytes):
+        images = images.decode("utf-8", errors="replace")
+    if not isinstance(images, str):
+        return EMPTY_IMAGES
+    images = images.strip()
+    if len(images) < 2 or images[0] != "[" or images[-1] != "]":
+        return EMPTY_IMAGES
+    return orjson.Fragment(images)
+
+
+def listing_row_to_dict(row) -> dict:
+    """Строка listing_page_query (или словарь из кэша страниц) -> элемент ответа в формате ListingResponse"""
+    item = dict(row._mapping) if hasattr(row, "_mapping") else dict(row)
+    item["images"] = images_fragment(item["images"])
+    # EXISTS и Boolean в SQLite приходят как 0/1
+    item["is_favorite"] = bool(item["is_favorite"])
+    item["is_in_rent"] = bool(item["is_in_rent"])
+    return item
+
+
+def listing_page_response(rows: Iterable, total: int, page: int, per_page: int, total_pages: int,
+                          filters: BaseModel, stats: BaseModel, next_cursor: Optional[str] = None,
+                          total_is_estimate: bool = False) -> Response:
+    content = orjson.dumps({
+        "items": [listing_row_to_dict(row) for row in rows],
+        "total": total,
+        "page": page,
+        "per_page": per_page,
+        "total_pages": total_pages,
+        "filters": filters.model_dump(),
+        "stats": stats.model_dump(),
+        "next_cursor": next_cursor,
+        "total_is_estimate": total_is_estimate,
+    })
+    return Response(content=content, media_type="application/json")
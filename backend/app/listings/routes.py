@@ -1,23 +1,75 @@
-from fastapi import APIRouter, Depends, HTTPException
-from fastapi.responses import StreamingResponse
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import Response, StreamingResponse
 from sqlalchemy.orm import Session
 from app.db import get_db
 from app.users.models import User
 from app.auth.utils import get_current_user
-from app.listings.models import ListingMetadataUpdate, ListingMetadataResponse
+from app.listings.models import (
+    ListingMetadataUpdate,
+    ListingMetadataResponse,
+    ListingMetadataBulkUpdate,
+    ListingMetadataBulkResponse,
+    ListingHistoryResponse,
+    ListingFacetsResponse,
+)
+from app.listings.facets import get_facets
+from app.listings.history import get_listing_history
+from app.listings.image_cache import image_cache, iter_file
+from app.listings.photos import generate_photos_zip, get_photo_client
 from app.listings.service import (
     get_company_id,
     update_metadata,
-    generate_photos_zip,
+    update_metadata_bulk,
     get_listing_images,
     delete_listing_metadata,
 )
 from app.core.responses import success_response, error_response, ErrorCode
+from typing import List
+import httpx
 import logging
 
 router = APIRouter(prefix="/listings", tags=["Listings"])
 logger = logging.getLogger(__name__)
 
+# URL фото объявления не меняется при смене содержимого, поэтому кэш на сутки и проверка по ETag;
+# private - фото отдается только с авторизацией
+IMAGE_CACHE_CONTROL = "private, max-age=86400"
+
+
+@router.get("/facets", response_model=ListingFacetsResponse)
+async def get_listing_facets(
+    deal_type: str = Query(None),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """Количество объявлений по типу сделки, источнику и комнатам, гистограммы цены и площади"""
+    return get_facets(db, deal_type)
+
+
+@router.patch("/metadata", response_model=ListingMetadataBulkResponse)
+async def update_listings_metadata(
+    data: ListingMetadataBulkUpdate,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """Обновить метаданные нескольких объявлений одной транзакцией (ответственный, статус)"""
+    company_id = get_company_id(current_user)
+
+    updated, not_found = update_metadata_bulk(
+        db,
+        data.listing_ids,
+        company_id,
+        str(current_user.id),
+        responsible_user_id=data.responsible_user_id,
+        status=data.status,
+    )
+
+    logger.info(
+        f"Metadata updated for {len(updated)} listings by user {current_user.email}"
+    )
+
+    return ListingMetadataBulkResponse(updated=updated, not_found=not_found)
+
 
 @router.patch("/{listing_id}/metadata", response_model=ListingMetadataResponse)
 async def update_listing_metadata(
@@ -37,6 +89,8 @@ async def update_listing_metadata(
         responsible_user_id=data.responsible_user_id,
         status=data.status,
     )
+    if metadata is None:
+        raise HTTPException(status_code=404, detail="Listing not found")
 
     logger.info(
         f"Metadata updated for listing {listing_id} by user {current_user.email}"
@@ -47,6 +101,16 @@ async def update_listing_metadata(
     return metadata
 
 
+@router.get("/{listing_id}/history", response_model=List[ListingHistoryResponse])
+async def get_listing_history_entries(
+    listing_id: str,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """История изменений объявления в компании (назначения, статусы), включая архив"""
+    return get_listing_history(db, listing_id, get_company_id(current_user))
+
+
 @router.get("/{listing_id}/photos")
 async def download_listing_photos(
     listing_id: str,
@@ -68,6 +132,41 @@ async def download_listing_photos(
     )
 
 
+@router.get("/{listing_id}/images/{index}")
+async def get_listing_image(
+    listing_id: str,
+    index: int,
+    request: Request,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """Фотография объявления (index с 1) из кэша на диске"""
+    images = get_listing_images(db, listing_id)
+
+    if index < 1 or index > len(images):
+        raise HTTPException(status_code=404, detail="Photo not found")
+
+    try:
+        image = await image_cache.get(get_photo_client(), images[index - 1])
+    except httpx.HTTPError as e:
+        logger.error(f"Failed to download image {index} of listing {listing_id}: {e}")
+        image = None
+
+    if image is None:
+        raise HTTPException(status_code=502, detail="Photo source unavailable")
+    # Фото адресуется хэшем содержимого - он же ETag
+    headers = {"Cache-Control": IMAGE_CACHE_CONTROL, "ETag": f'"{image.digest}"'}
+    if request.headers.get("if-none-match") == headers["ETag"]:
+        if image.file:
+            image.file.close()
+        return Response(status_code=304, headers=headers)
+    if image.file:
+        # Файл уже открыт: вытеснение из кэша во время отдачи его не обрывает
+        headers["Content-Length"] = str(image.size)
+        return StreamingResponse(iter_file(image.file), media_type=image.content_type, headers=headers)
+    return Response(image.content, media_type=image.content_type, headers=headers)
+
+
 @router.delete("/{listing_id}/metadata")
 async def delete_listing(
     listing_id: str,
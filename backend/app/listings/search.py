@@ -0,0 +1,183 @@
+"""
+Нечеткий поиск по адресу объявления через обратный индекс токенов
+
+При сохранении объявления нормализованные токены адреса (см. location_tokens.py)
+пишутся в listing_search_tokens (word, listing_id, field), а новые токены -
+в search_vocabulary. При поиске слова запроса нормализуются так же, и
+fuzz.partial_ratio считается не по каждому объявлению, а по словарю различных
+токенов (улицы, районы, метро и номера домов сильно повторяются), после чего
+объявления с подошедшими токенами выбираются по индексу. Слово запроса
+совпадает, если хотя бы одна его форма похожа на токен с partial_ratio >= MIN_WORD_SCORE.
+"""
+
+import json
+import logging
+import threading
+import time
+from itertools import chain
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from rapidfuzz import fuzz, process
+from sqlalchemy import insert, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app.favorites.models import Favorite
+from app.listings.location_tokens import location_tokens, word_variants
+from app.listings.models import ListingSearchToken, SearchVocabulary
+from app.parsers.models import Listing
+
+logger = logging.getLogger(__name__)
+
+# Порог fuzz.partial_ratio для совпадения слова запроса со словом адреса
+MIN_WORD_SCORE = 80
+# Токен короче слова запроса засчитывается, только если в нем не меньше MIN_TOKEN_LENGTH символов
+MIN_TOKEN_LENGTH = 4
+# Словарь перечитывается из БД не чаще раза в VOCABULARY_TTL_SECONDS (объявления пишет воркер Celery)
+VOCABULARY_TTL_SECONDS = 60
+INDEX_BATCH_SIZE = 5000
+
+_vocabulary_lock = threading.Lock()
+_vocabulary_cache = {"words": [], "loaded_at": 0.0}
+
+
+def _insert_ignore(db: Session, model, rows: List[dict]):
+    """INSERT без ошибок на уже существующих строках (индекс могут дописывать несколько парсеров сразу)"""
+    if not rows:
+        return
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        statement = postgresql.insert(model).on_conflict_do_nothing()
+    elif dialect == "sqlite":
+        statement = sqlite.insert(model).on_conflict_do_nothing()
+    else:
+        statement = insert(model).prefix_with("IGNORE")
+    for start in range(0, len(rows), INDEX_BATCH_SIZE):
+        db.execute(statement, rows[start:start + INDEX_BATCH_SIZE])
+
+
+def _write_index(db: Session, tokens_by_listing: Dict[str, set]):
+    word_rows = []
+    vocabulary = set()
+    for listing_id, tokens in tokens_by_listing.items():
+        for field, word in tokens:
+            vocabulary.add(word)
+            word_rows.append({"word": word, "listing_id": listing_id, "field": field})
+    _insert_ignore(db, ListingSearchToken, word_rows)
+    _insert_ignore(db, SearchVocabulary, [{"word": word} for word in vocabulary])
+
+
+def index_listings(db: Session, listings: Iterable[Listing]):
+    """Добавляет объявления в поисковый индекс. Вызывать в той же транзакции, что и сохранение
+
+    Части адреса, разобранные парсером, берутся из listing.location_parts (см. build_listing в manager.py)
+    """
+    listings = list(listings)
+    if not listings:
+        return
+    db.flush()  # нужны id новых объявлений
+    _write_index(db, {
+        listing.id: location_tokens(listing.location, getattr(listing, "location_parts", None))
+        for listing in listings
+    })
+
+
+def prune_search_index(db: Session):
+    """Удаляет из индекса слова удаленных объявлений и слова, которых больше нет ни в одном адресе
+
+    Слова объявлений из избранного остаются: избранное отдается из снимков и после удаления из listings
+    """
+    db.query(ListingSearchToken).filter(
+        ~ListingSearchToken.listing_id.in_(select(Listing.id)),
+        ~ListingSearchToken.listing_id.in_(select(Favorite.listing_id)),
+    ).delete(synchronize_session=False)
+    db.query(SearchVocabulary).filter(
+        ~SearchVocabulary.word.in_(select(ListingSearchToken.word))
+    ).delete(synchronize_session=False)
+
+
+def _archived_favorite_locations(db: Session):
+    """(id, адрес) объявлений из избранного, которых уже нет в listings - адрес берется из снимка"""
+    rows = db.query(Favorite.listing_id, Favorite.listing_snapshot).filter(
+        Favorite.listing_snapshot.isnot(None),
+        ~Favorite.listing_id.in_(select(Listing.id)),
+    ).yield_per(INDEX_BATCH_SIZE)
+    for listing_id, snapshot in rows:
+        location = json.loads(snapshot).get("location")
+        if location:
+            yield listing_id, location
+
+
+def rebuild_search_index(db: Session) -> int:
+    """Полностью перестраивает индекс по таблице listings (и снимкам избранного). Возвращает число объявлений"""
+    db.query(ListingSearchToken).delete(synchronize_session=False)
+    db.query(SearchVocabulary).delete(synchronize_session=False)
+
+    indexed = 0
+    batch = {}
+    locations = chain(
+        db.query(Listing.id, Listing.location).yield_per(INDEX_BATCH_SIZE),
+        _archived_favorite_locations(db),
+    )
+    for listing_id, location in locations:
+        batch[listing_id] = location_tokens(location)
+        indexed += 1
+        if len(batch) >= INDEX_BATCH_SIZE:
+            _write_index(db, batch)
+            batch = {}
+    _write_index(db, batch)
+
+    db.commit()
+    _vocabulary_cache["loaded_at"] = 0.0
+    logger.info(f"🔎 Поисковый индекс перестроен: {indexed} объявлений")
+    return indexed
+
+
+def ensure_search_index(db: Session):
+    """Строит индекс, если он пуст, а объявления уже есть (первый запуск после обновления)"""
+    has_words = db.query(ListingSearchToken.listing_id).first() is not None
+    if not has_words and db.query(Listing.id).first() is not None:
+        rebuild_search_index(db)
+
+
+def get_vocabulary(db: Session) -> List[str]:
+    with _vocabulary_lock:
+        if time.monotonic() - _vocabulary_cache["loaded_at"] > VOCABULARY_TTL_SECONDS:
+            _vocabulary_cache["words"] = [word for word, in db.query(SearchVocabulary.word)]
+            _vocabulary_cache["loaded_at"] = time.monotonic()
+        return _vocabulary_cache["words"]
+
+
+def match_vocabulary(db: Session, search: str) -> List[str]:
+    """Токены адресов, похожие хотя бы на одну форму одного из слов запроса"""
+    vocabulary = get_vocabulary(db)
+    matched = set()
+    for search_word in dict.fromkeys(search.split()):
+        for variant in word_variants(search_word):
+            matched.update(
+                word for word, _, _ in process.extract(
+                    variant, vocabulary, scorer=fuzz.partial_ratio,
+                    score_cutoff=MIN_WORD_SCORE, limit=None
+                )
+                # partial_ratio находит и короткий токен внутри слова запроса ("1" в "12") - такие не считаем
+                if len(word) >= min(len(variant), MIN_TOKEN_LENGTH)
+            )
+    return sorted(matched)
+
+
+def apply_search_filter(query, search: str, fields: Optional[Sequence[str]] = None, listing_id=None):
+    """Оставляет в запросе объявления, где хотя бы одно слово поиска похоже на токен адреса
+
+    fields - искать только в этих частях адреса (например, ("metro",)); по умолчанию во всех
+    listing_id - колонка id объявления в запросе (по умолчанию Listing.id, для избранного - Favorite.listing_id)
+    """
+    if listing_id is None:
+        listing_id = Listing.id
+    matched_words = match_vocabulary(query.session, search)
+    if not matched_words:
+        return query.filter(listing_id == None)
+
+    matched_listings = select(ListingSearchToken.listing_id).where(ListingSearchToken.word.in_(matched_words))
+    if fields:
+        matched_listings = matched_listings.where(ListingSearchToken.field.in_(fields))
+    return query.filter(listing_id.in_(matched_listings))
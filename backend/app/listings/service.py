@@ -1,12 +1,17 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import and_
-from app.listings.models import ListingMetadata, ListingHistory
+from sqlalchemy import and_, insert
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from app.listings.models import ListingMetadata, ListingHistory, ListingSearchToken
+from app.listings.stats import invalidate_all_stats
+from app.listings.counts import bump_listings_version, bump_metadata_version
+from app.listings.facets import facet_row, remove_listing_facets
+from app.listings.history import delete_listing_history
 from app.users.models import User
+from app.users.stats_service import delete_listing_assignments, record_assignments
 from datetime import datetime
-from typing import Optional, AsyncGenerator
-import zipfile
-import httpx
+from typing import Optional
 import json
+import uuid
 import logging
 
 logger = logging.getLogger(__name__)
@@ -15,25 +20,6 @@ def get_company_id(user: User) -> str:
     """Получить ID компании (админа группы)"""
     return str(user.created_by) if user.created_by else str(user.id)
 
-def get_or_create_metadata(db: Session, listing_id: str, company_id: str) -> ListingMetadata:
-    """Получить или создать метаданные для объявления"""
-    metadata = db.query(ListingMetadata).filter(
-        ListingMetadata.listing_id == listing_id,
-        ListingMetadata.company_id == company_id
-    ).first()
-    
-    if not metadata:
-        metadata = ListingMetadata(
-            listing_id=listing_id,
-            company_id=company_id,
-            status="new"
-        )
-        db.add(metadata)
-        db.commit()
-        db.refresh(metadata)
-    
-    return metadata
-
 def update_metadata(
     db: Session, 
     listing_id: str, 
@@ -41,42 +27,106 @@ def update_metadata(
     user_id: str, 
     responsible_user_id: Optional[str] = None,
     status: Optional[str] = None
-) -> ListingMetadata:
-    """Обновить метаданные объявления"""
-    metadata = get_or_create_metadata(db, listing_id, company_id)
-    
-    # Сохраняем историю
-    if responsible_user_id is not None and metadata.responsible_user_id != responsible_user_id:
-        history = ListingHistory(
-            listing_id=listing_id,
-            company_id=company_id,
-            user_id=user_id,
-            action="assigned",
-            old_value=metadata.responsible_user_id,
-            new_value=responsible_user_id
-        )
-        db.add(history)
-        metadata.responsible_user_id = responsible_user_id
-    
-    if status is not None and metadata.status != status:
-        history = ListingHistory(
-            listing_id=listing_id,
-            company_id=company_id,
-            user_id=user_id,
-            action="status_changed",
-            old_value=metadata.status,
-            new_value=status
+) -> Optional[ListingMetadata]:
+    """Обновить метаданные объявления. None - объявления нет в listings (осталось только в избранном)
+    
+    Тот же путь, что и у пачки: один UPSERT по (listing_id, company_id) и один коммит
+    """
+    updated, _ = update_metadata_bulk(
+        db, [listing_id], company_id, user_id, responsible_user_id=responsible_user_id, status=status
+    )
+    return updated[0] if updated else None
+
+def _upsert_metadata(db: Session, rows: list[dict], update_fields: list[str]):
+    """INSERT ... ON CONFLICT (listing_id, company_id) DO UPDATE только для update_fields"""
+    dialect = db.get_bind().dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+        statement = insert(ListingMetadata).values(rows)
+        statement = statement.on_conflict_do_update(
+            index_elements=[ListingMetadata.listing_id, ListingMetadata.company_id],
+            set_={field: statement.excluded[field] for field in update_fields},
         )
-        db.add(history)
-        metadata.status = status
+    else:
+        statement = mysql.insert(ListingMetadata).values(rows)
+        statement = statement.on_duplicate_key_update({field: statement.inserted[field] for field in update_fields})
+    db.execute(statement)
+
+def update_metadata_bulk(
+    db: Session,
+    listing_ids: list[str],
+    company_id: str,
+    user_id: str,
+    responsible_user_id: Optional[str] = None,
+    status: Optional[str] = None
+) -> tuple[list[ListingMetadata], list[str]]:
+    """Обновить метаданные нескольких объявлений одной транзакцией
     
-    metadata.updated_by = user_id
-    metadata.updated_at = datetime.utcnow()
+    Текущие метаданные читаются одним запросом, записываются одним UPSERT,
+    история - одним INSERT. Возвращает (метаданные, id отсутствующих объявлений)
+    """
+    from app.parsers.models import Listing
+    
+    listing_ids = list(dict.fromkeys(listing_ids))
+    current = {
+        listing_id: metadata for listing_id, metadata in db.query(Listing.id, ListingMetadata).outerjoin(
+            ListingMetadata,
+            and_(ListingMetadata.listing_id == Listing.id, ListingMetadata.company_id == company_id)
+        ).filter(Listing.id.in_(listing_ids)).all()
+    }
+    not_found = [listing_id for listing_id in listing_ids if listing_id not in current]
+    found_ids = [listing_id for listing_id in listing_ids if listing_id in current]
+    if not found_ids:
+        return [], not_found
+    
+    now = datetime.utcnow()
+    history = []
+    assigned_ids = []
+    for listing_id in found_ids:
+        metadata = current[listing_id]
+        old_responsible = metadata.responsible_user_id if metadata else None
+        old_status = metadata.status if metadata else "new"
+        if responsible_user_id is not None and old_responsible != responsible_user_id:
+            assigned_ids.append(listing_id)
+            history.append({"action": "assigned", "old_value": old_responsible, "new_value": responsible_user_id,
+                            "listing_id": listing_id})
+        if status is not None and old_status != status:
+            history.append({"action": "status_changed", "old_value": old_status, "new_value": status,
+                            "listing_id": listing_id})
+    
+    if history:
+        db.execute(insert(ListingHistory), [
+            {"id": str(uuid.uuid4()), "company_id": company_id, "user_id": user_id, "comment": None,
+             "created_at": now, **row}
+            for row in history
+        ])
+    record_assignments(db, assigned_ids, responsible_user_id, company_id, now)
+    
+    # Новые записи - со статусом "new", если он не задан; существующие меняют только заданные поля
+    update_fields = ["updated_by", "updated_at"]
+    if responsible_user_id is not None:
+        update_fields.append("responsible_user_id")
+    if status is not None:
+        update_fields.append("status")
+    _upsert_metadata(db, [
+        {
+            "id": str(uuid.uuid4()),
+            "listing_id": listing_id,
+            "company_id": company_id,
+            "responsible_user_id": responsible_user_id,
+            "status": status or "new",
+            "updated_by": user_id,
+            "created_at": now,
+            "updated_at": now,
+        }
+        for listing_id in found_ids
+    ], update_fields)
     
     db.commit()
-    db.refresh(metadata)
+    bump_metadata_version(company_id)
     
-    return metadata
+    metadatas = get_metadata_for_listings(db, found_ids, company_id)
+    return [metadatas[listing_id] for listing_id in found_ids], not_found
 
 def get_metadata_for_listings(db: Session, listing_ids: list[str], company_id: str) -> dict:
     """Получить метаданные для списка объявлений"""
@@ -87,50 +137,29 @@ def get_metadata_for_listings(db: Session, listing_ids: list[str], company_id: s
     
     return {m.listing_id: m for m in metadatas}
 
-async def generate_photos_zip(images: list[str], listing_id: str) -> AsyncGenerator[bytes, None]:
-    """Генератор для потоковой отправки ZIP с фотографиями"""
-    class ZipStream:
-        def __init__(self):
-            self.buffer = bytearray()
-        
-        def write(self, data):
-            self.buffer.extend(data)
-            return len(data)
-        
-        def flush(self):
-            pass
-    
-    stream = ZipStream()
-    
-    with zipfile.ZipFile(stream, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-        async with httpx.AsyncClient(timeout=30.0, limits=httpx.Limits(max_connections=5)) as client:
-            for idx, image_url in enumerate(images[:20], 1):
-                try:
-                    response = await client.get(image_url)
-                    if response.status_code == 200:
-                        ext = image_url.split('.')[-1].split('?')[0][:4] or 'jpg'
-                        zip_file.writestr(f"photo_{idx}.{ext}", response.content)
-                        
-                        if len(stream.buffer) >= 1024 * 1024:
-                            yield bytes(stream.buffer)
-                            stream.buffer.clear()
-                except Exception as e:
-                    logger.error(f"Failed to download image {idx}: {e}")
-                    continue
-    
-    if stream.buffer:
-        yield bytes(stream.buffer)
-
 def get_listing_images(db: Session, listing_id: str) -> list[str]:
-    """Получить список URL фотографий объявления"""
-    from app.parsers.models import Listing
+    """Получить список URL фотографий объявления
     
-    listing = db.query(Listing).filter(Listing.id == listing_id).first()
-    if not listing or not listing.images:
+    Удаленное очисткой объявление могло остаться в избранном - тогда фото берутся из снимка
+    """
+    from app.parsers.models import Listing
+    from app.favorites.models import Favorite
+    
+    listing = db.query(Listing.images).filter(Listing.id == listing_id).first()
+    images = listing.images if listing else None
+    if not listing:
+        snapshot = db.query(Favorite.listing_snapshot).filter(
+            Favorite.listing_id == listing_id, Favorite.listing_snapshot.isnot(None)
+        ).order_by(Favorite.listing_created_at.desc()).limit(1).scalar()
+        try:
+            images = json.loads(snapshot).get("images") if snapshot else None
+        except ValueError:
+            images = None
+    if not images:
         return []
     
     try:
-        return json.loads(listing.images) if isinstance(listing.images, str) else listing.images
+        return json.loads(images) if isinstance(images, str) else images
     except:
         return []
 
@@ -145,11 +174,9 @@ def delete_listing_metadata(db: Session, listing_id: str, company_id: str, user_
         ListingMetadata.company_id == company_id
     ).delete()
     
-    # Удаляем историю
-    db.query(ListingHistory).filter(
-        ListingHistory.listing_id == listing_id,
-        ListingHistory.company_id == company_id
-    ).delete()
+    # Удаляем историю (и ее архив) и назначения для статистики сотрудников
+    delete_listing_history(db, listing_id, company_id)
+    delete_listing_assignments(db, listing_id, company_id)
     
     # Удаляем из аренды
     db.query(RentListing).filter(
@@ -159,8 +186,15 @@ def delete_listing_metadata(db: Session, listing_id: str, company_id: str, user_
     
     # Удаляем само объявление
     listing = db.query(Listing).filter(Listing.id == listing_id).first()
+    deleted_facets = []
     if listing:
+        deleted_facets.append(facet_row(listing))
         db.delete(listing)
+        db.query(ListingSearchToken).filter(ListingSearchToken.listing_id == listing_id).delete()
     
     db.commit()
+    # Объявление могло быть в избранном и аренде других пользователей
+    invalidate_all_stats()
+    remove_listing_facets(deleted_facets)
+    bump_listings_version()
     return True
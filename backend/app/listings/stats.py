@@ -0,0 +1,168 @@
+"""
+Максимальные цена и площадь для слайдеров фильтров
+
+Раньше /listings, /favorites и /rent на каждый запрос сортировали всю таблицу
+(или выборку) по price и total_meters. Теперь максимумы хранятся в Redis
+(хэш с полями max_price и max_meters) отдельно для всех объявлений, избранного
+пользователя и аренды компании:
+- при чтении пустой ключ считается одним запросом MAX() и кэшируется;
+- добавление (парсер, избранное, аренда) только поднимает максимум, если ключ уже есть;
+- удаление (очистка старых объявлений, удаление из избранного/аренды) сбрасывает ключ,
+  и максимум пересчитывается при следующем чтении.
+Если Redis недоступен, значения считаются запросом к БД.
+"""
+
+import logging
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+import redis
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.favorites.models import Favorite
+from app.parsers.models import Listing
+from app.rent.models import RentListing
+from app.services.redis_service import redis_client
+
+logger = logging.getLogger(__name__)
+
+STATS_KEY_PREFIX = "listing_stats"
+# Страховка от пропущенного сброса: ключ все равно пересчитается раз в STATS_TTL_SECONDS
+STATS_TTL_SECONDS = 3600
+
+Stats = Tuple[Optional[float], Optional[float]]
+
+
+def _listings_key() -> str:
+    return f"{STATS_KEY_PREFIX}:listings"
+
+
+def _favorites_key(user_id: str) -> str:
+    return f"{STATS_KEY_PREFIX}:favorites:{user_id}"
+
+
+def _rent_key(company_id: str) -> str:
+    return f"{STATS_KEY_PREFIX}:rent:{company_id}"
+
+
+def _to_float(value: Optional[str]) -> Optional[float]:
+    return float(value) if value else None
+
+
+def _get_cached(key: str, compute: Callable[[], Stats]) -> Stats:
+    try:
+        cached = redis_client.hgetall(key)
+    except redis.exceptions.RedisError as e:
+        logger.warning(f"⚠️ Статистика {key} недоступна в Redis: {e}")
+        return compute()
+
+    if cached:
+        return _to_float(cached.get("max_price")), _to_float(cached.get("max_meters"))
+
+    max_price, max_meters = compute()
+    try:
+        pipe = redis_client.pipeline()
+        pipe.hset(key, mapping={"max_price": max_price or "", "max_meters": max_meters or ""})
+        pipe.expire(key, STATS_TTL_SECONDS)
+        pipe.execute()
+    except redis.exceptions.RedisError as e:
+        logger.warning(f"⚠️ Не удалось сохранить статистику {key}: {e}")
+    return max_price, max_meters
+
+
+def _raise_cached(key: str, values: Dict[str, Optional[float]]):
+    """Поднимает максимумы в уже посчитанном ключе (WATCH, чтобы параллельные записи не затирали друг друга)"""
+    def update(pipe):
+        current = pipe.hgetall(key)
+        pipe.multi()
+        if not current:
+            return  # еще не считали - посчитается при чтении
+        changes = {
+            field: value for field, value in values.items()
+            if value is not None and (not current.get(field) or value > float(current[field]))
+        }
+        if changes:
+            pipe.hset(key, mapping=changes)
+
+    try:
+        redis_client.transaction(update, key)
+    except redis.exceptions.RedisError as e:
+        logger.warning(f"⚠️ Не удалось обновить статистику {key}, сбрасываем: {e}")
+        _invalidate(key)
+
+
+def _invalidate(*keys: str):
+    try:
+        redis_client.delete(*keys)
+    except redis.exceptions.RedisError as e:
+        logger.warning(f"⚠️ Не удалось сбросить статистику {keys}: {e}")
+
+
+def get_listing_stats(db: Session) -> Stats:
+    """Максимальные цена и площадь по всем объявлениям"""
+    return _get_cached(_listings_key(), lambda: tuple(
+        db.query(func.max(Listing.price), func.max(Listing.total_meters)).one()
+    ))
+
+
+def get_favorite_stats(db: Session, user_id: str) -> Stats:
+    """Максимальные цена и площадь по избранному пользователя (из снимков в favorites)"""
+    # Избранное без снимка в выдачу /favorites не попадает - и в максимумы тоже
+    return _get_cached(_favorites_key(user_id), lambda: tuple(
+        db.query(func.max(Favorite.price), func.max(Favorite.total_meters))
+        .filter(Favorite.user_id == user_id, Favorite.listing_snapshot.isnot(None))
+        .one()
+    ))
+
+
+def get_rent_stats(db: Session, company_id: str) -> Stats:
+    """Максимальные цена аренды и площадь по аренде компании"""
+    def compute():
+        max_price = db.query(func.max(RentListing.rent_price)).filter(RentListing.company_id == company_id).scalar()
+        max_meters = db.query(func.max(Listing.total_meters)).filter(
+            Listing.id.in_(db.query(RentListing.listing_id).filter(RentListing.company_id == company_id))
+        ).scalar()
+        return max_price, max_meters
+    return _get_cached(_rent_key(company_id), compute)
+
+
+def raise_listing_stats(listings: Iterable[Listing]):
+    """Учитывает новые объявления парсера"""
+    listings = list(listings)
+    if listings:
+        _raise_cached(_listings_key(), {
+            "max_price": max((l.price for l in listings if l.price is not None), default=None),
+            "max_meters": max((l.total_meters for l in listings if l.total_meters is not None), default=None),
+        })
+
+
+def raise_favorite_stats(user_id: str, listing: Optional[Listing]):
+    if listing is not None:
+        _raise_cached(_favorites_key(user_id), {"max_price": listing.price, "max_meters": listing.total_meters})
+
+
+def raise_rent_stats(company_id: str, rent_price: Optional[float], total_meters: Optional[float]):
+    _raise_cached(_rent_key(company_id), {"max_price": rent_price, "max_meters": total_meters})
+
+
+def invalidate_listing_stats():
+    _invalidate(_listings_key())
+
+
+def invalidate_favorite_stats(user_id: str):
+    _invalidate(_favorites_key(user_id))
+
+
+def invalidate_rent_stats(company_id: str):
+    _invalidate(_rent_key(company_id))
+
+
+def invalidate_all_stats():
+    """Сбрасывает все ключи статистики (объявление удалено целиком и могло быть в чужом избранном)"""
+    try:
+        keys = list(redis_client.scan_iter(match=f"{STATS_KEY_PREFIX}:*"))
+    except redis.exceptions.RedisError as e:
+        logger.warning(f"⚠️ Не удалось сбросить статистику: {e}")
+        return
+    if keys:
+        _invalidate(*keys)
@@ -2,11 +2,15 @@ import logging
 from fastapi import FastAPI, Depends, HTTPException, WebSocket, WebSocketDisconnect, Query
 from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy.orm import Session
-from app.db import Base, engine, get_db
+from app.db import get_db, SessionLocal, upgrade_database
 from app.core.config import settings
 from app.parsers.models import Listing, ListingResponse, PaginatedListingsResponse
 from app.favorites.models import Favorite
-from app.favorites.service import get_paginated_listings, get_favorite_listings
+from app.favorites.service import (
+    get_paginated_listings, get_favorite_listings, add_favorites, remove_favorites, mark_favorites_viewed,
+    FAVORITES_BATCH_LIMIT,
+)
+from app.favorites.counters import get_new_count
 from app.websocket_manager import websocket_manager
 from app.auth.routes import router as auth_router
 from app.api.test_protected import router as protected_router
@@ -17,9 +21,14 @@ from app.rent.routes import router as rent_router
 from app.users.stats_routes import router as stats_router
 from app.auth.utils import get_current_user
 from app.users.models import User
+from app.listings.search import ensure_search_index
+from app.listings.responses import listing_page_response
+from app.listings.photos import close_photo_client
 
 # === Инициализация ===
-Base.metadata.create_all(bind=engine)
+upgrade_database()
+with SessionLocal() as _db:
+    ensure_search_index(_db)
 app = FastAPI()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -49,12 +58,15 @@ app.include_router(stats_router)
 @app.on_event("shutdown")
 async def on_shutdown():
     logger.info("⏹ Завершение работы приложения")
+    await close_photo_client()
 
 
 # === Эндпоинты ===
 @app.get("/listings", response_model=PaginatedListingsResponse)
 def get_listings(
     page: int = 1,
+    cursor: str = None,
+    count: str = Query("exact", pattern="^(exact|estimate)$"),
     deal_type: str = None,
     source: str = None,
     rooms_count: str = None,
@@ -68,8 +80,7 @@ def get_listings(
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    from app.listings.service import get_company_id, get_metadata_for_listings
-    from app.rent.models import RentListing
+    from app.listings.service import get_company_id
     
     company_id = get_company_id(current_user)
     filters = {
@@ -79,33 +90,21 @@ def get_listings(
         'search': search, 'status': status, 'responsible': responsible,
         'company_id': company_id
     }
-    listings, total, total_pages, current_filters, stats = get_paginated_listings(db, page, **filters)
-    
-    listing_ids = [l.id for l in listings]
-    metadata_map = get_metadata_for_listings(db, listing_ids, company_id)
-    
-    # Проверить какие листинги в аренде
-    rent_listings = db.query(RentListing.listing_id).filter(
-        RentListing.listing_id.in_(listing_ids),
-        RentListing.company_id == company_id
-    ).all()
-    rent_listing_ids = {rl.listing_id for rl in rent_listings}
-    
-    # Добавить метаданные к объявлениям
-    for listing in listings:
-        metadata = metadata_map.get(listing.id)
-        listing.responsible = metadata.responsible_user_id if metadata else None
-        listing.status = metadata.status if metadata else "new"
-        listing.is_in_rent = listing.id in rent_listing_ids
+    listings, total, total_pages, current_filters, stats, next_cursor, total_is_estimate = get_paginated_listings(
+        db, page, cursor=cursor, count_mode=count, **filters
+    )
     
-    return PaginatedListingsResponse(
-        items=listings,
+    # Сериализация строк через orjson; response_model остается для схемы OpenAPI
+    return listing_page_response(
+        listings,
         total=total,
         page=page,
         per_page=10,
         total_pages=total_pages,
         filters=current_filters,
-        stats=stats
+        stats=stats,
+        next_cursor=next_cursor,
+        total_is_estimate=total_is_estimate
     )
 
 
@@ -144,6 +143,7 @@ def get_parser_status():
 @app.get("/favorites", response_model=PaginatedListingsResponse)
 def get_favorites(
     page: int = 1,
+    cursor: str = None,
     deal_type: str = None,
     source: str = None,
     rooms_count: str = None,
@@ -157,8 +157,7 @@ def get_favorites(
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    from app.listings.service import get_company_id, get_metadata_for_listings
-    from app.rent.models import RentListing
+    from app.listings.service import get_company_id
     
     company_id = get_company_id(current_user)
     filters = {
@@ -168,35 +167,20 @@ def get_favorites(
         'search': search, 'status': status, 'responsible': responsible,
         'company_id': company_id
     }
-    listings, total, total_pages, current_filters, stats = get_favorite_listings(db, str(current_user.id), page, **filters)
-    
-    listing_ids = [l.id for l in listings]
-    metadata_map = get_metadata_for_listings(db, listing_ids, company_id)
-    
-    # Проверить какие листинги в аренде
-    rent_listings = db.query(RentListing.listing_id).filter(
-        RentListing.listing_id.in_(listing_ids),
-        RentListing.company_id == company_id
-    ).all()
-    rent_listing_ids = {rl.listing_id for rl in rent_listings}
-    
-    # Добавить метаданные к объявлениям
-    for listing in listings:
-        metadata = metadata_map.get(listing.id)
-        listing.responsible = metadata.responsible_user_id if metadata else None
-        listing.status = metadata.status if metadata else "new"
-        listing.is_in_rent = listing.id in rent_listing_ids
+    listings, total, total_pages, current_filters, stats, next_cursor, _ = get_favorite_listings(
+        db, str(current_user.id), page, cursor=cursor, **filters
+    )
     
-    db.query(Favorite).filter(Favorite.user_id == str(current_user.id), Favorite.is_new == True).update({"is_new": False})
-    db.commit()
-    return PaginatedListingsResponse(
-        items=listings,
+    mark_favorites_viewed(db, str(current_user.id))
+    return listing_page_response(
+        listings,
         total=total,
         page=page,
         per_page=10,
         total_pages=total_pages,
         filters=current_filters,
-        stats=stats
+        stats=stats,
+        next_cursor=next_cursor
     )
 
 
@@ -248,7 +232,13 @@ async def websocket_endpoint(websocket: WebSocket, token: str = Query(None)):
 
 
 @app.websocket("/ws/favorites")
-async def favorites_websocket(websocket: WebSocket, token: str = Query(...), db: Session = Depends(get_db)):
+async def favorites_websocket(websocket: WebSocket, token: str = Query(...)):
+    """Избранное по WebSocket
+
+    Действия: add / remove (listing_id), add_many / remove_many (listing_ids, до FAVORITES_BATCH_LIMIT),
+    list, count_new, mark_viewed. На каждое сообщение - своя короткая сессия БД (соединение из пула
+    не держится, пока сокет открыт), счетчик новых берется из Redis (app/favorites/counters.py)
+    """
     await websocket.accept()
     
     # Аутентификация пользователя
@@ -257,7 +247,8 @@ async def favorites_websocket(websocket: WebSocket, token: str = Query(...), db:
         payload = verify_token(token)
         email = payload.get("sub")
         from app.users.models import User
-        user = db.query(User).filter(User.email == email).first()
+        with SessionLocal() as db:
+            user = db.query(User).filter(User.email == email).first()
         if not user:
             await websocket.close(code=1008)
             return
@@ -272,85 +263,50 @@ async def favorites_websocket(websocket: WebSocket, token: str = Query(...), db:
             data = await websocket.receive_json()
             action = data.get('action')
             listing_id = data.get('listing_id')
+            listing_ids = data.get('listing_ids') or []
+
+            if action in ('add_many', 'remove_many') and len(listing_ids) > FAVORITES_BATCH_LIMIT:
+                await websocket.send_json({"status": "error", "action": action,
+                                           "detail": f"Too many listing_ids (max {FAVORITES_BATCH_LIMIT})"})
+                continue
+
+            with SessionLocal() as db:
+                if action == 'add':
+                    added, _ = add_favorites(db, user_id, [listing_id])
+                    if added:
+                        await websocket.send_json({"status": "added", "listing_id": listing_id,
+                                                   "new_count": get_new_count(db, user_id)})
+                    else:
+                        await websocket.send_json({"status": "already_exists", "listing_id": listing_id})
+
+                elif action == 'add_many':
+                    added, existing = add_favorites(db, user_id, listing_ids)
+                    await websocket.send_json({"status": "added_many", "added": added, "already_exists": existing,
+                                               "new_count": get_new_count(db, user_id)})
 
-            if action == 'add':
-                existing = db.query(Favorite).filter(
-                    Favorite.listing_id == listing_id,
-                    Favorite.user_id == user_id
-                ).first()
-                if not existing:
-                    # Получить полные данные листинга для создания snapshot
-                    listing = db.query(Listing).filter(Listing.id == listing_id).first()
-                    
-                    # Создать JSON снимок всех данных листинга
-                    snapshot = None
-                    if listing:
-                        import json
-                        snapshot = json.dumps({
-                            "deal_type": listing.deal_type,
-                            "price": listing.price,
-                            "total_meters": listing.total_meters,
-                            "floor": listing.floor,
-                            "location": listing.location,
-                            "source": listing.source,
-                            "url": listing.url,
-                            "phone_number": listing.phone_number,
-                            "rooms_count": listing.rooms_count,
-                            "home_type": listing.home_type,
-                            "images": listing.images,
-                            "created_at": listing.created_at.isoformat() if listing.created_at else None
-                        }, ensure_ascii=False)
-                    
-                    new_favorite = Favorite(
-                        listing_id=listing_id, 
-                        user_id=user_id,
-                        listing_snapshot=snapshot
-                    )
-                    db.add(new_favorite)
-                    db.commit()
-                    new_count = db.query(Favorite).filter(
-                        Favorite.user_id == user_id,
-                        Favorite.is_new == True
-                    ).count()
-                    await websocket.send_json({"status": "added", "listing_id": listing_id, "new_count": new_count})
-                else:
-                    await websocket.send_json({"status": "already_exists", "listing_id": listing_id})
+                elif action == 'remove':
+                    removed, _ = remove_favorites(db, user_id, [listing_id])
+                    if removed:
+                        await websocket.send_json({"status": "removed", "listing_id": listing_id,
+                                                   "new_count": get_new_count(db, user_id)})
+                    else:
+                        await websocket.send_json({"status": "not_found", "listing_id": listing_id})
 
-            elif action == 'remove':
-                favorite = db.query(Favorite).filter(
-                    Favorite.listing_id == listing_id,
-                    Favorite.user_id == user_id
-                ).first()
-                if favorite:
-                    db.delete(favorite)
-                    db.commit()
-                    new_count = db.query(Favorite).filter(
-                        Favorite.user_id == user_id,
-                        Favorite.is_new == True
-                    ).count()
-                    await websocket.send_json({"status": "removed", "listing_id": listing_id, "new_count": new_count})
-                else:
-                    await websocket.send_json({"status": "not_found", "listing_id": listing_id})
+                elif action == 'remove_many':
+                    removed, not_found = remove_favorites(db, user_id, listing_ids)
+                    await websocket.send_json({"status": "removed_many", "removed": removed, "not_found": not_found,
+                                               "new_count": get_new_count(db, user_id)})
 
-            elif action == 'list':
-                favorites = db.query(Favorite).filter(Favorite.user_id == user_id).all()
-                favorite_ids = [f.listing_id for f in favorites]
-                await websocket.send_json({"status": "list", "favorites": favorite_ids})
+                elif action == 'list':
+                    favorite_ids = [row.listing_id for row in db.query(Favorite.listing_id).filter(Favorite.user_id == user_id)]
+                    await websocket.send_json({"status": "list", "favorites": favorite_ids})
 
-            elif action == 'count_new':
-                new_count = db.query(Favorite).filter(
-                    Favorite.user_id == user_id,
-                    Favorite.is_new == True
-                ).count()
-                await websocket.send_json({"status": "count_new", "count": new_count})
+                elif action == 'count_new':
+                    await websocket.send_json({"status": "count_new", "count": get_new_count(db, user_id)})
 
-            elif action == 'mark_viewed':
-                db.query(Favorite).filter(
-                    Favorite.user_id == user_id,
-                    Favorite.is_new == True
-                ).update({"is_new": False})
-                db.commit()
-                await websocket.send_json({"status": "marked_viewed", "new_count": 0})
+                elif action == 'mark_viewed':
+                    mark_favorites_viewed(db, user_id)
+                    await websocket.send_json({"status": "marked_viewed", "new_count": 0})
 
     except WebSocketDisconnect:
         pass
@@ -1,4 +1,4 @@
-from .cian_adapter import CianAdapter
+from .cian_adapter import CianAdapter, CianSuburbanAdapter, CianNewObjectAdapter
 from .avito_adapter import AvitoAdapter
 
-__all__ = ['CianAdapter', 'AvitoAdapter']
+__all__ = ['CianAdapter', 'CianSuburbanAdapter', 'CianNewObjectAdapter', 'AvitoAdapter']
@@ -128,18 +128,36 @@ class AvitoAdapter(BaseParser):
         )
         print(f"Найдено объявлений аренды: {len(rent_data)}")
         
+        all_listings.extend(self.map_basic_listings(sale_data))
+        all_listings.extend(self.map_basic_listings(rent_data))
+        
+        print(f"Создано {len(all_listings)} объявлений для проверки новизны")
+        return all_listings
+    
+    def map_basic_listings(self, items) -> List[Dict]:
+        """
+        Преобразует объявления парсера Авито в словари для сохранения в БД
+        Пропускает объявления старше 24 часов и без площади
+        
+        Args:
+            items: Список Item из AvitoParser.get_realty
+            
+        Returns:
+            Список объявлений с базовыми данными
+        """
+        from app.vendors.avitoparser.helpers import parse_characteristics_from_text
+        
+        listings = []
+        
         # Фильтруем по времени (только за последние 24 часа)
         cutoff_time = datetime.now().timestamp() * 1000 - (24 * 3600 * 1000)
         
-        # Обрабатываем продажу
-        for item in sale_data:
+        for item in items:
             # Проверяем время публикации (только за последние 24 часа)
             if item.sortTimeStamp and item.sortTimeStamp < cutoff_time:
                 continue
             
             # Парсим характеристики из title и description
-            from app.vendors.avitoparser.helpers import parse_characteristics_from_text
-            
             title = item.title or ""
             description = item.description or ""
             characteristics = parse_characteristics_from_text(title, description)
@@ -170,59 +188,7 @@ class AvitoAdapter(BaseParser):
             if item.priceDetailed and item.priceDetailed.postfix == "в месяц":
                 deal_type = "rent"
 
-            all_listings.append({
-                "deal_type": deal_type,
-                "price": item.priceDetailed.value if item.priceDetailed else 0,
-                "total_meters": characteristics['total_meters'],
-                "floor": characteristics['floor'],
-                "location": location_str,
-                "source": "avito",
-                "url": f"https://www.avito.ru{item.urlPath}" if item.urlPath else "",
-                "rooms_count": characteristics['rooms_count'],
-                "home_type": characteristics['home_type'],
-                "images": json.dumps(images) if images else None
-            })
-        
-        # Обрабатываем аренду
-        for item in rent_data:
-            # Проверяем время публикации (только за последние 24 часа)
-            if item.sortTimeStamp and item.sortTimeStamp < cutoff_time:
-                continue
-            
-            # Парсим характеристики
-            from app.vendors.avitoparser.helpers import parse_characteristics_from_text
-            
-            title = item.title or ""
-            description = item.description or ""
-            characteristics = parse_characteristics_from_text(title, description)
-            
-            # Пропускаем если нет площади
-            if not characteristics['total_meters']:
-                print(f"Пропущено объявление без площади: {title}")
-                continue
-            
-            # Формируем адрес - используем только formattedAddress
-            location_str = "Москва"  # Default
-            if item.geo and item.geo.formattedAddress:
-                location_str = item.geo.formattedAddress
-            
-            # Извлекаем изображения (берем самое большое разрешение)
-            images = []
-            if item.images:
-                for img in item.images:
-                    # Image это RootModel, нужно использовать .root для доступа к dict
-                    img_dict = img.root if hasattr(img, 'root') else img
-                    # Приоритет: 864x864 > 636x636 > 472x472
-                    img_url = img_dict.get("864x864") or img_dict.get("636x636") or img_dict.get("472x472")
-                    if img_url:
-                        images.append(str(img_url))
-            
-            # Определение типа сделки по постфиксу цены
-            deal_type = "sale"
-            if item.priceDetailed and item.priceDetailed.postfix == "в месяц":
-                deal_type = "rent"
-
-            all_listings.append({
+            listings.append({
                 "deal_type": deal_type,
                 "price": item.priceDetailed.value if item.priceDetailed else 0,
                 "total_meters": characteristics['total_meters'],
@@ -235,8 +201,7 @@ class AvitoAdapter(BaseParser):
                 "images": json.dumps(images) if images else None
             })
         
-        print(f"Создано {len(all_listings)} объявлений для проверки новизны")
-        return all_listings
+        return listings
     
     def fetch_listings(self) -> List[Dict]:
         """
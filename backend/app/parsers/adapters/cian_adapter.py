@@ -1,26 +1,72 @@
-from typing import List, Dict
+from typing import List, Dict, Optional
+from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor
 import os
 import json
+import queue
 import app.vendors.cianparser as cianparser
 from app.parsers.base import BaseParser
 from app.core.config import settings
 
+
+@dataclass(frozen=True)
+class CianCrawlShard:
+    """Один шард обхода: регион × тип сделки × группа комнат"""
+    region: str
+    deal_type: str
+    rooms: tuple
+
+
+def _split_setting(value: str, separator: str = ",") -> List[str]:
+    return [part.strip() for part in value.split(separator) if part.strip()]
+
+
+def build_cian_crawl_plan(
+    regions: Optional[List[str]] = None,
+    deal_types: Optional[List[str]] = None,
+    room_groups: Optional[List[tuple]] = None,
+) -> List[CianCrawlShard]:
+    """
+    Строит план обхода Циан из настроек (CIAN_REGIONS, CIAN_DEAL_TYPES, CIAN_ROOM_GROUPS)
+    Регионы проверяются по словарю id регионов, который строится один раз при импорте парсера
+    """
+    regions = regions or _split_setting(settings.CIAN_REGIONS)
+    deal_types = deal_types or _split_setting(settings.CIAN_DEAL_TYPES)
+    if room_groups is None:
+        room_groups = [
+            tuple(int(room) if room.isdigit() else room for room in _split_setting(group))
+            for group in _split_setting(settings.CIAN_ROOM_GROUPS, ";")
+        ]
+
+    for region in regions:
+        if cianparser.get_location_id(region) is None:
+            raise ValueError(f"Неизвестный регион Циан: {region}. См. cianparser.list_locations()")
+
+    return [
+        CianCrawlShard(region=region, deal_type=deal_type, rooms=rooms)
+        for region in regions
+        for deal_type in deal_types
+        for rooms in room_groups
+    ]
+
+
 class CianAdapter(BaseParser):
     def __init__(self, location: str = "Москва"):
+        proxies = _split_setting(settings.CIAN_PROXIES)
+        # Запуск браузера сериализован внутри парсера (DRIVER_START_LOCK в vendors/cianparser/cianparser.py)
         self.parser = cianparser.CianParser(
             location=location, 
+            proxies=proxies or None,
             headless=settings.PARSER_HEADLESS
         )
+        self.location = location
     
     def close_browser(self):
-        """Принудительно закрывает браузер"""
-        if hasattr(self.parser, '__driver__') and self.parser.__driver__:
-            try:
-                self.parser.__driver__.quit()
-            except Exception as e:
-                print(f"Ошибка при закрытии браузера: {e}")
-            finally:
-                self.parser.__driver__ = None
+        """Принудительно закрывает браузер и фоновую проверку прокси"""
+        try:
+            self.parser.close_browser()
+        except Exception as e:
+            print(f"Ошибка при закрытии браузера: {e}")
         
     def parse_extra_data_for_listings(self, listings: List[Dict]) -> List[Dict]:
         """
@@ -78,30 +124,42 @@ class CianAdapter(BaseParser):
                 
         return enhanced_listings
 
-    def fetch_basic_listings(self) -> List[Dict]:
+    def fetch_basic_listings(self, plan: Optional[List[CianCrawlShard]] = None) -> List[Dict]:
         """
         Получает базовые данные объявлений БЕЗ дополнительной информации со страниц
-        Парсит как продажу, так и аренду
+        Обходит все шарды плана (по умолчанию из настроек: регионы × продажа/аренда × группы комнат)
+        При CIAN_CRAWL_WORKERS > 1 шарды раздаются нескольким браузерам параллельно
         """
+        plan = plan if plan is not None else build_cian_crawl_plan()
+        workers = max(1, min(settings.CIAN_CRAWL_WORKERS, len(plan)))
+
+        if workers == 1:
+            shard_listings = []
+            for shard in plan:
+                shard_listings.extend(self.fetch_shard(shard))
+        else:
+            shard_listings = self._fetch_shards_concurrently(plan, workers)
+
+        # Группы комнат в настройках могут пересекаться - убираем дубли по URL
         all_listings = []
-        
-        # Парсим продажу
-        sale_data = self.parser.get_flats(
-            deal_type="sale", 
-            rooms=[1,2,3,4,5,6,"studio"],
-            additional_settings = {
-                "start_page": 1,
-                "end_page": settings.PARSER_MAX_PAGES,
-                "is_by_homeowner": True,
-                "published_ago": "hour"
-            }
-        )
-        print(f"Найдено объявлений продажи: {len(sale_data)}")
-        
-        # Парсим аренду
-        rent_data = self.parser.get_flats(
-            deal_type="rent_long", 
-            rooms=[1,2,3,4,5,6,"studio"],
+        seen_urls = set()
+        for listing in shard_listings:
+            if listing["url"] in seen_urls:
+                continue
+            seen_urls.add(listing["url"])
+            all_listings.append(listing)
+
+        print(f"Создано {len(all_listings)} объявлений для проверки новизны")
+        return all_listings
+
+    def fetch_shard(self, shard: CianCrawlShard) -> List[Dict]:
+        """Парсит один шард плана на браузере этого адаптера"""
+        self.parser.set_location(shard.region)
+        self.location = shard.region
+
+        data = self.parser.get_flats(
+            deal_type=shard.deal_type, 
+            rooms=list(shard.rooms),
             additional_settings = {
                 "start_page": 1,
                 "end_page": settings.PARSER_MAX_PAGES,
@@ -109,38 +167,73 @@ class CianAdapter(BaseParser):
                 "published_ago": "hour"
             }
         )
-        print(f"Найдено объявлений аренды: {len(rent_data)}")
+        print(f"Найдено объявлений {shard.region} / {shard.deal_type} / {shard.rooms}: {len(data)}")
+        return self.map_basic_listings(data, shard.deal_type)
 
-        # Обрабатываем продажу
-        for item in sale_data:
-            all_listings.append({
-                "deal_type": "sale",
-                "price": item.get("price"),
-                "total_meters": item.get("total_meters"),
-                "floor": f"{item.get('floor')}/{item.get('floors_count')}",
-                "location": f"{item.get('location')}, р-н {item.get('district')}, ул. {item.get('street') or 'неизвестно'}",
-                "source": "cian",
-                "url": item.get("url"),
-                "rooms_count": item.get("rooms_count") if item.get("rooms_count", -1) != -1 else None,
-                "home_type": item.get("home_type")
-            })
-            
-        # Обрабатываем аренду
-        for item in rent_data:
-            all_listings.append({
-                "deal_type": "rent",
-                "price": item.get("price_per_month", item.get("price")),
+    def _fetch_shards_concurrently(self, plan: List[CianCrawlShard], workers: int) -> List[Dict]:
+        """Раздает шарды воркерам, у каждого воркера свой браузер. Этот адаптер - один из воркеров"""
+        shards = queue.Queue()
+        for shard in plan:
+            shards.put(shard)
+
+        def worker(adapter: Optional["CianAdapter"]) -> List[Dict]:
+            own_adapter = adapter is None
+            listings = []
+            try:
+                if own_adapter:
+                    adapter = CianAdapter(location=self.location)
+                while True:
+                    try:
+                        shard = shards.get_nowait()
+                    except queue.Empty:
+                        break
+                    try:
+                        listings.extend(adapter.fetch_shard(shard))
+                    except Exception as e:
+                        print(f"Ошибка при парсинге шарда {shard}: {e}")
+            except Exception as e:
+                print(f"Не удалось запустить воркер Циан: {e}")
+            finally:
+                if own_adapter and adapter is not None:
+                    adapter.close_browser()
+            return listings
+
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="cian-shard") as executor:
+            futures = [executor.submit(worker, self)] + [executor.submit(worker, None) for _ in range(workers - 1)]
+            return [listing for future in futures for listing in future.result()]
+
+    def map_basic_listings(self, items: List[Dict], deal_type: str) -> List[Dict]:
+        """Преобразует результаты get_flats в словари для сохранения в БД"""
+        listings = []
+        for item in items:
+            if deal_type == "sale":
+                price = item.get("price")
+            else:
+                price = item.get("price_per_month", item.get("price"))
+
+            listings.append({
+                "deal_type": "sale" if deal_type == "sale" else "rent",
+                "price": price,
                 "total_meters": item.get("total_meters"),
                 "floor": f"{item.get('floor')}/{item.get('floors_count')}",
                 "location": f"{item.get('location')}, р-н {item.get('district')}, ул. {item.get('street') or 'неизвестно'}",
                 "source": "cian",
                 "url": item.get("url"),
                 "rooms_count": item.get("rooms_count") if item.get("rooms_count", -1) != -1 else None,
-                "home_type": item.get("home_type")
+                "home_type": item.get("home_type"),
+                "location_parts": self.location_parts(item)
             })
-            
-        print(f"Создано {len(all_listings)} объявлений для проверки новизны")
-        return all_listings
+        return listings
+
+    @staticmethod
+    def location_parts(item: Dict) -> Dict[str, str]:
+        """Части адреса, разобранные парсером (define_location_data) - для токенов поискового индекса"""
+        return {
+            "street": item.get("street") or "",
+            "district": item.get("district") or "",
+            "metro": item.get("underground") or "",
+            "complex": item.get("residential_complex") or "",
+        }
 
     def fetch_listings(self) -> List[Dict]:
         """
@@ -156,3 +249,150 @@ class CianAdapter(BaseParser):
         print(f"Обработано {len(enhanced_listings)} объявлений с дополнительными данными")
         
         return enhanced_listings
+
+
+class CianSuburbanAdapter(CianAdapter):
+    """Загородная недвижимость Циан (дома, таунхаусы, участки) - отдельная лента со своим расписанием"""
+
+    def fetch_basic_listings(self, plan: Optional[List[CianCrawlShard]] = None) -> List[Dict]:
+        """
+        Получает базовые данные загородных объявлений по регионам из CIAN_REGIONS
+        Типы объектов и сделок берутся из CIAN_SUBURBAN_TYPES и CIAN_SUBURBAN_DEAL_TYPES
+        """
+        all_listings = []
+        seen_urls = set()
+
+        for region in _split_setting(settings.CIAN_REGIONS):
+            self.parser.set_location(region)
+            self.location = region
+
+            for suburban_type in _split_setting(settings.CIAN_SUBURBAN_TYPES):
+                for deal_type in _split_setting(settings.CIAN_SUBURBAN_DEAL_TYPES):
+                    data = self.parser.get_suburban(
+                        suburban_type=suburban_type,
+                        deal_type=deal_type,
+                        additional_settings={
+                            "start_page": 1,
+                            "end_page": settings.CIAN_SUBURBAN_MAX_PAGES,
+                            "is_by_homeowner": True,
+                            "published_ago": "today"
+                        }
+                    )
+                    print(f"Найдено загородных объявлений {region} / {suburban_type} / {deal_type}: {len(data)}")
+
+                    for listing in self.map_suburban_listings(data, deal_type, suburban_type):
+                        if listing["url"] in seen_urls:
+                            continue
+                        seen_urls.add(listing["url"])
+                        all_listings.append(listing)
+
+        print(f"Создано {len(all_listings)} загородных объявлений для проверки новизны")
+        return all_listings
+
+    def map_suburban_listings(self, items: List[Dict], deal_type: str, suburban_type: str) -> List[Dict]:
+        """Преобразует результаты get_suburban в словари для сохранения в БД"""
+        listings = []
+        for item in items:
+            # total_meters - площадь дома. У участка ее нет: остается -1 (не указана),
+            # площадь участка в total_meters не пишем - иначе она попадает в фильтры по площади
+            total_meters = item.get("total_meters", -1)
+            if total_meters is None or total_meters <= 0:
+                if suburban_type != "land-plot":
+                    # Пропускаем дом без площади (обязательное поле)
+                    continue
+                total_meters = -1
+
+            if deal_type == "sale":
+                price = item.get("price")
+            else:
+                price = item.get("price_per_month", item.get("price"))
+            if price is None or price <= 0:
+                continue
+
+            address_parts = [item.get("location")]
+            if item.get("district"):
+                address_parts.append(item.get("district"))
+            if item.get("street"):
+                address_parts.append(item.get("street"))
+            if item.get("house_number"):
+                address_parts.append(item.get("house_number"))
+
+            listings.append({
+                "deal_type": "sale" if deal_type == "sale" else "rent",
+                "price": price,
+                "total_meters": total_meters,
+                "floor": None,
+                "location": ", ".join(address_parts),
+                "source": "cian",
+                "url": item.get("url"),
+                "rooms_count": None,
+                "home_type": suburban_type,
+                "location_parts": self.location_parts(item)
+            })
+        return listings
+
+    def parse_extra_data_for_listings(self, listings: List[Dict]) -> List[Dict]:
+        """Страницы загородных объявлений FlatPageParser не разбирает - телефон и фото не собираем"""
+        return [dict(listing, phone_number=None, images=None) for listing in listings]
+
+
+class CianNewObjectAdapter(CianAdapter):
+    """Новостройки Циан (карточки ЖК) - отдельная лента со своим расписанием"""
+
+    def fetch_basic_listings(self, plan: Optional[List[CianCrawlShard]] = None) -> List[Dict]:
+        """
+        Получает карточки ЖК по регионам из CIAN_REGIONS
+        Страницы сайтов ЖК не открываются: цена и площадь "от" берутся из карточки списка
+        """
+        all_listings = []
+        seen_urls = set()
+
+        for region in _split_setting(settings.CIAN_REGIONS):
+            self.parser.set_location(region)
+            self.location = region
+
+            data = self.parser.get_newobjects(
+                with_extra_data=False,
+                additional_settings={
+                    "start_page": 1,
+                    "end_page": settings.CIAN_NEWOBJECTS_MAX_PAGES
+                }
+            )
+            print(f"Найдено ЖК {region}: {len(data)}")
+
+            for listing in self.map_newobject_listings(data):
+                if listing["url"] in seen_urls:
+                    continue
+                seen_urls.add(listing["url"])
+                all_listings.append(listing)
+
+        print(f"Создано {len(all_listings)} объявлений новостроек для проверки новизны")
+        return all_listings
+
+    def map_newobject_listings(self, items: List[Dict]) -> List[Dict]:
+        """Преобразует результаты get_newobjects в словари для сохранения в БД"""
+        listings = []
+        for item in items:
+            price = item.get("price_from", -1)
+            total_meters = item.get("total_meters_from", -1)
+            # Без цены и площади карточку в ленту объявлений не добавляем
+            if price <= 0 or total_meters <= 0:
+                continue
+
+            listings.append({
+                "deal_type": "sale",
+                "price": price,
+                "total_meters": total_meters,
+                "floor": None,
+                "location": f"{item.get('location')}, {item.get('name')}, {item.get('full_full_location_address')}",
+                "source": "cian",
+                "url": item.get("url"),
+                "rooms_count": None,
+                "home_type": "newobject",
+                "location_parts": {"complex": item.get("name") or ""}
+            })
+        return listings
+
+    def parse_extra_data_for_listings(self, listings: List[Dict]) -> List[Dict]:
+        """Для ЖК страницы объявления нет - телефон и фото не собираем"""
+        return [dict(listing, phone_number=None, images=None) for listing in listings]
@@ -1,15 +1,143 @@
 from datetime import datetime, timedelta
 from sqlalchemy.orm import Session
+import json
 from .models import Listing
-from app.parsers.adapters.cian_adapter import CianAdapter
+from app.parsers.adapters.cian_adapter import CianAdapter, CianSuburbanAdapter, CianNewObjectAdapter
 from app.parsers.adapters.avito_adapter import AvitoAdapter
 from app.websocket_manager import websocket_manager
 from app.services.redis_service import acquire_parser_lock, release_parser_lock, is_parser_locked
+from app.listings.search import index_listings, prune_search_index
+from app.listings.stats import raise_listing_stats, invalidate_listing_stats
+from app.listings.counts import bump_listings_version
+from app.listings.facets import add_listing_facets, facet_columns, remove_listing_facets
 import logging
 import asyncio
 
 logger = logging.getLogger(__name__)
 
+# Дополнительные ленты Циан со своим расписанием: имя ленты -> (адаптер, описание для логов)
+CIAN_FEEDS = {
+    "cian_suburban": (CianSuburbanAdapter, "ЦИАН ЗАГОРОДНАЯ"),
+    "cian_newobjects": (CianNewObjectAdapter, "ЦИАН НОВОСТРОЙКИ"),
+}
+
+
+def filter_new_listings(db: Session, items: list) -> list:
+    """Оставляет только объявления, которых еще нет в БД (по типу сделки, цене, площади, адресу и источнику)"""
+    new_items = []
+    for item in items:
+        exists = db.query(Listing).filter(
+            Listing.deal_type == item["deal_type"],
+            Listing.price == item["price"],
+            Listing.total_meters == item["total_meters"],
+            Listing.location == item["location"],
+            Listing.source == item["source"]
+        ).first()
+        if not exists:
+            new_items.append(item)
+    return new_items
+
+
+def normalize_images(images):
+    """JSON-массив URL картинок для колонки images или None
+
+    Ответы /listings вставляют колонку в JSON без разбора (app/listings/responses.py),
+    поэтому сюда попадает только массив строк
+    """
+    if isinstance(images, str):
+        try:
+            images = json.loads(images)
+        except ValueError:
+            logger.warning(f"⚠️ Некорректный JSON картинок объявления: {images[:100]}")
+            return None
+    if not isinstance(images, list):
+        return None
+    urls = [url for url in images if isinstance(url, str) and url]
+    return json.dumps(urls) if urls else None
+
+
+def build_listing(item: dict) -> Listing:
+    """Listing из словаря адаптера. Части адреса от парсера (location_parts) нужны только поисковому индексу"""
+    item = dict(item)
+    location_parts = item.pop("location_parts", None)
+    if "images" in item:
+        item["images"] = normalize_images(item["images"])
+    listing = Listing(**item)
+    listing.location_parts = location_parts
+    return listing
+
+
+def broadcast_new_listings(new_listings: list, main_loop=None):
+    """Отправляет новые объявления через WebSocket из потока парсера"""
+    if not new_listings:
+        return
+    try:
+        # Используем run_coroutine_threadsafe для безопасного вызова из другого потока
+        if main_loop and not main_loop.is_closed():
+            asyncio.run_coroutine_threadsafe(
+                websocket_manager.send_new_listings(new_listings), 
+                main_loop
+            )
+            logger.info(f"📡 Отправлено {len(new_listings)} новых объявлений через WebSocket")
+    except Exception as e:
+        logger.error(f"❌ Ошибка отправки WebSocket: {e}")
+
+
+def run_cian_feed(db: Session, feed: str, main_loop=None):
+    """Запускает отдельную ленту Циан (загородная / новостройки) и сохраняет новые объявления
+    
+    У каждой ленты свой lock, расписание и лимит страниц, поэтому она не удлиняет основной обход квартир
+    """
+    adapter_class, title = CIAN_FEEDS[feed]
+    
+    if not acquire_parser_lock(feed):
+        logger.warning(f"⚠️ Лента {feed} уже запущена. Пропускаем выполнение.")
+        return []
+    
+    new_listings = []
+    adapter = None
+    
+    try:
+        logger.info("=" * 80)
+        logger.info(f"🚀 НАЧАЛО ПАРСИНГА - {title}")
+        logger.info("=" * 80)
+        
+        adapter = adapter_class()
+        feed_listings = adapter.fetch_basic_listings()
+        logger.info(f"✅ Получено {len(feed_listings)} объявлений ({feed})")
+        
+        feed_new_listings = filter_new_listings(db, feed_listings)
+        logger.info(f"🆕 Найдено {len(feed_new_listings)} новых объявлений ({feed}) из {len(feed_listings)} общих")
+        
+        if feed_new_listings:
+            for item in adapter.parse_extra_data_for_listings(feed_new_listings):
+                listing = build_listing(item)
+                db.add(listing)
+                new_listings.append(listing)
+        
+        index_listings(db, new_listings)
+        db.commit()
+        raise_listing_stats(new_listings)
+        add_listing_facets(new_listings)
+        if new_listings:
+            bump_listings_version()
+        logger.info(f"💾 Сохранено {len(new_listings)} объявлений ({feed})")
+    except Exception as e:
+        logger.error(f"❌ Ошибка при работе ленты {feed}: {e}", exc_info=True)
+        db.rollback()
+        raise
+    finally:
+        if adapter:
+            try:
+                adapter.close_browser()
+            except Exception as e:
+                logger.error(f"Ошибка при закрытии браузера ({feed}): {e}")
+        release_parser_lock(feed)
+    
+    broadcast_new_listings(new_listings, main_loop)
+    return new_listings
+
+
 def run_parsers(db: Session, main_loop=None):
     """Запускает все парсеры и сохраняет новые объявления в БД
     
@@ -53,17 +181,7 @@ def run_parsers(db: Session, main_loop=None):
         logger.info(f"✅ Получено {len(cian_listings)} объявлений Циан")
         
         # Фильтруем только новые объявления Циан
-        cian_new_listings = []
-        for item in cian_listings:
-            exists = db.query(Listing).filter(
-                Listing.deal_type == item["deal_type"],
-                Listing.price == item["price"],
-                Listing.total_meters == item["total_meters"],
-                Listing.location == item["location"],
-                Listing.source == item["source"]
-            ).first()
-            if not exists:
-                cian_new_listings.append(item)
+        cian_new_listings = filter_new_listings(db, cian_listings)
         
         logger.info(f"🆕 Найдено {len(cian_new_listings)} новых объявлений Циан из {len(cian_listings)} общих")
         
@@ -76,7 +194,7 @@ def run_parsers(db: Session, main_loop=None):
             
             # Сохраняем обогащенные объявления в БД
             for item in cian_enhanced:
-                listing = Listing(**item)
+                listing = build_listing(item)
                 db.add(listing)
                 new_listings.append(listing)
             
@@ -90,7 +208,7 @@ def run_parsers(db: Session, main_loop=None):
                     # Добавляем пустые поля для консистентности
                     item['phone_number'] = None
                     item['images'] = None
-                    listing = Listing(**item)
+                    listing = build_listing(item)
                     db.add(listing)
                     new_listings.append(listing)
                 logger.info(f"✅ Сохранено {len(cian_remaining)} объявлений Циан без extra data")
@@ -112,17 +230,7 @@ def run_parsers(db: Session, main_loop=None):
         logger.info(f"✅ Получено {len(avito_listings)} объявлений Авито")
         
         # Фильтруем только новые объявления Авито
-        avito_new_listings = []
-        for item in avito_listings:
-            exists = db.query(Listing).filter(
-                Listing.deal_type == item["deal_type"],
-                Listing.price == item["price"],
-                Listing.total_meters == item["total_meters"],
-                Listing.location == item["location"],
-                Listing.source == item["source"]
-            ).first()
-            if not exists:
-                avito_new_listings.append(item)
+        avito_new_listings = filter_new_listings(db, avito_listings)
         
         logger.info(f"🆕 Найдено {len(avito_new_listings)} новых объявлений Авито из {len(avito_listings)} общих")
         
@@ -133,7 +241,7 @@ def run_parsers(db: Session, main_loop=None):
             
             # Сохраняем обогащенные объявления в БД
             for item in avito_enhanced:
-                listing = Listing(**item)
+                listing = build_listing(item)
                 db.add(listing)
                 new_listings.append(listing)
             
@@ -175,32 +283,28 @@ def run_parsers(db: Session, main_loop=None):
         release_parser_lock()
     
     try:
+        index_listings(db, new_listings)
         db.commit()
+        raise_listing_stats(new_listings)
+        add_listing_facets(new_listings)
+        if new_listings:
+            bump_listings_version()
         logger.info("💾 Изменения сохранены в БД")
         
         # Отправляем новые объявления через WebSocket
-        if new_listings:
-            try:
-                # Используем run_coroutine_threadsafe для безопасного вызова из другого потока
-                if main_loop and not main_loop.is_closed():
-                    asyncio.run_coroutine_threadsafe(
-                        websocket_manager.send_new_listings(new_listings), 
-                        main_loop
-                    )
-                    logger.info(f"📡 Отправлено {len(new_listings)} новых объявлений через WebSocket")
-            except Exception as e:
-                logger.error(f"❌ Ошибка отправки WebSocket: {e}")
+        broadcast_new_listings(new_listings, main_loop)
                 
     except Exception as e:
         logger.error(f"❌ Ошибка при сохранении в БД: {e}")
         db.rollback()
         raise
 
-    # Удаляем старые (старше 3 дней), но не те, что в работе, в аренде или в избранном
+    # Удаляем старые (старше 3 дней), но не те, что в работе или в аренде.
+    # Избранное отдается из снимков (см. get_favorite_listings) и удалению не мешает
     try:
         from app.listings.models import ListingMetadata
         from app.rent.models import RentListing
-        from app.favorites.models import Favorite
+        from app.favorites.service import refresh_favorite_snapshots
         
         expire_date = datetime.utcnow() - timedelta(days=3)
         
@@ -224,34 +328,39 @@ def run_parsers(db: Session, main_loop=None):
             row[0] for row in db.query(RentListing.listing_id).all()
         ]
         
-        # 4. Листинги, которые находятся в избранном (favorites)
-        protected_by_favorites_ids = [
-            row[0] for row in db.query(Favorite.listing_id).all()
-        ]
-        
         # Объединяем все защищенные ID
         protected_ids = set(
             protected_by_status_ids + 
             protected_by_responsible_ids +  # НОВОЕ
-            protected_by_rent_ids + 
-            protected_by_favorites_ids
+            protected_by_rent_ids
         )
         
         # Удаляем только те листинги, которые:
         # - старше 3 дней
         # - НЕ имеют статус "in_progress"
         # - НЕ находятся в аренде
-        # - НЕ находятся в избранном
         query = db.query(Listing).filter(Listing.created_at < expire_date)
         
         if protected_ids:
             query = query.filter(~Listing.id.in_(list(protected_ids)))
         
+        # Снимки в избранном - по последним данным удаляемых объявлений
+        refreshed = refresh_favorite_snapshots(db, query)
+        if refreshed:
+            logger.info(f"📸 Обновлено {refreshed} снимков избранного перед удалением объявлений")
+        
+        # Фасеты удаляемых объявлений вычитаются после коммита
+        deleted_facets = facet_columns(query)
         deleted_count = query.delete(synchronize_session=False)
+        if deleted_count > 0:
+            prune_search_index(db)
         
         db.commit()
         if deleted_count > 0:
-            logger.info(f"🗑️ Удалено {deleted_count} старых объявлений (старше 3 дней, не в работе, без ответственного, не в аренде, не в избранном)")
+            invalidate_listing_stats()
+            remove_listing_facets(deleted_facets)
+            bump_listings_version()
+            logger.info(f"🗑️ Удалено {deleted_count} старых объявлений (старше 3 дней, не в работе, без ответственного, не в аренде)")
     except Exception as e:
         logger.error(f"❌ Ошибка при удалении старых объявлений: {e}")
         db.rollback()
@@ -1,5 +1,5 @@
 import uuid
-from sqlalchemy import Column, String, DateTime, Float, Boolean, Text
+from sqlalchemy import Column, String, DateTime, Float, Boolean, Text, Index
 from datetime import datetime
 from app.db import Base
 from pydantic import BaseModel, field_validator
@@ -23,6 +23,20 @@ class Listing(Base):
     home_type = Column(String, nullable=True)
     is_favorite = Column(Boolean, default=False, nullable=False)
     images = Column(Text, nullable=True)  # JSON строка с массивом URL картинок
+
+    __table_args__ = (
+        # Порядок страниц и keyset-пагинация: ORDER BY created_at DESC, id DESC (и очистка по created_at)
+        Index('idx_listings_created_at_id', 'created_at', 'id'),
+        # Частые сочетания фильтров /listings в том же порядке (см. migrations/versions/0004_listing_filter_indexes.py)
+        Index('idx_listings_deal_type_created_at', 'deal_type', 'created_at', 'id'),
+        Index('idx_listings_source_created_at', 'source', 'created_at', 'id'),
+        Index('idx_listings_deal_type_rooms', 'deal_type', 'rooms_count', 'created_at'),
+        # Диапазоны цены/площади и MAX() для статистики слайдеров
+        Index('idx_listings_deal_type_price', 'deal_type', 'price'),
+        Index('idx_listings_deal_type_total_meters', 'deal_type', 'total_meters'),
+        Index('idx_listings_price', 'price'),
+        Index('idx_listings_total_meters', 'total_meters'),
+    )
     
     # # Дополнительные поля из детальной страницы
     # year_of_construction = Column(Integer, nullable=True)
@@ -84,4 +98,7 @@ class PaginatedListingsResponse(BaseModel):
     per_page: int
     total_pages: int
     filters: ListingFilters
-    stats: ListingStats
\ No newline at end of file
+    stats: ListingStats
+    next_cursor: Optional[str] = None
+    # True, если total - оценка планировщика (count=estimate), а не точное число
+    total_is_estimate: bool = False
\ No newline at end of file
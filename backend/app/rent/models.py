@@ -29,6 +29,8 @@ class RentListing(Base):
 
     __table_args__ = (
         Index('idx_rent_listing_company', 'listing_id', 'company_id'),
+        # Страницы аренды компании: ORDER BY created_at DESC, id DESC
+        Index('idx_rent_company_created_at_id', 'company_id', 'created_at', 'id'),
     )
 
 class RentListingCreate(BaseModel):
@@ -24,6 +24,8 @@ def add_to_rent(
     """Добавить листинг в аренду"""
     company_id = get_company_id(current_user)
     rent_listing = create_rent_listing(db, data, company_id)
+    if not rent_listing:
+        raise HTTPException(status_code=404, detail="Listing not found")
     return rent_listing
 
 @router.get("/{listing_id}", response_model=RentListingResponse)
@@ -70,6 +72,7 @@ def remove_from_rent(
 def list_rent_listings(
     page: int = 1,
     page_size: int = 20,
+    cursor: str = None,
     search: str = None,
     deal_type: str = None,
     source: str = None,
@@ -97,4 +100,4 @@ def list_rent_listings(
         "status": status,
         "responsible": responsible
     }
-    return get_all_rent_listings(db, company_id, page, page_size, filters)
+    return get_all_rent_listings(db, company_id, page, page_size, filters, cursor=cursor)
@@ -1,11 +1,30 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import and_
+from sqlalchemy import and_, func
 from app.rent.models import RentListing, RentListingCreate, RentListingUpdate
 from app.listings.models import ListingMetadata
+from app.core.pagination import apply_cursor, fetch_page, order_by_newest
+from app.listings.stats import get_rent_stats, raise_rent_stats, invalidate_rent_stats
+from app.listings.counts import bump_metadata_version
+from app.listings.filters import compile_filters, RENT_COLUMNS
+from app.parsers.models import Listing
 from typing import Optional
 
-def create_rent_listing(db: Session, data: RentListingCreate, company_id: str) -> RentListing:
-    """Создать запись аренды"""
+# Колонки элемента списка аренды (запись аренды + данные объявления)
+RENT_PAGE_COLUMNS = (
+    RentListing.id.label("rent_id"), Listing.id.label("listing_id"),
+    RentListing.tenant_first_name, RentListing.tenant_last_name, RentListing.tenant_phone,
+    RentListing.rent_price, RentListing.rent_start_date, RentListing.rent_end_date,
+    RentListing.responsible_user_id,
+    Listing.location.label("address"), Listing.total_meters.label("area"), Listing.rooms_count.label("rooms"),
+    Listing.floor, Listing.price, Listing.source, Listing.url,
+)
+
+def create_rent_listing(db: Session, data: RentListingCreate, company_id: str) -> Optional[RentListing]:
+    """Создать запись аренды. None - объявления нет в listings (осталось только в избранном)"""
+    listing = db.query(Listing).filter(Listing.id == data.listing_id).first()
+    if not listing:
+        return None
+    
     rent_listing = RentListing(
         listing_id=data.listing_id,
         company_id=company_id,
@@ -33,6 +52,10 @@ def create_rent_listing(db: Session, data: RentListingCreate, company_id: str) -
     
     db.commit()
     db.refresh(rent_listing)
+    if data.responsible_user_id:
+        bump_metadata_version(company_id)
+    
+    raise_rent_stats(company_id, rent_listing.rent_price, listing.total_meters)
     return rent_listing
 
 def get_rent_listing(db: Session, listing_id: str, company_id: str) -> Optional[RentListing]:
@@ -68,6 +91,10 @@ def update_rent_listing(db: Session, listing_id: str, company_id: str, data: Ren
     
     db.commit()
     db.refresh(rent_listing)
+    if data.responsible_user_id is not None:
+        bump_metadata_version(company_id)
+    if data.rent_price is not None:
+        invalidate_rent_stats(company_id)
     return rent_listing
 
 def delete_rent_listing(db: Session, listing_id: str, company_id: str) -> bool:
@@ -78,6 +105,7 @@ def delete_rent_listing(db: Session, listing_id: str, company_id: str) -> bool:
     
     db.delete(rent_listing)
     db.commit()
+    invalidate_rent_stats(company_id)
     return True
 
 def round_up_price(price: float) -> int:
@@ -92,104 +120,55 @@ def round_up_meters(meters: float) -> int:
         return 0
     return int((meters // 10 + 1) * 10)
 
-def get_all_rent_listings(db: Session, company_id: str, page: int = 1, page_size: int = 20, filters: dict = None):
-    """Получить все записи аренды для компании с данными листинга и фильтрацией"""
-    from app.parsers.models import Listing
-    from app.favorites.service import apply_listing_filters
-    
-    offset = (page - 1) * page_size
+def get_all_rent_listings(db: Session, company_id: str, page: int = 1, page_size: int = 20, filters: dict = None,
+                          cursor: Optional[str] = None):
+    """Получить все записи аренды для компании с данными листинга и фильтрацией
+
+    Записи упорядочены по (created_at DESC, id DESC) записи аренды; с cursor страница
+    выбирается keyset-условием, без него - по номеру page. Страница и total - один запрос
+    (с cursor - плюс count), статистика - из кэша
+    """
     filters = filters or {}
     
-    # Получить ID арендованных листингов
-    rent_listing_ids = db.query(RentListing.listing_id).filter(
-        RentListing.company_id == company_id
-    ).all()
-    listing_ids = [rl.listing_id for rl in rent_listing_ids]
-    
-    if not listing_ids:
-        return {
-            "rent_listings": [],
-            "total": 0,
-            "page": page,
-            "page_size": page_size,
-            "total_pages": 0,
-            "stats": {"max_price": None, "max_meters": None},
-            "filters": filters
-        }
-    
-    # Применить фильтры к арендованным листингам (без фильтров по цене)
-    filters_without_price = {k: v for k, v in filters.items() if k not in ['min_price', 'max_price']}
-    query = db.query(Listing).filter(Listing.id.in_(listing_ids))
-    query = apply_listing_filters(query, db=db, company_id=company_id, **filters_without_price)
-    
-    # Получить все отфильтрованные листинги
-    all_filtered_listings = query.all()
-    filtered_listing_ids = [l.id for l in all_filtered_listings]
-    
-    # Получить данные аренды и применить фильтр по rent_price
-    rent_query = db.query(RentListing).filter(
-        RentListing.listing_id.in_(filtered_listing_ids),
-        RentListing.company_id == company_id
+    # Один запрос: аренда компании JOIN объявление, фильтры по объявлению и цене аренды,
+    # порядок страницы аренды и total оконной функцией COUNT(*) OVER () (считается до LIMIT/OFFSET)
+    plan = compile_filters(company_id=company_id, **filters)
+    rent_query = plan.apply(
+        db.query(*RENT_PAGE_COLUMNS, RentListing.created_at)
+        .join(Listing, Listing.id == RentListing.listing_id)
+        .filter(RentListing.company_id == company_id),
+        RENT_COLUMNS,
     )
+    count_query = rent_query.with_entities(RentListing.id)
+    if not cursor:
+        rent_query = rent_query.add_columns(func.count().over().label("total"))
+    rent_query = order_by_newest(
+        apply_cursor(rent_query, RentListing.created_at, RentListing.id, cursor), RentListing.created_at, RentListing.id
+    )
+    rows, next_cursor = fetch_page(rent_query, page_size, page, cursor, id_attr="rent_id")
     
-    if filters.get('min_price') is not None:
-        rent_query = rent_query.filter(RentListing.rent_price >= filters['min_price'])
-    
-    if filters.get('max_price') is not None:
-        rent_query = rent_query.filter(RentListing.rent_price <= filters['max_price'])
-    
-    total = rent_query.count()
-    rent_data = rent_query.offset(offset).limit(page_size).all()
-    
-    # Получить листинги для отображения
-    final_listing_ids = [r.listing_id for r in rent_data]
-    listings = db.query(Listing).filter(Listing.id.in_(final_listing_ids)).all()
-    listings_map = {l.id: l for l in listings}
-    rent_map = {r.listing_id: r for r in rent_data}
-
+    if rows and not cursor:
+        total = rows[0].total
+    else:
+        # С курсором окно видит только записи после него; пустая страница total не несет
+        total = count_query.count()
     
-    # Объединить данные
+    # Элементы в порядке страницы аренды (created_at и total - служебные колонки)
     result = []
-    for listing in listings:
-        rent_listing = rent_map.get(listing.id)
-        if rent_listing:
-            result.append({
-                "rent_id": rent_listing.id,
-                "listing_id": listing.id,
-                "tenant_first_name": rent_listing.tenant_first_name,
-                "tenant_last_name": rent_listing.tenant_last_name,
-                "tenant_phone": rent_listing.tenant_phone,
-                "rent_price": rent_listing.rent_price,
-                "rent_start_date": rent_listing.rent_start_date,
-                "rent_end_date": rent_listing.rent_end_date,
-                "responsible_user_id": rent_listing.responsible_user_id,
-                "address": listing.location,
-                "area": listing.total_meters,
-                "rooms": listing.rooms_count,
-                "floor": listing.floor,
-                "price": listing.price,
-                "source": listing.source,
-                "url": listing.url,
-            })
+    for row in rows:
+        item = dict(row._mapping)
+        item.pop("created_at")
+        item.pop("total", None)
+        result.append(item)
     
     total_pages = (total + page_size - 1) // page_size
     
-    # Статистика по всем арендованным листингам (без фильтров)
-    max_price_rent = db.query(RentListing).filter(
-        RentListing.company_id == company_id,
-        RentListing.rent_price.isnot(None)
-    ).order_by(RentListing.rent_price.desc()).first()
-    
-    max_meters_listing = db.query(Listing).filter(
-        Listing.id.in_(listing_ids),
-        Listing.total_meters.isnot(None)
-    ).order_by(Listing.total_meters.desc()).first()
+    # Статистика по всем арендованным листингам (без фильтров), из кэша
+    max_price, max_meters = get_rent_stats(db, company_id)
     
     # Округлить максимальные значения
-    max_price = max_price_rent.rent_price if max_price_rent else None
     rounded_max_price = round_up_price(max_price) if max_price else None
     
-    max_meters = max_meters_listing.total_meters if max_meters_listing else None
     rounded_max_meters = round_up_meters(max_meters) if max_meters else None
     
     stats = {
@@ -203,6 +182,7 @@ def get_all_rent_listings(db: Session, company_id: str, page: int = 1, page_size
         "page": page,
         "page_size": page_size,
         "total_pages": total_pages,
+        "next_cursor": next_cursor,
         "stats": stats,
         "filters": filters
     }
@@ -54,30 +54,33 @@ def delete_password_change_otp(user_id: UUID) -> None:
     redis_client.delete(key)
 
 
-def acquire_parser_lock() -> bool:
+def acquire_parser_lock(name: str = "parser") -> bool:
     """Захватывает lock для парсера с TTL 2 часа (7200 секунд)
     
+    Args:
+        name: Имя парсера/ленты, у каждой ленты свой lock
+    
     Returns:
         True если lock успешно захвачен, False если парсер уже запущен
     """
-    key = "parser:lock"
+    key = f"{name}:lock"
     # setnx возвращает True если ключа не было и он был установлен
     # Устанавливаем lock на 2 часа (7200 секунд)
     acquired = redis_client.set(key, "locked", nx=True, ex=7200)
     return bool(acquired)
 
 
-def release_parser_lock() -> None:
+def release_parser_lock(name: str = "parser") -> None:
     """Освобождает lock парсера"""
-    key = "parser:lock"
+    key = f"{name}:lock"
     redis_client.delete(key)
 
 
-def is_parser_locked() -> bool:
+def is_parser_locked(name: str = "parser") -> bool:
     """Проверяет, заблокирован ли парсер
     
     Returns:
         True если парсер в данный момент работает, False если свободен
     """
-    key = "parser:lock"
+    key = f"{name}:lock"
     return bool(redis_client.exists(key))
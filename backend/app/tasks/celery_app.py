@@ -11,7 +11,7 @@ celery_app = Celery(
     backend=settings.REDIS_URL
 )
 
-celery_app.autodiscover_tasks(["app.tasks.email_tasks", "app.tasks.parser_tasks"])
+celery_app.autodiscover_tasks(["app.tasks.email_tasks", "app.tasks.parser_tasks", "app.tasks.history_tasks"])
 
 # Настройка для Windows - используем абсолютный путь к файлу расписания
 if sys.platform == 'win32':
@@ -40,4 +40,17 @@ celery_app.conf.beat_schedule = {
         "task": "run_parser_task",
         "schedule": timedelta(minutes=settings.PARSER_INTERVAL_MINUTES),
     },
+    "run-cian-suburban-every-interval": {
+        "task": "run_cian_suburban_task",
+        "schedule": timedelta(minutes=settings.CIAN_SUBURBAN_INTERVAL_MINUTES),
+    },
+    "run-cian-newobjects-every-interval": {
+        "task": "run_cian_newobjects_task",
+        "schedule": timedelta(minutes=settings.CIAN_NEWOBJECTS_INTERVAL_MINUTES),
+    },
+    # История изменений объявлений уходит в архив помесячно
+    "archive-listing-history-monthly": {
+        "task": "archive_listing_history_task",
+        "schedule": crontab(minute=0, hour=3, day_of_month=1),
+    },
 }
@@ -0,0 +1,20 @@
+import logging
+from app.tasks.celery_app import celery_app
+from app.db import SessionLocal
+from app.listings.history import archive_listing_history
+
+logger = logging.getLogger(__name__)
+
+@celery_app.task(name="archive_listing_history_task")
+def archive_listing_history_task():
+    """Задача для переноса старой истории изменений объявлений в архив"""
+    db = SessionLocal()
+    try:
+        moved = archive_listing_history(db)
+        return {"status": "success", "archived_count": moved}
+    except Exception as e:
+        logger.error(f"❌ Ошибка архивации истории: {e}")
+        db.rollback()
+        raise
+    finally:
+        db.close()
@@ -3,7 +3,7 @@ import redis
 from celery.signals import worker_ready
 from app.tasks.celery_app import celery_app
 from app.db import SessionLocal
-from app.parsers.manager import run_parsers
+from app.parsers.manager import run_parsers, run_cian_feed
 from app.core.config import settings
 
 logger = logging.getLogger(__name__)
@@ -40,6 +40,30 @@ def run_parser_task(self):
     finally:
         db.close()
 
+def _run_cian_feed(task, feed: str):
+    db = SessionLocal()
+    try:
+        logger.info(f"🚀 Запуск ленты {feed} через Celery")
+        new_listings = run_cian_feed(db, feed)
+        logger.info(f"✅ Лента {feed} завершена. Найдено {len(new_listings)} новых объявлений")
+        return {"status": "success", "new_listings_count": len(new_listings)}
+    except Exception as e:
+        logger.error(f"❌ Ошибка ленты {feed}: {e}")
+        db.rollback()
+        raise task.retry(exc=e, countdown=300)
+    finally:
+        db.close()
+
+@celery_app.task(name="run_cian_suburban_task", bind=True, max_retries=3)
+def run_cian_suburban_task(self):
+    """Задача для ленты загородной недвижимости Циан"""
+    return _run_cian_feed(self, "cian_suburban")
+
+@celery_app.task(name="run_cian_newobjects_task", bind=True, max_retries=3)
+def run_cian_newobjects_task(self):
+    """Задача для ленты новостроек Циан"""
+    return _run_cian_feed(self, "cian_newobjects")
+
 @worker_ready.connect
 def on_worker_ready(sender, **kwargs):
     """Запускаем парсер сразу при старте worker"""
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Boolean, DateTime
+from sqlalchemy import Column, String, Boolean, DateTime, Date, Index
 from sqlalchemy.dialects.postgresql import UUID
 from datetime import datetime
 import uuid
@@ -25,3 +25,18 @@ class User(Base):
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
     last_seen = Column(DateTime, nullable=True)
+
+
+class UserDailyAssignment(Base):
+    """Объявление, назначенное сотруднику в этот день (одна строка на день), см. stats_service.py"""
+    __tablename__ = "user_daily_assignments"
+
+    user_id = Column(String, primary_key=True)
+    day = Column(Date, primary_key=True)
+    listing_id = Column(String, primary_key=True)
+    company_id = Column(String, nullable=False)
+
+    __table_args__ = (
+        # Удаление объявления компании (delete_listing_metadata)
+        Index('idx_user_daily_assignments_listing', 'listing_id', 'company_id'),
+    )
@@ -4,8 +4,11 @@ from datetime import date
 from app.db import get_db
 from app.users.models import User
 from app.auth.utils import get_current_user
-from app.users.stats_service import get_user_stats
+from app.users.stats_service import get_user_stats, get_users_stats
+from app.users.employee_service import get_all_group_members
 from pydantic import BaseModel
+from typing import List, Optional
+from uuid import UUID
 
 router = APIRouter(prefix="/stats", tags=["Stats"])
 
@@ -14,6 +17,34 @@ class UserStatsResponse(BaseModel):
     our_apartments: int
     conversion: float
 
+class EmployeeStatsResponse(UserStatsResponse):
+    user_id: UUID
+    first_name: Optional[str]
+    last_name: Optional[str]
+
+class CompanyStatsResponse(BaseModel):
+    employees: List[EmployeeStatsResponse]
+
+@router.get("/company", response_model=CompanyStatsResponse)
+async def get_company_stats(
+    start_date: date = Query(...),
+    end_date: date = Query(...),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Получить статистику всех членов группы за период одним запросом"""
+    members = get_all_group_members(db, current_user)
+    stats = get_users_stats(db, [str(member.id) for member in members], start_date, end_date)
+    return CompanyStatsResponse(employees=[
+        EmployeeStatsResponse(
+            user_id=member.id,
+            first_name=member.first_name,
+            last_name=member.last_name,
+            **stats[str(member.id)]
+        )
+        for member in members
+    ])
+
 @router.get("/{user_id}", response_model=UserStatsResponse)
 async def get_stats(
     user_id: str,
@@ -1,41 +1,94 @@
+"""
+Статистика сотрудников: назначенные объявления, переданные в аренду и конверсия
+
+Раньше на каждый запрос история назначений (listing_history) сканировалась за
+период, id объявлений собирались в Python и подставлялись в IN по rent_listings,
+отдельно для каждого сотрудника. Теперь назначения хранятся по дням в
+user_daily_assignments и записываются в той же транзакции, что и история:
+одна строка на (сотрудник, день, объявление), повторное назначение в тот же
+день строку не добавляет. Статистика всех сотрудников - один запрос:
+- назначения за период - уникальные объявления по строкам дней периода
+  (диапазон по первичному ключу, без чтения истории и ее архива);
+- аренда - LEFT JOIN к rent_listings по индексу listing_id, поэтому
+  создание и удаление аренды таблицу не меняет.
+Суммы по дням здесь не подходят: объявление, назначенное в несколько дней
+периода, считается один раз.
+"""
+
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.dialects import mysql, postgresql, sqlite
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, func
-from datetime import date
-from app.parsers.models import Listing
+
 from app.rent.models import RentListing
-from app.listings.models import ListingMetadata, ListingHistory
+from app.users.models import UserDailyAssignment
 
-def get_user_stats(db: Session, user_id: str, start_date: date, end_date: date) -> dict:
-    """Получить статистику пользователя за период"""
-    
-    # Всего объявлений - листинги, где пользователь был назначен ответственным в указанный период
-    # Используем ListingHistory для определения момента назначения
-    assignment_history_ids = db.query(ListingHistory.listing_id).filter(
-        and_(
-            ListingHistory.action == "assigned",
-            ListingHistory.new_value == user_id,
-            ListingHistory.created_at >= start_date,
-            ListingHistory.created_at <= end_date
-        )
-    ).distinct().all()
-    
-    total_ads = len(assignment_history_ids) if assignment_history_ids else 0
-    assignment_listing_ids = [h.listing_id for h in assignment_history_ids]
-    
-    # Наших квартир - из назначенных листингов, сколько было перемещено в аренду
-    # Считаем ВСЕ листинги из назначенных, которые попали в RentListing
-    # независимо от того, кто указан как responsible_user_id в RentListing
-    our_apartments = 0
-    if assignment_listing_ids:
-        our_apartments = db.query(func.count(RentListing.id)).filter(
-            RentListing.listing_id.in_(assignment_listing_ids)
-        ).scalar() or 0
-    
+
+def record_assignments(db: Session, listing_ids: Iterable[str], user_id: Optional[str], company_id: str,
+                       assigned_at: Optional[datetime] = None):
+    """Учитывает назначение объявлений сотруднику (INSERT без дублей за день, без коммита)"""
+    listing_ids = list(listing_ids)
+    if not user_id or not listing_ids:
+        return
+    day = (assigned_at or datetime.utcnow()).date()
+    rows = [{"user_id": user_id, "day": day, "listing_id": listing_id, "company_id": company_id}
+            for listing_id in listing_ids]
+    dialect = db.get_bind().dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+        statement = insert(UserDailyAssignment).values(rows).on_conflict_do_nothing()
+    else:
+        statement = mysql.insert(UserDailyAssignment).values(rows).prefix_with("IGNORE")
+    db.execute(statement)
+
+
+def delete_listing_assignments(db: Session, listing_id: str, company_id: str):
+    """Удаляет назначения объявления компании (вместе с его историей)"""
+    db.query(UserDailyAssignment).filter(
+        UserDailyAssignment.listing_id == listing_id,
+        UserDailyAssignment.company_id == company_id,
+    ).delete(synchronize_session=False)
+
+
+def _stats_dict(total_ads: int, our_apartments: int) -> dict:
     # Конверсия - процент успешно переведенных в аренду листингов
     conversion = round((our_apartments / total_ads * 100), 2) if total_ads > 0 else 0.0
-    
     return {
         "total_ads": total_ads,
         "our_apartments": our_apartments,
         "conversion": conversion
     }
+
+
+def _period_totals(db: Session, user_ids: Iterable[str], start_date: date, end_date: date):
+    user_ids = list(user_ids)
+    if not user_ids:
+        return []
+    # Как и раньше (created_at <= end_date, т.е. до начала дня end_date), день end_date в период не входит
+    assigned = select(UserDailyAssignment.user_id, UserDailyAssignment.listing_id).where(
+        UserDailyAssignment.user_id.in_(user_ids),
+        UserDailyAssignment.day >= start_date,
+        UserDailyAssignment.day < end_date,
+    ).distinct().subquery()
+    # Все записи аренды назначенных объявлений, независимо от responsible_user_id в аренде
+    return db.query(
+        assigned.c.user_id,
+        func.count(func.distinct(assigned.c.listing_id)),
+        func.count(RentListing.id),
+    ).select_from(assigned).outerjoin(
+        RentListing, RentListing.listing_id == assigned.c.listing_id
+    ).group_by(assigned.c.user_id).all()
+
+
+def get_user_stats(db: Session, user_id: str, start_date: date, end_date: date) -> dict:
+    """Получить статистику пользователя за период"""
+    return get_users_stats(db, [user_id], start_date, end_date)[user_id]
+
+
+def get_users_stats(db: Session, user_ids: List[str], start_date: date, end_date: date) -> Dict[str, dict]:
+    """Статистика нескольких пользователей за период одним запросом"""
+    totals = {user_id: (total_ads, our_apartments)
+              for user_id, total_ads, our_apartments in _period_totals(db, user_ids, start_date, end_date)}
+    return {user_id: _stats_dict(*totals.get(user_id, (0, 0))) for user_id in user_ids}
@@ -1,4 +1,4 @@
-from .cianparser import CianParser, list_locations, list_metro_stations
+from .cianparser import CianParser, list_locations, list_metro_stations, get_location_id
 
 __author__ = "lenarsaitov"
 __mail__ = "lenarsaitov1@yandex.ru"
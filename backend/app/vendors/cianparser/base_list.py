@@ -5,6 +5,10 @@ from .constants import SPECIFIC_FIELDS_FOR_RENT_LONG, SPECIFIC_FIELDS_FOR_RENT_S
 
 
 class BaseListPageParser:
+    # Фрагменты страницы, которых достаточно для parse_list_offers_page (см. EXTRACT_LIST_PAGE_SCRIPT)
+    page_marker_selectors = ("div[data-name='HeaderDefault']",)
+    page_content_selectors = ("div[data-name='Offers']", "nav[data-name='Pagination']")
+
     def __init__(self,
                  driver,
                  accommodation_type: str, deal_type: str, rent_period_type, location_name: str,
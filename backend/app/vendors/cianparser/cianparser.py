@@ -1,12 +1,13 @@
 import time
 import os
+import threading
 import undetected_chromedriver as uc
 from selenium.webdriver.common.by import By
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 
-from .constants import CITIES, METRO_STATIONS, DEAL_TYPES, OBJECT_SUBURBAN_TYPES
+from .constants import CITIES, METRO_STATIONS, DEAL_TYPES, OBJECT_SUBURBAN_TYPES, EXTRACT_LIST_PAGE_SCRIPT, BASE_URL
 from .url_builder import URLBuilder
 from .proxy_pool import ProxyPool
 from .flat.list import FlatListPageParser
@@ -16,10 +17,22 @@ from .newobject.list import NewObjectListParser
 from .flat.page import FlatPageParser
 
 
+# Название региона -> id региона Циан. Строится один раз при импорте вместо поиска по CITIES
+LOCATION_IDS = {location_name: location_id for location_name, location_id in CITIES}
+
+# undetected-chromedriver патчит бинарник chromedriver при старте, параллельный запуск ломает его.
+# Общий для всех экземпляров: браузер запускается и при создании парсера, и при смене прокси
+DRIVER_START_LOCK = threading.Lock()
+
+
 def list_locations():
     return CITIES
 
 
+def get_location_id(location):
+    return LOCATION_IDS.get(location)
+
+
 def list_metro_stations():
     return METRO_STATIONS
 
@@ -29,31 +42,60 @@ class CianParser:
         location_id = __validation_init__(location)
 
         self.__parser__ = None
+        self.__driver__ = None
         self.__proxy_pool__ = ProxyPool(proxies=proxies)
         self.__location_name__ = location
         self.__location_id__ = location_id
-        self.__driver__ = None
+        self.__page_stats__ = __new_page_stats__()
+        self.__headless__ = headless
+        self.__driver_proxy__ = None
+
+        # Прокси выбираем до запуска браузера: у Chrome он задается только аргументом при старте
+        proxy = None
+        if not self.__proxy_pool__.is_empty():
+            proxy = self.__proxy_pool__.get_available_proxy(BASE_URL)
+            self.__proxy_pool__.start_background_checks(BASE_URL)
 
+        self.__launch_driver__(proxy)
+
+    def __del__(self):
+        # __init__ мог упасть до создания пула прокси - закрывать нечего
+        if getattr(self, "__proxy_pool__", None) is not None:
+            self.close_browser()
+
+    def set_location(self, location: str):
+        """Переключает регион парсинга без перезапуска браузера"""
+        self.__location_id__ = __validation_init__(location)
+        self.__location_name__ = location
+
+    def __launch_driver__(self, proxy=None):
+        """Запускает Chrome, при необходимости через указанный прокси"""
         chrome_options = Options()
-        if headless:
+        if self.__headless__:
             chrome_options.add_argument("--headless=new")
         chrome_options.add_argument("--disable-blink-features=AutomationControlled")
         chrome_options.add_argument("--no-sandbox")
         chrome_options.add_argument("--disable-dev-shm-usage")
         chrome_options.add_argument("--disable-gpu")
         chrome_options.add_argument("--window-size=1920,1080")
-        
+        if proxy is not None:
+            # --proxy-server не поддерживает логин/пароль, прокси должны быть без авторизации
+            chrome_options.add_argument(f"--proxy-server={proxy}")
+
         try:
-            self.__driver__ = uc.Chrome(options=chrome_options)
+            with DRIVER_START_LOCK:
+                self.__driver__ = uc.Chrome(options=chrome_options)
         except Exception as e:
             print(f"Ошибка при создании браузера: {e}")
             raise
 
-    def __del__(self):
-        self.close_browser()
-    
+        self.__driver_proxy__ = proxy
+        if self.__parser__ is not None:
+            self.__parser__.driver = self.__driver__
+
     def close_browser(self):
         """Принудительно закрывает браузер"""
+        self.__proxy_pool__.stop_background_checks()
         if self.__driver__:
             try:
                 self.__driver__.quit()
@@ -65,12 +107,20 @@ class CianParser:
     def __set_proxy__(self, url_list):
         if self.__proxy_pool__.is_empty():
             return
+        # Текущий прокси остается, пока проходит проверку: перезапуск Chrome дороже разницы в задержке
+        if self.__driver_proxy__ is not None and self.__proxy_pool__.is_available(self.__driver_proxy__, url_list):
+            return
         available_proxy = self.__proxy_pool__.get_available_proxy(url_list)
-        if available_proxy is not None:
-            # для undetected-chromedriver прокси можно установить через аргументы
-            # но это нужно делать при старте драйвера, динамически не поменяешь
-            # поэтому оставляем как есть — можно расширить через profile
-            print(f"⚠️ Прокси {available_proxy} не установлен динамически (нужен рестарт драйвера)")
+        if available_proxy is None or available_proxy == self.__driver_proxy__:
+            return
+
+        print(f"Перезапуск браузера с прокси {available_proxy}")
+        if self.__driver__:
+            try:
+                self.__driver__.quit()
+            except Exception as e:
+                print(f"Ошибка при закрытии браузера: {e}")
+        self.__launch_driver__(available_proxy)
 
     def __load_list_page__(self, url_list_format, page_number, attempt_number_exception):
         url_list = url_list_format.format(page_number)
@@ -82,25 +132,74 @@ class CianParser:
         self.__driver__.get(url_list)
 
         try:
+            # Ждем первый фрагмент с объявлениями своего типа страницы: у ЖК нет блока Offers, только карточки GKCard
             WebDriverWait(self.__driver__, 20).until(
-                EC.presence_of_element_located((By.CSS_SELECTOR, '[data-name="Offers"]'))
+                EC.presence_of_element_located((By.CSS_SELECTOR, self.__parser__.page_content_selectors[0]))
             )
         except:
-            if "checkcaptcha" in self.__driver__.current_url or "not a robot" in self.__driver__.page_source.lower():
+            extracted = self.__extract_list_page__()
+            if extracted is not None and extracted.get("is_captcha"):
                 print("⚠️ Попали на капчу. Смените IP/добавьте паузу.")
+                if self.__driver_proxy__ is not None:
+                    # На следующей странице браузер перезапустится со следующим прокси из рейтинга
+                    self.__proxy_pool__.mark_bad(self.__driver_proxy__)
             else:
                 print("⚠️ Таймаут загрузки страницы.")
+            return self.__list_page_html__(extracted)
 
-        html = self.__driver__.page_source
-
-        # debug_dir = "cianparser/debug"
-        # os.makedirs(debug_dir, exist_ok=True)
-        # debug_file = os.path.join(debug_dir, f"page_{page_number}.html")
-        # with open(debug_file, "w", encoding="utf-8") as f:
-        #     f.write(html)
+        return self.__list_page_html__(self.__extract_list_page__())
 
+    def __extract_list_page__(self):
+        """Выполняет EXTRACT_LIST_PAGE_SCRIPT в браузере, None если скрипт не отработал"""
+        started_at = time.perf_counter()
+        try:
+            extracted = self.__driver__.execute_script(
+                EXTRACT_LIST_PAGE_SCRIPT,
+                list(self.__parser__.page_marker_selectors),
+                list(self.__parser__.page_content_selectors),
+            )
+        except Exception as e:
+            print(f"⚠️ Не удалось извлечь фрагменты страницы через execute_script: {e}")
+            extracted = None
+        self.__page_stats__["extract_seconds"] += time.perf_counter() - started_at
+        return extracted if isinstance(extracted, dict) else None
+
+    def __list_page_html__(self, extracted):
+        """HTML для парсера списка: фрагменты из браузера или page_source, если контейнер не найден"""
+        self.__page_stats__["pages"] += 1
+
+        if extracted is not None and extracted.get("content_found") and not extracted.get("is_captcha"):
+            html = extracted["html"]
+            self.__page_stats__["full_chars"] += extracted.get("full_length") or 0
+            self.__page_stats__["sent_chars"] += len(html)
+            return html
+
+        # Капча, таймаут или изменилась верстка - отдаем парсеру страницу целиком, как раньше
+        started_at = time.perf_counter()
+        html = self.__driver__.page_source
+        self.__page_stats__["page_source_seconds"] += time.perf_counter() - started_at
+        self.__page_stats__["fallback_pages"] += 1
+        self.__page_stats__["full_chars"] += len(html)
+        self.__page_stats__["sent_chars"] += len(html)
         return html
 
+    def __print_page_stats__(self):
+        stats = self.__page_stats__
+        if stats["pages"] == 0:
+            return
+        saved_chars = stats["full_chars"] - stats["sent_chars"]
+        saved_percent = saved_chars * 100 / stats["full_chars"] if stats["full_chars"] else 0
+        print(f"List pages transfer: {stats['pages']} pages "
+              f"({stats['fallback_pages']} via page_source), "
+              f"{stats['sent_chars']} of {stats['full_chars']} chars transferred, "
+              f"saved {saved_chars} chars ({saved_percent:.1f}%). "
+              f"execute_script: {stats['extract_seconds']:.2f}s, "
+              f"page_source: {stats['page_source_seconds']:.2f}s")
+
+    def get_page_stats(self):
+        """Статистика передачи страниц списка за последний запуск get_flats/get_suburban/get_newobjects"""
+        return dict(self.__page_stats__)
+
     def __run__(self, url_list_format: str):
         print(f"\n{' ' * 30}Preparing to collect information from pages..")
 
@@ -109,6 +208,7 @@ class CianParser:
 
         page_number = self.__parser__.start_page - 1
         end_all_parsing = False
+        self.__page_stats__ = __new_page_stats__()
         
         # Проверяем, указан ли end_page в additional_settings
         auto_detect_last_page = (
@@ -146,6 +246,7 @@ class CianParser:
 
         print(f"\n\nThe collection of information from the pages with list of offers is completed")
         print(f"Total number of parsed offers: {self.__parser__.count_parsed_offers}. ", end="\n")
+        self.__print_page_stats__()
 
     def get_flats(self, deal_type: str, rooms, with_saving_csv=False, with_extra_data=False, additional_settings=None):
         __validation_get_flats__(deal_type, rooms)
@@ -186,11 +287,13 @@ class CianParser:
                                additional_settings=additional_settings))
         return self.__parser__.result
 
-    def get_newobjects(self, with_saving_csv=False):
+    def get_newobjects(self, with_saving_csv=False, with_extra_data=True, additional_settings=None):
         self.__parser__ = NewObjectListParser(
             driver=self.__driver__,
             location_name=self.__location_name__,
             with_saving_csv=with_saving_csv,
+            with_extra_data=with_extra_data,
+            additional_settings=additional_settings,
         )
         self.__run__(
             __build_url_list__(location_id=self.__location_id__, deal_type="sale", accommodation_type="newobject"))
@@ -206,15 +309,23 @@ class CianParser:
 
 
 
+def __new_page_stats__():
+    return {
+        "pages": 0,
+        "fallback_pages": 0,
+        "full_chars": 0,
+        "sent_chars": 0,
+        "extract_seconds": 0.0,
+        "page_source_seconds": 0.0,
+    }
+
+
 def __validation_init__(location):
-    location_id = None
-    for location_info in list_locations():
-        if location_info[0] == location:
-            location_id = location_info[1]
+    location_id = get_location_id(location)
 
     if location_id is None:
-        ValueError(f'You entered {location}, which is not exists in base.'
-                   f' See all available values of location in cianparser.list_locations()')
+        raise ValueError(f'You entered {location}, which is not exists in base.'
+                         f' See all available values of location in cianparser.list_locations()')
 
     return location_id
 
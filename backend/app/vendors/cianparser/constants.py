@@ -67,6 +67,45 @@ NOT_STREET_ADDRESS_ELEMENTS = {"ЖК", "м.", "мкр.", "Жилой компл
 STREET_TYPES = {"ул.", "улица", "аллея", "бульвар", "линия", "набережная", "тракт", "тупик", "шоссе", "переулок",
                 "проспект", "проезд", "раздъезд", "мост", "авеню"}
 
+# Скрипт выполняется в браузере и возвращает только фрагменты страницы, нужные парсеру списка,
+# вместо сериализации всего DOM через page_source.
+# arguments[0] - селекторы-маркеры (возвращается только пустой тег, важен сам факт наличия),
+# arguments[1] - селекторы контента (возвращается outerHTML всех совпадений)
+EXTRACT_LIST_PAGE_SCRIPT = """
+var markerSelectors = arguments[0] || [];
+var contentSelectors = arguments[1] || [];
+var bodyText = document.body ? document.body.innerText : "";
+var markers = [];
+var fragments = [];
+var contentFound = false;
+
+markerSelectors.forEach(function (selector) {
+    var node = document.querySelector(selector);
+    if (node) {
+        markers.push(node.cloneNode(false).outerHTML);
+    }
+});
+
+contentSelectors.forEach(function (selector, index) {
+    var nodes = document.querySelectorAll(selector);
+    if (index === 0 && nodes.length > 0) {
+        contentFound = true;
+    }
+    for (var i = 0; i < nodes.length; i++) {
+        fragments.push(nodes[i].outerHTML);
+    }
+});
+
+return {
+    full_length: document.documentElement ? document.documentElement.outerHTML.length : 0,
+    is_captcha: window.location.href.indexOf("checkcaptcha") !== -1 ||
+        bodyText.indexOf("Captcha") > 0 ||
+        bodyText.toLowerCase().indexOf("not a robot") !== -1,
+    content_found: contentFound,
+    html: "<html><body>" + markers.join("") + fragments.join("") + "</body></html>"
+};
+"""
+
 SPECIFIC_FIELDS_FOR_RENT_LONG = {"price_per_month", "commissions"}
 SPECIFIC_FIELDS_FOR_RENT_SHORT = {"price_per_day"}
 SPECIFIC_FIELDS_FOR_SALE = {"price", "residential_complex", "object_type", "finish_type"}
@@ -301,6 +301,52 @@ def define_price_data(block):
     return price_data
 
 
+def define_suburban_area(block):
+    area_data = {
+        "total_meters": -1,
+        "land_plot_meters": -1,
+    }
+
+    link_area = block.select_one("div[data-name='LinkArea']")
+    title_element = link_area.select_one("div[data-name='GeneralInfoSectionRowComponent']") if link_area else None
+    if title_element is None:
+        return area_data
+    title = title_element.text.replace(",", ".")
+
+    total_meters = re.search(r"(\d+(?:\.\d+)?)\s*м²", title)
+    if total_meters:
+        area_data["total_meters"] = float(total_meters.group(1))
+
+    # Площадь участка: "6 сот." или "1.5 га"
+    land_plot = re.search(r"(\d+(?:\.\d+)?)\s*(сот|га)", title)
+    if land_plot:
+        multiplier = 100 if land_plot.group(2) == "сот" else 10_000
+        area_data["land_plot_meters"] = float(land_plot.group(1)) * multiplier
+
+    return area_data
+
+
+def define_newobject_price_data(block):
+    """Минимальные цена и площадь из карточки ЖК ("от 12,5 млн ₽", "от 24 м²")"""
+    text = block.text.replace("\xa0", " ")
+
+    price_data = {
+        "price_from": -1,
+        "total_meters_from": -1,
+    }
+
+    price = re.search(r"от\s*([\d\s]+(?:,\d+)?)\s*(млн)?\s*₽", text)
+    if price:
+        value = float(price.group(1).replace(" ", "").replace(",", "."))
+        price_data["price_from"] = int(value * 1_000_000) if price.group(2) else int(value)
+
+    meters = re.search(r"от\s*(\d+(?:,\d+)?)\s*м²", text)
+    if meters:
+        price_data["total_meters_from"] = float(meters.group(1).replace(",", "."))
+
+    return price_data
+
+
 def define_specification_data(block):
     specification_data = dict()
     specification_data["floor"] = -1
@@ -8,24 +8,30 @@ from transliterate import translit
 import urllib.parse
 
 from ..constants import FILE_NAME_NEWOBJECT_FORMAT
-from ..helpers import union_dicts
+from ..helpers import union_dicts, define_newobject_price_data
 from .page import NewObjectPageParser
 
 
 class NewObjectListParser:
-    def __init__(self, driver, location_name: str, with_saving_csv=False):
+    # Фрагменты страницы, которых достаточно для parse_list_offers_page (см. EXTRACT_LIST_PAGE_SCRIPT)
+    page_marker_selectors = ()
+    page_content_selectors = ("div[data-mark='GKCard']", "nav[data-name='Pagination']")
+
+    def __init__(self, driver, location_name: str, with_saving_csv=False, with_extra_data=True, additional_settings=None):
         self.accommodation_type = "secondary"
         self.deal_type = "sale"
         self.driver = driver
         self.location_name = location_name
         self.with_saving_csv = with_saving_csv
+        self.with_extra_data = with_extra_data
+        self.additional_settings = additional_settings
 
         self.result = []
         self.result_set = set()
         self.average_price = 0
         self.count_parsed_offers = 0
-        self.start_page = 1
-        self.end_page = 50
+        self.start_page = 1 if (additional_settings is None or "start_page" not in additional_settings.keys()) else additional_settings["start_page"]
+        self.end_page = 50 if (additional_settings is None or "end_page" not in additional_settings.keys()) else additional_settings["end_page"]
         self.file_path = self.build_file_path()
 
     def build_file_path(self):
@@ -108,13 +114,20 @@ class NewObjectListParser:
         if common_data["url"] in self.result_set:
             return
 
-        flat_parser = NewObjectPageParser(driver=self.driver, url=common_data["url"])
-        page_data = flat_parser.parse_page()
-        time.sleep(4)
+        price_data = define_newobject_price_data(block=offer)
+
+        page_data = dict()
+        if self.with_extra_data:
+            try:
+                flat_parser = NewObjectPageParser(driver=self.driver, url=common_data["url"])
+                page_data = flat_parser.parse_page()
+            except Exception as e:
+                print(f"\nОшибка при получении дополнительных данных для {common_data['url']}: {e}")
+            time.sleep(4)
 
         self.count_parsed_offers += 1
         self.result_set.add(common_data["url"])
-        self.result.append(union_dicts(common_data, page_data))
+        self.result.append(union_dicts(common_data, price_data, page_data))
 
         if self.with_saving_csv:
             self.save_results()
@@ -9,11 +9,10 @@ class NewObjectPageParser:
         self.url = url
 
     def __load_page__(self):
-        res = self.driver.get(self.url)
-        if res.status_code == 429:
-            time.sleep(10)
-        res.raise_for_status()
-        self.offer_page_html = res.text
+        # CianParser передает Selenium-драйвер: get() ничего не возвращает, HTML берем из page_source
+        self.driver.get(self.url)
+        time.sleep(2)
+        self.offer_page_html = self.driver.page_source
         self.offer_page_soup = bs4.BeautifulSoup(self.offer_page_html, 'html.parser')
 
     def parse_page(self):
@@ -1,61 +1,121 @@
 import time
 import urllib.request
 import urllib.error
-import bs4
-import random
-import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+PROBE_TIMEOUT_SECONDS = 5
+PROBE_MAX_WORKERS = 16
+# Сколько секунд результаты проверки считаются актуальными
+RANKING_TTL_SECONDS = 300
 
 
 class ProxyPool:
     def __init__(self, proxies):
-        self.__proxy_pool__ = [] if proxies is None else proxies
+        self.__proxy_pool__ = [] if proxies is None else list(proxies)
         self.__current_proxy__ = None
-        self.__page_html__ = None
-
-    def __is_captcha__(self):
-        page_soup = bs4.BeautifulSoup(self.__page_html__, 'html.parser')
-        return page_soup.text.find("Captcha") > 0
+        # Доступные прокси, отсортированные по времени ответа: [(latency, proxy), ...]
+        self.__ranked_proxies__ = []
+        self.__ranked_at__ = 0
+        self.__lock__ = threading.Lock()
+        self.__warmup_thread__ = None
+        self.__warmup_stop__ = threading.Event()
 
-    def __is_available_proxy__(self, url, proxy):
-        opener = urllib.request.build_opener(urllib.request.ProxyHandler({'https': proxy}))
+    def __probe_proxy__(self, url, proxy):
+        """Проверяет прокси запросом к url. Возвращает время ответа в секундах или None"""
+        # Отдельный opener на каждую проверку: без install_opener и глобального socket timeout
+        opener = urllib.request.build_opener(urllib.request.ProxyHandler({'http': proxy, 'https': proxy}))
         opener.addheaders = [('User-agent', 'Mozilla/5.0')]
-        urllib.request.install_opener(opener)
 
+        started_at = time.perf_counter()
         try:
-            self.__page_html__ = urllib.request.urlopen(urllib.request.Request(url))
+            with opener.open(urllib.request.Request(url), timeout=PROBE_TIMEOUT_SECONDS) as response:
+                page_html = response.read().decode('utf-8', errors='ignore')
         except Exception as detail:
-            print(f"atas: {detail}..")
-            return False
+            print(f"proxy {proxy}: unavailable ({detail})")
+            return None
 
-        return True
+        if page_html.find("Captcha") > 0:
+            print(f"proxy {proxy}: there is captcha")
+            return None
+
+        return time.perf_counter() - started_at
 
     def is_empty(self):
         return len(self.__proxy_pool__) == 0
 
-    def get_available_proxy(self, url):
-        print("The process of checking the proxies... Search an available one among them...")
+    def check_proxies(self, url):
+        """Параллельно проверяет все прокси пула и ранжирует доступные по времени ответа"""
+        with self.__lock__:
+            proxies = list(self.__proxy_pool__)
+        if not proxies:
+            return []
 
-        socket.setdefaulttimeout(5)
-        found_proxy = False
-        while len(self.__proxy_pool__) > 0 and found_proxy is False:
-            proxy = random.choice(self.__proxy_pool__)
+        print(f"The process of checking {len(proxies)} proxies...")
+        with ThreadPoolExecutor(max_workers=min(len(proxies), PROBE_MAX_WORKERS)) as executor:
+            latencies = list(executor.map(lambda proxy: self.__probe_proxy__(url, proxy), proxies))
 
-            is_available = self.__is_available_proxy__(url, proxy)
-            is_captcha = self.__is_captcha__() if is_available else None
+        ranked = sorted(
+            (latency, proxy) for proxy, latency in zip(proxies, latencies) if latency is not None
+        )
+        with self.__lock__:
+            self.__ranked_proxies__ = ranked
+            self.__ranked_at__ = time.monotonic()
 
-            if not is_available or is_captcha:
-                if is_captcha:
-                    print(f"proxy {proxy}: there is captcha.. trying another")
-                else:
-                    print(f"proxy {proxy}: unavailable.. trying another..")
-                self.__proxy_pool__.remove(proxy)
-                time.sleep(4)
-                continue
+        print(f"available proxies: {len(ranked)} of {len(proxies)}")
+        return [proxy for _, proxy in ranked]
 
-            print(f"proxy {proxy}: available.. stop searching")
-            self.__current_proxy__, found_proxy = proxy, True
+    def __ranking__(self, url):
+        """Рейтинг прокси. Проверяет пул, только если рейтинг устарел"""
+        with self.__lock__:
+            is_stale = time.monotonic() - self.__ranked_at__ > RANKING_TTL_SECONDS
+            ranked = list(self.__ranked_proxies__)
 
-        if self.__current_proxy__ is None:
+        if is_stale:
+            self.check_proxies(url)
+            with self.__lock__:
+                ranked = list(self.__ranked_proxies__)
+        return ranked
+
+    def is_available(self, proxy, url):
+        """Прошел ли прокси последнюю проверку (и не помечен плохим)"""
+        return any(p == proxy for _, p in self.__ranking__(url))
+
+    def get_available_proxy(self, url):
+        """Лучший доступный прокси. Проверяет пул, только если рейтинг устарел"""
+        ranked = self.__ranking__(url)
+
+        if not ranked:
             print(f"there are not available proxies..", end="\n\n")
+            self.__current_proxy__ = None
+            return None
 
+        self.__current_proxy__ = ranked[0][1]
         return self.__current_proxy__
+
+    def mark_bad(self, proxy):
+        """Убирает прокси из рейтинга (например, после капчи). Он вернется при следующей проверке, если оживет"""
+        with self.__lock__:
+            self.__ranked_proxies__ = [(latency, p) for latency, p in self.__ranked_proxies__ if p != proxy]
+        if self.__current_proxy__ == proxy:
+            self.__current_proxy__ = None
+
+    def start_background_checks(self, url, interval=RANKING_TTL_SECONDS // 2):
+        """Поддерживает рейтинг прокси актуальным в фоновом потоке"""
+        if self.is_empty() or (self.__warmup_thread__ is not None and self.__warmup_thread__.is_alive()):
+            return
+
+        def warmup_loop():
+            while not self.__warmup_stop__.wait(interval):
+                try:
+                    self.check_proxies(url)
+                except Exception as e:
+                    print(f"Ошибка фоновой проверки прокси: {e}")
+
+        self.__warmup_stop__.clear()
+        self.__warmup_thread__ = threading.Thread(target=warmup_loop, name="cian-proxy-warmup", daemon=True)
+        self.__warmup_thread__.start()
+
+    def stop_background_checks(self):
+        self.__warmup_stop__.set()
+        self.__warmup_thread__ = None
@@ -5,7 +5,7 @@ from datetime import datetime
 from transliterate import translit
 
 from ..constants import FILE_NAME_SUBURBAN_FORMAT
-from ..helpers import union_dicts, define_author, parse_location_data, define_price_data, define_deal_url_id
+from ..helpers import union_dicts, define_author, parse_location_data, define_price_data, define_deal_url_id, define_suburban_area
 from ..base_list import BaseListPageParser
 from .page import SuburbanPageParser
 
@@ -87,6 +87,7 @@ class SuburbanListPageParser(BaseListPageParser):
         author_data = define_author(block=offer)
         location_data = parse_location_data(block=offer)
         price_data = define_price_data(block=offer)
+        area_data = define_suburban_area(block=offer)
 
         if define_deal_url_id(common_data["url"]) in self.result_set:
             return
@@ -102,7 +103,7 @@ class SuburbanListPageParser(BaseListPageParser):
         self.count_parsed_offers += 1
         self.define_average_price(price_data=price_data)
         self.result_set.add(define_deal_url_id(common_data["url"]))
-        self.result.append(union_dicts(author_data, common_data, price_data, page_data, location_data))
+        self.result.append(union_dicts(author_data, common_data, price_data, area_data, page_data, location_data))
 
         if self.with_saving_csv:
             self.save_results()
@@ -0,0 +1,295 @@
+"""
+Офлайн-корпус страниц Циан и Авито для бенчмарков парсеров
+
+Страницы хранятся в benchmarks/fixtures/<kind>_<n>.html.gz, где kind:
+    cian_list  - страница списка квартир Циан
+    cian_flat  - страница объявления Циан
+    avito_list - страница каталога Авито (JSON в script[type=mime/invalid])
+    avito_item - страница объявления Авито
+
+Корпус в репозитории синтетический: страницы собраны генератором ниже по
+разметке, которую читают парсеры (карточки Циан, JSON каталога Авито), а не
+записаны с живых сайтов - запись требует браузера и прокси, которых нет в CI,
+и страницы с персональными данными продавцов нельзя хранить в репозитории.
+Поэтому корпус ловит регрессии кода парсеров, но не изменения верстки сайтов;
+живые страницы можно добавить командой record (их номера идут после синтетических).
+
+Использование (из директории backend):
+    python -m benchmarks.fixtures synthesize            # пересобрать синтетический корпус
+    python -m benchmarks.fixtures record cian_list URL  # записать живую страницу через браузер
+"""
+
+import argparse
+import gzip
+import html as html_module
+import json
+import pathlib
+import random
+import sys
+import time
+from typing import Dict, List
+
+FIXTURES_DIR = pathlib.Path(__file__).parent / "fixtures"
+FIXTURE_KINDS = ("cian_list", "cian_flat", "avito_list", "avito_item")
+
+SYNTHETIC_PAGES_PER_KIND = 3
+SYNTHETIC_OFFERS_PER_LIST_PAGE = 28
+SYNTHETIC_ITEMS_PER_AVITO_PAGE = 50
+
+DISTRICTS = ["Лефортово", "Хамовники", "Басманный", "Марьино", "Измайлово", "Останкинский", "Строгино"]
+METRO = ["Авиамоторная", "Парк культуры", "Бауманская", "Марьино", "Измайловская", "ВДНХ", "Строгино"]
+STREETS = ["ул. Золоторожский Вал", "Комсомольский просп.", "ул. Бакунинская", "Люблинская ул.",
+           "Измайловский бул.", "ул. Академика Королева", "Строгинский бул."]
+
+
+def save_fixture(kind: str, index: int, html: str) -> pathlib.Path:
+    """Сохранить страницу в корпус (gzip)"""
+    FIXTURES_DIR.mkdir(parents=True, exist_ok=True)
+    path = FIXTURES_DIR / f"{kind}_{index}.html.gz"
+    # mtime=0 - архив не меняется при пересборке одинаковых страниц
+    with open(path, "wb") as raw_file:
+        with gzip.GzipFile(fileobj=raw_file, mode="wb", compresslevel=9, mtime=0) as gz_file:
+            gz_file.write(html.encode("utf-8"))
+    return path
+
+
+def load_fixtures(kind: str) -> List[str]:
+    """Загрузить все страницы корпуса указанного типа"""
+    if kind not in FIXTURE_KINDS:
+        raise ValueError(f"Unknown fixture kind: {kind}. Available: {', '.join(FIXTURE_KINDS)}")
+
+    paths = sorted(FIXTURES_DIR.glob(f"{kind}_*.html.gz"), key=lambda p: int(p.name[len(kind) + 1:].split(".")[0]))
+    return [gzip.decompress(path.read_bytes()).decode("utf-8") for path in paths]
+
+
+def _page_chrome(rng: random.Random, title: str, body: str) -> str:
+    """Обвязка страницы: скрипты, стили и навигация, чтобы размер был близок к реальному"""
+    state_blob = json.dumps(
+        {"config": [{"key": f"feature_{i}", "value": rng.random()} for i in range(1500)]},
+        ensure_ascii=False,
+    )
+    menu = "".join(
+        f'<li class="menu-item-{i}"><a href="/section/{i}/"><span>Раздел {i}</span></a></li>' for i in range(300)
+    )
+    styles = "".join(f".c{i}{{margin:{i % 16}px;padding:{i % 8}px}}" for i in range(2000))
+    return (
+        f'<!DOCTYPE html><html lang="ru"><head><meta charset="utf-8"><title>{title}</title>'
+        f"<style>{styles}</style>"
+        f"<script>window.__state__ = {state_blob};</script></head><body>"
+        f'<div data-name="HeaderDefault"><nav><ul>{menu}</ul></nav></div>'
+        f"{body}"
+        f"<footer><ul>{menu}</ul></footer></body></html>"
+    )
+
+
+def _cian_offer(rng: random.Random, offer_id: int, is_rent: bool) -> str:
+    rooms = rng.choice(["1-комн. квартира", "2-комн. квартира", "3-комн. квартира", "Студия", "4-комн. квартира"])
+    meters = f"{rng.randint(18, 140)},{rng.randint(0, 9)}"
+    floors_count = rng.randint(5, 30)
+    floor = rng.randint(1, floors_count)
+    district_index = rng.randrange(len(DISTRICTS))
+    price = rng.randint(35, 250) * 1000 if is_rent else rng.randint(60, 900) * 100_000
+    price_text = f"{price:,} ₽/мес.".replace(",", " ") if is_rent else f"{price:,} ₽".replace(",", " ")
+    deal_path = "rent" if is_rent else "sale"
+    author = rng.choice([("Собственник", f"ID {offer_id % 100000}"), ("Агентство недвижимости", "Этажи")])
+    return (
+        '<article data-name="CardComponent">'
+        f"<div><span>{author[0]}</span><span>{author[1]}</span></div>"
+        '<div data-name="LinkArea">'
+        f'<a href="https://www.cian.ru/{deal_path}/flat/{offer_id}/"></a>'
+        f'<div data-name="GeneralInfoSectionRowComponent">{rooms}, {meters} м², {floor}/{floors_count} этаж</div>'
+        f'<div data-name="GeneralInfoSectionRowComponent">ЖК «Квартал {offer_id % 97}»</div>'
+        '<div data-name="GeneralInfoSectionRowComponent">'
+        f"Москва, р-н {DISTRICTS[district_index]}, м. {METRO[district_index]}, "
+        f"{STREETS[district_index]}, {rng.randint(1, 120)}</div>"
+        f'<span data-mark="MainPrice"><span>{price_text}</span></span>'
+        f'<div data-name="Description"><p>{"Светлая квартира с ремонтом. " * rng.randint(5, 20)}</p></div>'
+        "</div></article>"
+    )
+
+
+def build_cian_list_page(rng: random.Random, page_number: int) -> str:
+    is_rent = page_number % 2 == 0
+    offers = "".join(
+        _cian_offer(rng, 300_000_000 + page_number * 1000 + i, is_rent) for i in range(SYNTHETIC_OFFERS_PER_LIST_PAGE)
+    )
+    pagination = (
+        '<nav data-name="Pagination">'
+        '<button data-name="PaginationButton"><span>Назад</span></button>'
+        '<button data-name="PaginationButton"><span>Дальше</span></button></nav>'
+    )
+    return _page_chrome(rng, "Циан - список", f'<div data-name="Offers">{offers}</div>{pagination}')
+
+
+def build_cian_flat_page(rng: random.Random, page_number: int) -> str:
+    floors_count = rng.randint(5, 30)
+    features = {
+        "Тип жилья": "Вторичка",
+        "Тип дома": rng.choice(["Кирпичный", "Панельный", "Монолитный"]),
+        "Отопление": "Центральное",
+        "Отделка": "Без отделки",
+        "Площадь кухни": f"{rng.randint(6, 20)} м²",
+        "Жилая площадь": f"{rng.randint(15, 90)} м²",
+        "Год постройки": str(rng.randint(1950, 2023)),
+        "Этаж": f"{rng.randint(1, floors_count)} из {floors_count}",
+    }
+    feature_rows = "".join(f"<div><span>{key}</span><span>{value}</span></div>" for key, value in features.items())
+    noise = "".join(f"<div><span>Параметр {i}</span><span>{rng.randint(0, 999)}</span></div>" for i in range(400))
+    thumbs = "".join(
+        f'<li><img src="https://images.cdn-cian.ru/images/{page_number}-{i}-2.jpg"></li>' for i in range(rng.randint(5, 25))
+    )
+    phone = f"+7 9{rng.randint(10, 99)} {rng.randint(100, 999)}-{rng.randint(10, 99)}-{rng.randint(10, 99)}"
+    body = (
+        f'<div data-name="OfferSummaryInfoLayout">{feature_rows}</div>'
+        f'<div data-name="Details">{noise}</div>'
+        f'<ul data-name="PaginationThumbsComponent">{thumbs}</ul>'
+        f'<div data-name="OfferContactsAside"><a href="tel:{phone}">{phone}</a></div>'
+    )
+    return _page_chrome(rng, "Циан - объявление", body)
+
+
+def _avito_item(rng: random.Random, item_id: int, is_rent: bool, timestamp_ms: int) -> Dict:
+    rooms = rng.choice(["1-к. квартира", "2-к. квартира", "3-к. квартира", "Квартира-студия"])
+    meters = rng.randint(18, 140)
+    floors_count = rng.randint(5, 30)
+    price = rng.randint(35, 250) * 1000 if is_rent else rng.randint(60, 900) * 100_000
+    district_index = rng.randrange(len(DISTRICTS))
+    return {
+        "id": item_id,
+        "categoryId": 24,
+        "locationId": 637640,
+        "urlPath": f"/moskva/kvartiry/{item_id}",
+        "title": f"{rooms}, {meters} м², {rng.randint(1, floors_count)}/{floors_count} эт.",
+        "description": "Продается светлая квартира рядом с метро. " * rng.randint(3, 12),
+        "sortTimeStamp": timestamp_ms - rng.randint(0, 20 * 3600 * 1000),
+        "priceDetailed": {
+            "enabled": True,
+            "fullString": f"{price} ₽",
+            "hasValue": True,
+            "postfix": "в месяц" if is_rent else "",
+            "string": f"{price} ₽",
+            "stringWithoutDiscount": None,
+            "title": {"full": f"{price} ₽", "short": f"{price} ₽"},
+            "titleDative": f"{price} ₽",
+            "value": price,
+            "wasLowered": False,
+            "exponent": "",
+        },
+        "images": [
+            {
+                "472x472": f"https://00.img.avito.st/image/1/{item_id}-{i}-472",
+                "636x636": f"https://00.img.avito.st/image/1/{item_id}-{i}-636",
+                "864x864": f"https://00.img.avito.st/image/1/{item_id}-{i}-864",
+            }
+            for i in range(rng.randint(3, 12))
+        ],
+        "imagesCount": 12,
+        "geo": {
+            "geoReferences": [{"content": METRO[district_index]}],
+            "formattedAddress": f"Москва, {STREETS[district_index]}, {rng.randint(1, 120)}",
+        },
+        "isPromotion": False,
+    }
+
+
+def build_avito_list_page(rng: random.Random, page_number: int) -> str:
+    is_rent = page_number % 2 == 0
+    timestamp_ms = 1_700_000_000_000
+    items = [
+        _avito_item(rng, 4_000_000_000 + page_number * 1000 + i, is_rent, timestamp_ms)
+        for i in range(SYNTHETIC_ITEMS_PER_AVITO_PAGE)
+    ]
+    payload = json.dumps({"state": {"data": {"catalog": {"items": items}}}}, ensure_ascii=False)
+    body = f'<div data-marker="catalog-serp"></div><script type="mime/invalid">{html_module.escape(payload)}</script>'
+    return _page_chrome(rng, "Авито - каталог", body)
+
+
+def build_avito_item_page(rng: random.Random, page_number: int) -> str:
+    gallery = "".join(
+        f'<img src="https://00.img.avito.st/image/1/{page_number}-{i}-864">' for i in range(rng.randint(5, 25))
+    )
+    body = (
+        f'<div data-marker="image-gallery">{gallery}</div>'
+        '<div data-marker="item-view/total-views">'
+        f"{rng.randint(100, 9999)} просмотров, {rng.randint(1, 99)} сегодня</div>"
+        '<div data-marker="seller-info">'
+        f'<div data-marker="seller-info/name">Продавец {page_number}</div>'
+        '<div data-marker="seller-info/label">Частное лицо</div></div>'
+        f'<div data-marker="item-view/item-description">{"Описание квартиры. " * 50}</div>'
+    )
+    return _page_chrome(rng, "Авито - объявление", body)
+
+
+SYNTHETIC_BUILDERS = {
+    "cian_list": build_cian_list_page,
+    "cian_flat": build_cian_flat_page,
+    "avito_list": build_avito_list_page,
+    "avito_item": build_avito_item_page,
+}
+
+
+def synthesize_corpus(pages_per_kind: int = SYNTHETIC_PAGES_PER_KIND, seed: int = 42) -> List[pathlib.Path]:
+    """Пересобрать синтетический корпус (детерминированно для заданного seed)"""
+    paths = []
+    for kind, builder in SYNTHETIC_BUILDERS.items():
+        rng = random.Random(f"{seed}:{kind}")
+        for page_number in range(1, pages_per_kind + 1):
+            paths.append(save_fixture(kind, page_number, builder(rng, page_number)))
+    return paths
+
+
+def record_pages(kind: str, urls: List[str]) -> List[pathlib.Path]:
+    """Записать живые страницы в корпус (нужен браузер / доступ к сайту)"""
+    existing = len(load_fixtures(kind))
+    paths = []
+
+    if kind.startswith("cian"):
+        from app.vendors.cianparser import CianParser
+
+        parser = CianParser(location="Москва", headless=True)
+        try:
+            for index, url in enumerate(urls, existing + 1):
+                parser.__driver__.get(url)
+                time.sleep(4)
+                paths.append(save_fixture(kind, index, parser.__driver__.page_source))
+        finally:
+            parser.close_browser()
+    else:
+        from app.vendors.avitoparser import AvitoParser
+
+        parser = AvitoParser(location="moskva", headless=True)
+        try:
+            for index, url in enumerate(urls, existing + 1):
+                html = parser.fetch_data(url)
+                if html:
+                    paths.append(save_fixture(kind, index, html))
+        finally:
+            parser.close()
+
+    return paths
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description="Корпус страниц для бенчмарков парсеров")
+    subparsers = arg_parser.add_subparsers(dest="command", required=True)
+
+    synthesize = subparsers.add_parser("synthesize", help="пересобрать синтетический корпус")
+    synthesize.add_argument("--pages", type=int, default=SYNTHETIC_PAGES_PER_KIND)
+    synthesize.add_argument("--seed", type=int, default=42)
+
+    record = subparsers.add_parser("record", help="записать живые страницы")
+    record.add_argument("kind", choices=FIXTURE_KINDS)
+    record.add_argument("urls", nargs="+")
+
+    args = arg_parser.parse_args(argv)
+    if args.command == "synthesize":
+        paths = synthesize_corpus(pages_per_kind=args.pages, seed=args.seed)
+    else:
+        paths = record_pages(args.kind, args.urls)
+
+    for path in paths:
+        print(f"{path} ({path.stat().st_size} bytes)")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,209 @@
+"""
+Бенчмарк ответа /listings: прежний путь (ORM + pydantic) против строк + orjson
+
+Для SQLite-базы с синтетическими объявлениями (у каждого 10-30 фотографий)
+собирается одна и та же страница двумя способами:
+- orm: ORM-объекты Listing, отдельные запросы метаданных и аренды, заполнение
+  атрибутов, валидация PaginatedListingsResponse (json.loads картинок в валидаторе)
+  и сериализация модели pydantic в JSON, как делает FastAPI с response_model -
+  так было в main.py до перехода на orjson;
+- rows: listing_page_query (один запрос) и listing_page_response (orjson,
+  картинки вставляются в ответ без декодирования).
+Отдельно замеряется только сериализация уже загруженной страницы. Подсчет
+total и статистика не входят в замер (они кэшируются и одинаковы для обоих путей).
+Перед замером ответы обоих путей сравниваются.
+
+Использование (из директории backend):
+    python -m benchmarks.listings_response_bench
+    python -m benchmarks.listings_response_bench --rows 50000 --per-page 10 50 100
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from app.db import Base
+from app.favorites.service import listing_page_query
+from app.listings.models import ListingMetadata
+from app.listings.responses import listing_page_response
+from app.listings.service import get_metadata_for_listings
+from app.parsers.models import Listing, ListingFilters, ListingStats, PaginatedListingsResponse
+from app.rent.models import RentListing
+
+COMPANY_ID = "company-1"
+FILTERS = ListingFilters(deal_type="sale")
+STATS = ListingStats(max_price=100_000_000, max_meters=150)
+
+
+def fill_database(session, rows: int, seed: int = 42):
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    listings, metadata, rent = [], [], []
+    for i in range(rows):
+        listing_id = f"{i:08d}"
+        images = [f"https://images.example.com/{i}/{n}.jpg" for n in range(rng.randint(10, 30))]
+        listings.append({
+            "id": listing_id,
+            "created_at": now - timedelta(seconds=i),
+            "deal_type": "sale",
+            "price": float(rng.randint(3, 90) * 1_000_000),
+            "total_meters": float(rng.randint(18, 140)),
+            "floor": f"{rng.randint(1, 20)}/25",
+            "location": "Москва, ул. Тверская, 12, м. Пушкинская",
+            "source": rng.choice(["cian", "avito"]),
+            "url": f"https://example.com/{i}",
+            "phone_number": "+79990000000",
+            "rooms_count": float(rng.randint(1, 5)),
+            "is_favorite": False,
+            "images": json.dumps(images),
+        })
+        if rng.random() < 0.2:
+            metadata.append({"id": f"m{i:08d}", "listing_id": listing_id, "company_id": COMPANY_ID,
+                             "status": "in_progress", "responsible_user_id": "user-1"})
+        if rng.random() < 0.05:
+            rent.append({"id": f"r{i:08d}", "listing_id": listing_id, "company_id": COMPANY_ID,
+                         "tenant_first_name": "a", "tenant_last_name": "b", "tenant_phone": "1",
+                         "rent_price": 50000, "rent_start_date": now.date(), "rent_end_date": now.date()})
+        if len(listings) == 10000:
+            session.execute(insert(Listing), listings)
+            listings = []
+    for model, batch in ((Listing, listings), (ListingMetadata, metadata), (RentListing, rent)):
+        if batch:
+            session.execute(insert(model), batch)
+    session.commit()
+
+
+def orm_page(session, page: int, per_page: int):
+    """Страница как в main.py до перехода на строки: ORM-объекты и два дополнительных запроса"""
+    listings = (session.query(Listing)
+                .order_by(Listing.created_at.desc(), Listing.id.desc())
+                .offset((page - 1) * per_page).limit(per_page).all())
+    listing_ids = [l.id for l in listings]
+    metadata_map = get_metadata_for_listings(session, listing_ids, COMPANY_ID)
+    rent_listing_ids = {rl.listing_id for rl in session.query(RentListing.listing_id).filter(
+        RentListing.listing_id.in_(listing_ids), RentListing.company_id == COMPANY_ID
+    ).all()}
+    for listing in listings:
+        metadata = metadata_map.get(listing.id)
+        listing.responsible = metadata.responsible_user_id if metadata else None
+        listing.status = metadata.status if metadata else "new"
+        listing.is_in_rent = listing.id in rent_listing_ids
+    return listings
+
+
+def orm_encode(listings, page: int, per_page: int) -> bytes:
+    response = PaginatedListingsResponse(items=listings, total=0, page=page, per_page=per_page, total_pages=0,
+                                         filters=FILTERS, stats=STATS)
+    return response.model_dump_json().encode()
+
+
+def rows_page(session, page: int, per_page: int):
+    return (listing_page_query(session, COMPANY_ID)
+            .order_by(Listing.created_at.desc(), Listing.id.desc())
+            .offset((page - 1) * per_page).limit(per_page).all())
+
+
+def rows_encode(rows, page: int, per_page: int) -> bytes:
+    return listing_page_response(rows, total=0, page=page, per_page=per_page, total_pages=0,
+                                 filters=FILTERS, stats=STATS).body
+
+
+def measure(run: Callable, repeat: int) -> Dict:
+    latencies = []
+    for _ in range(repeat):
+        started_at = time.perf_counter()
+        run()
+        latencies.append(time.perf_counter() - started_at)
+    return {
+        "ms_p50": statistics.median(latencies) * 1000,
+        "pages_per_second": len(latencies) / sum(latencies),
+    }
+
+
+def run_benchmarks(session, per_page_values: List[int], pages: int, repeat: int) -> List[Dict]:
+    results = []
+    for per_page in per_page_values:
+        page_numbers = list(range(1, pages + 1))
+
+        # Оба пути должны отдавать одинаковый JSON
+        for page in page_numbers[:3]:
+            old = json.loads(orm_encode(orm_page(session, page, per_page), page, per_page))
+            new = json.loads(rows_encode(rows_page(session, page, per_page), page, per_page))
+            old.pop("next_cursor", None), old.pop("total_is_estimate", None)
+            new.pop("next_cursor", None), new.pop("total_is_estimate", None)
+            if old != new:
+                raise AssertionError(f"ответы отличаются: per_page={per_page}, page={page}")
+            session.expunge_all()
+
+        def full(page_fn, encode_fn):
+            def run():
+                for page in page_numbers:
+                    encode_fn(page_fn(session, page, per_page), page, per_page)
+                session.expunge_all()
+            return run
+
+        orm_pages = [orm_page(session, page, per_page) for page in page_numbers]
+        row_pages = [rows_page(session, page, per_page) for page in page_numbers]
+
+        def encode_only(loaded, encode_fn):
+            def run():
+                for page, items in zip(page_numbers, loaded):
+                    encode_fn(items, page, per_page)
+            return run
+
+        for path, run in (
+            ("orm: запрос + сериализация", full(orm_page, orm_encode)),
+            ("rows: запрос + сериализация", full(rows_page, rows_encode)),
+            ("orm: только сериализация", encode_only(orm_pages, orm_encode)),
+            ("rows: только сериализация", encode_only(row_pages, rows_encode)),
+        ):
+            result = measure(run, repeat)
+            # Замер идет по pages страниц за прогон
+            results.append({
+                "per_page": per_page,
+                "path": path,
+                "page_ms_p50": result["ms_p50"] / pages,
+                "pages_per_second": result["pages_per_second"] * pages,
+            })
+        session.expunge_all()
+    return results
+
+
+def main(argv=None) -> int:
+    arg_parser = argparse.ArgumentParser(description="Бенчмарк сериализации страниц /listings")
+    arg_parser.add_argument("--rows", type=int, default=20_000, help="объявлений в базе")
+    arg_parser.add_argument("--per-page", type=int, nargs="*", default=[10, 50, 100])
+    arg_parser.add_argument("--pages", type=int, default=20, help="разных страниц за прогон")
+    arg_parser.add_argument("--repeat", type=int, default=5, help="прогонов")
+    args = arg_parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp_dir, 'listings.db')}")
+        Base.metadata.create_all(engine, tables=[Listing.__table__, ListingMetadata.__table__,
+                                                 RentListing.__table__])
+        session = sessionmaker(bind=engine)()
+        fill_database(session, args.rows)
+
+        results = run_benchmarks(session, args.per_page, args.pages, args.repeat)
+        session.close()
+        engine.dispose()
+
+    print(f"{'per_page':>8}  {'path':<30} {'ms/page p50':>12} {'pages/s':>9}")
+    for result in results:
+        print(f"{result['per_page']:>8}  {result['path']:<30} {result['page_ms_p50']:>12.2f} "
+              f"{result['pages_per_second']:>9.0f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
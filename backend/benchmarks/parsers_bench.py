@@ -0,0 +1,227 @@
+"""
+Бенчмарк парсеров Циан и Авито на офлайн-корпусе (benchmarks/fixtures)
+
+Для каждой страницы корпуса измеряется задержка (медиана и p95 по повторам),
+пиковая память и число удерживаемых результатом блоков (tracemalloc), а также
+пропускная способность в страницах в секунду. Сетевые запросы и паузы
+парсеров (time.sleep) не выполняются.
+
+Использование (из директории backend):
+    python -m benchmarks.parsers_bench
+    python -m benchmarks.parsers_bench --json bench.json
+    python -m benchmarks.parsers_bench --baseline bench.json --max-regression 0.25
+
+С --baseline скрипт завершается с кодом 1, если медианная задержка
+какого-либо бенчмарка выросла больше чем на --max-regression или число
+удерживаемых блоков - больше чем на --max-blocks-regression. В CI
+(.github/workflows/parsers-bench.yml) baseline снимается на базовом коммите
+на той же машине, поэтому сравнение не зависит от скорости раннера.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Callable, Dict, List
+from unittest import mock
+
+import bs4
+from loguru import logger
+
+from benchmarks.fixtures import load_fixtures
+from app.vendors.cianparser.flat.list import FlatListPageParser
+from app.vendors.cianparser.flat.page import FlatPageParser
+from app.vendors.avitoparser.realty.list import RealtyListPageParser
+from app.vendors.avitoparser.realty.page import RealtyPageParser
+from app.parsers.adapters.avito_adapter import AvitoAdapter
+
+
+def run_cian_list(html: str):
+    parser = FlatListPageParser(
+        driver=None,
+        accommodation_type="flat",
+        deal_type="sale",
+        rent_period_type=None,
+        location_name="Москва",
+    )
+    parser.parse_list_offers_page(html=html, page_number=1, count_of_pages=1, attempt_number=0)
+    return len(parser.result)
+
+
+def run_cian_flat(html: str):
+    # Повторяет FlatPageParser.__load_page__ без обращения к браузеру
+    parser = FlatPageParser(driver=None, url="")
+    parser.offer_page_html = html
+    parser.offer_page_soup = bs4.BeautifulSoup(html, "html.parser")
+    return parser.__parse_flat_offer_page_json__()
+
+
+def run_avito_list(html: str):
+    parser = RealtyListPageParser(driver=None, category="kvartiry", deal_type="sale", location="moskva")
+    parser.parse_list_page(html=html, page_number=1)
+    return parser.result
+
+
+def run_avito_item(html: str):
+    parser = RealtyPageParser(driver=None, url="")
+    parser.html = html
+    parser.soup = bs4.BeautifulSoup(html, "html.parser")
+    return parser.parse_views(), parser.parse_seller(), parser.parse_images()
+
+
+def prepare_avito_items(html: str):
+    """Элементы каталога для бенчмарка маппинга, с временем публикации сдвинутым к текущему моменту"""
+    items = run_avito_list(html)
+    timestamps = [item.sortTimeStamp for item in items if item.sortTimeStamp]
+    if timestamps:
+        shift = int(datetime.now().timestamp() * 1000) - max(timestamps)
+        for item in items:
+            if item.sortTimeStamp:
+                item.sortTimeStamp += shift
+    return items
+
+
+def run_avito_mapping(items):
+    # Адаптер без запуска браузера: для маппинга parser не нужен
+    adapter = AvitoAdapter.__new__(AvitoAdapter)
+    return adapter.map_basic_listings(items)
+
+
+# name -> (fixture kind, подготовка входа, измеряемая функция)
+BENCHMARKS: Dict[str, tuple] = {
+    "FlatListPageParser.parse_list_offers_page": ("cian_list", None, run_cian_list),
+    "FlatPageParser.__parse_flat_offer_page_json__": ("cian_flat", None, run_cian_flat),
+    "RealtyListPageParser.parse_list_page": ("avito_list", None, run_avito_list),
+    "RealtyPageParser (views/seller/images)": ("avito_item", None, run_avito_item),
+    "AvitoAdapter.map_basic_listings": ("avito_list", prepare_avito_items, run_avito_mapping),
+}
+
+
+@contextlib.contextmanager
+def quiet_parsers():
+    """Отключить паузы и вывод прогресса парсеров на время замеров"""
+    logger.disable("app.vendors")
+    try:
+        with mock.patch("time.sleep"), contextlib.redirect_stdout(io.StringIO()):
+            yield
+    finally:
+        logger.enable("app.vendors")
+
+
+def measure(run: Callable, inputs: List, repeat: int) -> Dict:
+    latencies = []
+    for _ in range(repeat):
+        for page_input in inputs:
+            started_at = time.perf_counter()
+            run(page_input)
+            latencies.append(time.perf_counter() - started_at)
+
+    # Память считаем отдельным проходом: tracemalloc заметно замедляет код.
+    # peak - пик выделенной памяти за вызов, blocks - блоки, которые удерживает результат
+    peaks = []
+    blocks = []
+    for page_input in inputs:
+        tracemalloc.start()
+        result = run(page_input)
+        snapshot = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        peaks.append(peak)
+        blocks.append(sum(stat.count for stat in snapshot.statistics("filename")))
+        del result
+
+    latencies.sort()
+    total_seconds = sum(latencies)
+    return {
+        "pages": len(inputs),
+        "runs": len(latencies),
+        "latency_ms_p50": statistics.median(latencies) * 1000,
+        "latency_ms_p95": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000,
+        "peak_kb": max(peaks) / 1024,
+        "retained_blocks": int(statistics.mean(blocks)),
+        "pages_per_second": len(latencies) / total_seconds if total_seconds else 0.0,
+    }
+
+
+def run_benchmarks(repeat: int, only: List[str] = None) -> Dict[str, Dict]:
+    results = {}
+    for name, (kind, prepare, run) in BENCHMARKS.items():
+        if only and not any(part.lower() in name.lower() for part in only):
+            continue
+
+        pages = load_fixtures(kind)
+        if not pages:
+            print(f"⚠️ {name}: нет страниц {kind} в корпусе, пропускаем")
+            continue
+
+        with quiet_parsers():
+            inputs = [prepare(page) for page in pages] if prepare else pages
+            run(inputs[0])  # прогрев
+            results[name] = measure(run, inputs, repeat)
+    return results
+
+
+def print_results(results: Dict[str, Dict]):
+    print(f"{'benchmark':<48} {'pages':>5} {'p50 ms':>9} {'p95 ms':>9} {'peak KB':>9} {'blocks':>8} {'pages/s':>9}")
+    for name, result in results.items():
+        print(f"{name:<48} {result['pages']:>5} {result['latency_ms_p50']:>9.2f} {result['latency_ms_p95']:>9.2f} "
+              f"{result['peak_kb']:>9.0f} {result['retained_blocks']:>8} {result['pages_per_second']:>9.1f}")
+
+
+def compare_with_baseline(results: Dict[str, Dict], baseline: Dict[str, Dict], max_regression: float,
+                          max_blocks_regression: float) -> List[str]:
+    """Регрессии p50 задержки и удерживаемых блоков (блоки не зависят от машины и шума)"""
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        before = baseline[name]["latency_ms_p50"]
+        after = result["latency_ms_p50"]
+        if before and (after - before) / before > max_regression:
+            regressions.append(f"{name}: p50 {before:.2f} ms -> {after:.2f} ms (+{(after - before) * 100 / before:.0f}%)")
+        before = baseline[name]["retained_blocks"]
+        after = result["retained_blocks"]
+        if before and (after - before) / before > max_blocks_regression:
+            regressions.append(f"{name}: blocks {before} -> {after} (+{(after - before) * 100 / before:.0f}%)")
+    return regressions
+
+
+def main(argv=None) -> int:
+    arg_parser = argparse.ArgumentParser(description="Бенчмарк парсеров на офлайн-корпусе")
+    arg_parser.add_argument("--repeat", type=int, default=5, help="повторов на каждую страницу")
+    arg_parser.add_argument("--only", nargs="*", help="запустить бенчмарки, имя которых содержит подстроку")
+    arg_parser.add_argument("--json", dest="json_path", help="сохранить результаты в JSON")
+    arg_parser.add_argument("--baseline", help="JSON с предыдущими результатами для сравнения")
+    arg_parser.add_argument("--max-regression", type=float, default=0.25, help="допустимый рост p50 (доля)")
+    arg_parser.add_argument("--max-blocks-regression", type=float, default=0.10,
+                            help="допустимый рост удерживаемых блоков (доля)")
+    args = arg_parser.parse_args(argv)
+
+    results = run_benchmarks(repeat=args.repeat, only=args.only)
+    print_results(results)
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare_with_baseline(results, baseline, args.max_regression, args.max_blocks_regression)
+        if regressions:
+            print("\n❌ Регрессии производительности:")
+            for regression in regressions:
+                print(f"   {regression}")
+            return 1
+        print("\n✅ Регрессий относительно baseline нет")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
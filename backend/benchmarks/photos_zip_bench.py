@@ -0,0 +1,146 @@
+"""
+Бенчмарк ZIP с фотографиями объявления: время до первого байта, общее время и пиковая память
+
+Фотографии отдает подставной транспорт httpx с задержкой ответа (CDN Циан/Авито
+отвечают за сотни миллисекунд), содержимое - случайные байты (как JPEG, не сжимается).
+Сравниваются:
+- sequential: как было в generate_photos_zip - фото по очереди, ZIP_DEFLATED,
+  отдача кусками по 1 МБ;
+- concurrent: как сейчас (app/listings/photos.py) - параллельные загрузки,
+  ZIP_STORED, отдача по записям, пустой кэш фото (первое скачивание);
+- cached: то же, повторное скачивание - фото из кэша на диске (app/listings/image_cache.py).
+Кэш создается во временной директории.
+Пиковая память - по tracemalloc: архив пишется во временный файл, содержимое фото
+создается до замера, поэтому в пик входят только копии, которые делает сборка архива.
+Перед замером оба архива проверяются (testzip и список файлов).
+
+Использование (из директории backend):
+    python -m benchmarks.photos_zip_bench
+    python -m benchmarks.photos_zip_bench --photos 20 --photo-kb 800 --latency-ms 300
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+import zipfile
+from typing import AsyncGenerator, Callable, Dict, List
+
+import httpx
+
+from app.listings.image_cache import ImageCache
+from app.listings.photos import MAX_PHOTOS, generate_photos_zip
+
+
+def make_client(images: List[str], photo_kb: int, latency_ms: float, seed: int = 42) -> httpx.AsyncClient:
+    rng = random.Random(seed)
+    # Содержимое создается до замера памяти
+    payloads = {url: os.urandom(photo_kb * 1024) for url in images}
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        # Задержка с разбросом: фото приходят не в порядке запросов
+        await asyncio.sleep(latency_ms / 1000 * rng.uniform(0.5, 1.5))
+        return httpx.Response(200, content=payloads[str(request.url)])
+
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+async def sequential_zip(images: List[str], client: httpx.AsyncClient) -> AsyncGenerator[bytes, None]:
+    """Как было до параллельной сборки архива"""
+    class ZipStream:
+        def __init__(self):
+            self.buffer = bytearray()
+
+        def write(self, data):
+            self.buffer.extend(data)
+            return len(data)
+
+        def flush(self):
+            pass
+
+    stream = ZipStream()
+    with zipfile.ZipFile(stream, 'w', zipfile.ZIP_DEFLATED) as zip_file:
+        for idx, image_url in enumerate(images[:MAX_PHOTOS], 1):
+            response = await client.get(image_url)
+            if response.status_code == 200:
+                ext = image_url.split('.')[-1].split('?')[0][:4] or 'jpg'
+                zip_file.writestr(f"photo_{idx}.{ext}", response.content)
+                if len(stream.buffer) >= 1024 * 1024:
+                    yield bytes(stream.buffer)
+                    stream.buffer.clear()
+    if stream.buffer:
+        yield bytes(stream.buffer)
+
+
+def concurrent_zip(cache: ImageCache) -> Callable:
+    def build(images: List[str], client: httpx.AsyncClient) -> AsyncGenerator[bytes, None]:
+        return generate_photos_zip(images, "bench", client=client, cache=cache)
+    return build
+
+
+async def run_once(build: Callable, images: List[str], photo_kb: int, latency_ms: float) -> Dict:
+    async with make_client(images, photo_kb, latency_ms) as client:
+        with tempfile.TemporaryFile() as archive:
+            tracemalloc.start()
+            started_at = time.perf_counter()
+            first_byte_at = None
+            async for chunk in build(images, client):
+                if first_byte_at is None:
+                    first_byte_at = time.perf_counter()
+                archive.write(chunk)
+            finished_at = time.perf_counter()
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            size = archive.tell()
+            archive.seek(0)
+            with zipfile.ZipFile(archive) as zip_file:
+                if zip_file.testzip() is not None:
+                    raise AssertionError("поврежденный архив")
+                names = sorted(zip_file.namelist())
+    return {
+        "ttfb_ms": (first_byte_at - started_at) * 1000,
+        "total_ms": (finished_at - started_at) * 1000,
+        "peak_mb": peak / 1024 / 1024,
+        "size_mb": size / 1024 / 1024,
+        "names": names,
+    }
+
+
+async def run_benchmarks(photos: int, photo_kb: int, latency_ms: float) -> List[Dict]:
+    images = [f"https://cdn.example.com/{i}.jpg" for i in range(photos)]
+    results = []
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cache = ImageCache(cache_dir, 1024 * 1024 * 1024, 100 * 1024 * 1024)
+        # concurrent и cached - один кэш: первый прогон его заполняет
+        for path, build in (("sequential", sequential_zip), ("concurrent", concurrent_zip(cache)),
+                            ("cached", concurrent_zip(cache))):
+            result = await run_once(build, images, photo_kb, latency_ms)
+            result["path"] = path
+            results.append(result)
+    if any(result["names"] != results[0]["names"] for result in results):
+        raise AssertionError("в архивах разные файлы")
+    return results
+
+
+def main(argv=None) -> int:
+    arg_parser = argparse.ArgumentParser(description="Бенчмарк ZIP с фотографиями объявления")
+    arg_parser.add_argument("--photos", type=int, default=MAX_PHOTOS, help="фотографий в объявлении")
+    arg_parser.add_argument("--photo-kb", type=int, default=500, help="размер фотографии, КБ")
+    arg_parser.add_argument("--latency-ms", type=float, default=200, help="средняя задержка CDN, мс")
+    args = arg_parser.parse_args(argv)
+
+    results = asyncio.run(run_benchmarks(args.photos, args.photo_kb, args.latency_ms))
+    print(f"{'path':<11} {'ttfb ms':>9} {'total ms':>9} {'peak MB':>8} {'zip MB':>7}")
+    for result in results:
+        print(f"{result['path']:<11} {result['ttfb_ms']:>9.1f} {result['total_ms']:>9.1f} "
+              f"{result['peak_mb']:>8.1f} {result['size_mb']:>7.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
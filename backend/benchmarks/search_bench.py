@@ -0,0 +1,185 @@
+"""
+Бенчмарк нечеткого поиска по адресу: обратный индекс слов против перебора rapidfuzz
+
+Для каждого размера таблицы создается отдельная SQLite-база с синтетическими
+адресами, строится индекс listing_search_tokens и выполняется один и тот же
+набор запросов (точные слова, слова с опечаткой, короткие слова и несколько
+слов сразу). Для индекса замеряется то же, что делает /listings: count и
+первая страница. Для перебора (прежняя реализация apply_listing_filters)
+замеряется сам перебор и сверяется результат: recall - доля найденных
+перебором объявлений, которые нашел индекс, extra - найденные только индексом.
+
+Использование (из директории backend):
+    python -m benchmarks.search_bench
+    python -m benchmarks.search_bench --sizes 10000 100000 1000000 --scan-limit 100000
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+from rapidfuzz import fuzz
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from app.db import Base
+from app.parsers.models import Listing
+from app.listings.models import ListingSearchToken, SearchVocabulary
+from app.listings.search import apply_search_filter, rebuild_search_index
+
+STREET_STEMS = [
+    "Тверская", "Арбат", "Бакунинская", "Люблинская", "Профсоюзная", "Новослободская", "Мясницкая",
+    "Покровка", "Маросейка", "Пятницкая", "Ордынка", "Таганская", "Нижегородская", "Волгоградский",
+    "Рязанский", "Ленинский", "Вернадского", "Мичуринский", "Кутузовский", "Можайское", "Дмитровское",
+    "Алтуфьевское", "Ярославское", "Щелковское", "Каширское", "Варшавское", "Симферопольский",
+    "Андропова", "Коломенская", "Кантемировская", "Академика Королева", "Золоторожский Вал",
+    "Бутырская", "Сущевский Вал", "Мещанская", "Сретенка", "Остоженка", "Пречистенка", "Зубовский",
+    "Фрунзенская", "Комсомольский", "Хорошевское", "Народного Ополчения", "Маршала Жукова",
+]
+STREET_KINDS = ["ул.", "просп.", "бул.", "ш.", "пер.", "наб."]
+DISTRICTS = ["Лефортово", "Хамовники", "Басманный", "Марьино", "Измайлово", "Останкинский", "Строгино",
+             "Тверской", "Пресненский", "Дорогомилово", "Нагатино-Садовники", "Южнопортовый", "Сокол"]
+METRO = ["Авиамоторная", "Парк культуры", "Бауманская", "Марьино", "Измайловская", "ВДНХ", "Строгино",
+         "Таганская", "Китай-город", "Полежаевская", "Коломенская", "Динамо", "Сокол", "Тульская"]
+
+QUERIES = [
+    "Тверская", "Тверскя", "тверская 12", "Арбат", "Арбот", "Бакунинская", "Бакунинсакя",
+    "Профсоюзная", "Проф", "ул", "Марьино", "Маръино", "Академика Королева", "Короелва",
+    "Кутузовский", "Новослободская", "Новослабодская", "Лефортово", "Лефортого", "Китай-город",
+    "Золоторожский", "Зубовский", "Пятницкая", "Пятницкйа", "Строгино", "Сокол", "5",
+]
+
+
+def generate_location(rng: random.Random) -> str:
+    street = f"{rng.choice(STREET_KINDS)} {rng.choice(STREET_STEMS)}"
+    return (f"Москва, {street}, {rng.randint(1, 180)}, р-н {rng.choice(DISTRICTS)}, "
+            f"м. {rng.choice(METRO)}")
+
+
+def fill_database(session, size: int, seed: int = 42):
+    rng = random.Random(seed)
+    batch = []
+    for i in range(size):
+        batch.append({
+            "id": f"{i:08d}",
+            "deal_type": rng.choice(["sale", "rent"]),
+            "price": float(rng.randint(3, 90) * 1_000_000),
+            "total_meters": float(rng.randint(18, 140)),
+            "location": generate_location(rng),
+            "source": rng.choice(["cian", "avito"]),
+            "url": f"https://example.com/{i}",
+            "is_favorite": False,
+        })
+        if len(batch) == 10000:
+            session.execute(insert(Listing), batch)
+            batch = []
+    if batch:
+        session.execute(insert(Listing), batch)
+    session.commit()
+
+
+def scan_search(session, search: str) -> set:
+    """Прежний перебор из apply_listing_filters: все объявления в память и rapidfuzz по каждому слову"""
+    search_words = search.lower().split()
+    filtered_ids = set()
+    for listing in session.query(Listing).all():
+        location_words = listing.location.lower().split()
+        if any(fuzz.partial_ratio(search_word, location_word) >= 80
+               for search_word in search_words for location_word in location_words):
+            filtered_ids.add(listing.id)
+    session.expunge_all()
+    return filtered_ids
+
+
+def index_search(session, search: str) -> set:
+    query = apply_search_filter(session.query(Listing.id), search)
+    return {listing_id for listing_id, in query}
+
+
+def index_page(session, search: str):
+    """То, что делает /listings: count и первая страница"""
+    query = apply_search_filter(session.query(Listing), search)
+    total = query.count()
+    items = query.offset(0).limit(10).all()
+    session.expunge_all()
+    return total, items
+
+
+def timed(run, *args):
+    started_at = time.perf_counter()
+    result = run(*args)
+    return time.perf_counter() - started_at, result
+
+
+def percentile(values: List[float], share: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+
+def run_size(size: int, scan_limit: int, repeat: int) -> Dict:
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp_dir, 'search.db')}")
+        Base.metadata.create_all(engine, tables=[Listing.__table__, ListingSearchToken.__table__,
+                                                 SearchVocabulary.__table__])
+        session = sessionmaker(bind=engine)()
+
+        fill_database(session, size)
+        index_seconds, _ = timed(rebuild_search_index, session)
+
+        index_latencies, scan_latencies = [], []
+        found, missed, extra = 0, 0, 0
+        for search in QUERIES:
+            for _ in range(repeat):
+                seconds, _ = timed(index_page, session, search)
+                index_latencies.append(seconds)
+            if size <= scan_limit:
+                seconds, scan_ids = timed(scan_search, session, search)
+                scan_latencies.append(seconds)
+                index_ids = index_search(session, search)
+                found += len(scan_ids & index_ids)
+                missed += len(scan_ids - index_ids)
+                extra += len(index_ids - scan_ids)
+
+        session.close()
+        engine.dispose()
+
+    result = {
+        "size": size,
+        "index_build_s": index_seconds,
+        "index_ms_p50": statistics.median(index_latencies) * 1000,
+        "index_ms_p95": percentile(index_latencies, 0.95) * 1000,
+    }
+    if scan_latencies:
+        result.update({
+            "scan_ms_p50": statistics.median(scan_latencies) * 1000,
+            "recall": found / (found + missed) if found + missed else 1.0,
+            "extra": extra,
+        })
+    return result
+
+
+def main(argv=None) -> int:
+    arg_parser = argparse.ArgumentParser(description="Бенчмарк нечеткого поиска по адресу")
+    arg_parser.add_argument("--sizes", type=int, nargs="*", default=[10_000, 100_000, 1_000_000])
+    arg_parser.add_argument("--scan-limit", type=int, default=100_000,
+                            help="не запускать перебор rapidfuzz на таблицах больше этого размера")
+    arg_parser.add_argument("--repeat", type=int, default=3, help="повторов каждого запроса через индекс")
+    args = arg_parser.parse_args(argv)
+
+    print(f"{'listings':>9} {'build s':>8} {'index p50 ms':>13} {'index p95 ms':>13} {'scan p50 ms':>12} {'recall':>7} {'extra':>6}")
+    for size in args.sizes:
+        result = run_size(size, args.scan_limit, args.repeat)
+        scan = (f"{result['scan_ms_p50']:>12.1f} {result['recall']:>7.4f} {result['extra']:>6}"
+                if "scan_ms_p50" in result else f"{'-':>12} {'-':>7} {'-':>6}")
+        print(f"{result['size']:>9} {result['index_build_s']:>8.1f} {result['index_ms_p50']:>13.1f} "
+              f"{result['index_ms_p95']:>13.1f} {scan}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,73 @@
+from logging.config import fileConfig
+
+from alembic import context
+from sqlalchemy import Uuid, engine_from_config, pool
+
+from app.core.config import settings
+from app.db import Base
+# Модели нужны в Base.metadata для alembic revision --autogenerate
+import app.users.models  # noqa: F401
+import app.parsers.models  # noqa: F401
+import app.favorites.models  # noqa: F401
+import app.listings.models  # noqa: F401
+import app.rent.models  # noqa: F401
+
+config = context.config
+
+# При запуске из приложения логирование уже настроено - не перетираем его
+if config.config_file_name is not None and config.attributes.get("configure_logger", True):
+    fileConfig(config.config_file_name)
+
+# URL можно передать явно (бенчмарк планов запросов), иначе - из настроек приложения
+if not config.get_main_option("sqlalchemy.url"):
+    config.set_main_option("sqlalchemy.url", settings.DATABASE_URL.replace("%", "%%"))
+
+target_metadata = Base.metadata
+
+
+def compare_type(context, inspected_column, metadata_column, inspected_type, metadata_type):
+    # SQLite отдает колонки UUID как NUMERIC - это не изменение схемы
+    if context.dialect.name == "sqlite" and isinstance(metadata_type, Uuid):
+        return False
+    return None
+
+
+def run_migrations_offline():
+    context.configure(
+        url=config.get_main_option("sqlalchemy.url"),
+        target_metadata=target_metadata,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+        compare_type=compare_type,
+        render_as_batch=True,
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online():
+    connectable = config.attributes.get("connection")
+    if connectable is None:
+        connectable = engine_from_config(
+            config.get_section(config.config_ini_section, {}),
+            prefix="sqlalchemy.",
+            poolclass=pool.NullPool,
+        )
+        with connectable.connect() as connection:
+            _run(connection)
+    else:
+        _run(connectable)
+
+
+def _run(connection):
+    # render_as_batch - ALTER TABLE на SQLite через пересоздание таблицы
+    context.configure(connection=connection, target_metadata=target_metadata,
+                      compare_type=compare_type, render_as_batch=True)
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
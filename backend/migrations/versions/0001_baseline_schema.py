@@ -0,0 +1,136 @@
+"""baseline schema
+
+Схема, которую до миграций создавал Base.metadata.create_all при старте.
+Базы, созданные так, помечаются этой ревизией без выполнения (см. app/db.py::upgrade_database).
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-19 13:49:21.060620
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('listings',
+    sa.Column('id', sa.String(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('deal_type', sa.String(), nullable=False),
+    sa.Column('price', sa.Float(), nullable=False),
+    sa.Column('total_meters', sa.Float(), nullable=False),
+    sa.Column('floor', sa.String(), nullable=True),
+    sa.Column('location', sa.String(), nullable=False),
+    sa.Column('source', sa.String(), nullable=False),
+    sa.Column('url', sa.String(), nullable=False),
+    sa.Column('phone_number', sa.String(), nullable=True),
+    sa.Column('rooms_count', sa.Float(), nullable=True),
+    sa.Column('home_type', sa.String(), nullable=True),
+    sa.Column('is_favorite', sa.Boolean(), nullable=False),
+    sa.Column('images', sa.Text(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_listings_id', 'listings', ['id'], unique=True)
+
+    op.create_table('users',
+    sa.Column('id', postgresql.UUID(as_uuid=True), nullable=False),
+    sa.Column('email', sa.String(), nullable=False),
+    sa.Column('first_name', sa.String(), nullable=True),
+    sa.Column('last_name', sa.String(), nullable=True),
+    sa.Column('hashed_password', sa.String(), nullable=False),
+    sa.Column('is_verified', sa.Boolean(), nullable=True),
+    sa.Column('pending_email', sa.String(), nullable=True),
+    sa.Column('pending_email_token', sa.String(), nullable=True),
+    sa.Column('role', sa.String(), nullable=False),
+    sa.Column('position', sa.String(), nullable=True),
+    sa.Column('created_by', postgresql.UUID(as_uuid=True), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.Column('last_seen', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_users_email', 'users', ['email'], unique=True)
+
+    op.create_table('favorites',
+    sa.Column('id', sa.String(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('listing_id', sa.String(), nullable=False),
+    sa.Column('user_id', sa.String(), nullable=True),
+    sa.Column('is_new', sa.Boolean(), nullable=False),
+    sa.Column('listing_snapshot', sa.Text(), nullable=True),
+    sa.ForeignKeyConstraint(['listing_id'], ['listings.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_favorites_id', 'favorites', ['id'], unique=True)
+
+    op.create_table('listing_history',
+    sa.Column('id', sa.String(), nullable=False),
+    sa.Column('listing_id', sa.String(), nullable=False),
+    sa.Column('company_id', sa.String(), nullable=False),
+    sa.Column('user_id', sa.String(), nullable=True),
+    sa.Column('action', sa.String(), nullable=False),
+    sa.Column('old_value', sa.String(), nullable=True),
+    sa.Column('new_value', sa.String(), nullable=True),
+    sa.Column('comment', sa.String(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['company_id'], ['users.id'], ),
+    sa.ForeignKeyConstraint(['listing_id'], ['listings.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_listing_history_created_at', 'listing_history', ['created_at'], unique=False)
+    op.create_index('ix_listing_history_listing_id', 'listing_history', ['listing_id'], unique=False)
+
+    op.create_table('listing_metadata',
+    sa.Column('id', sa.String(), nullable=False),
+    sa.Column('listing_id', sa.String(), nullable=False),
+    sa.Column('company_id', sa.String(), nullable=False),
+    sa.Column('responsible_user_id', sa.String(), nullable=True),
+    sa.Column('status', sa.String(), nullable=False),
+    sa.Column('updated_by', sa.String(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['company_id'], ['users.id'], ),
+    sa.ForeignKeyConstraint(['listing_id'], ['listings.id'], ),
+    sa.ForeignKeyConstraint(['responsible_user_id'], ['users.id'], ),
+    sa.ForeignKeyConstraint(['updated_by'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('idx_listing_company', 'listing_metadata', ['listing_id', 'company_id'], unique=False)
+    op.create_index('ix_listing_metadata_company_id', 'listing_metadata', ['company_id'], unique=False)
+    op.create_index('ix_listing_metadata_listing_id', 'listing_metadata', ['listing_id'], unique=False)
+
+    op.create_table('rent_listings',
+    sa.Column('id', sa.String(), nullable=False),
+    sa.Column('listing_id', sa.String(), nullable=False),
+    sa.Column('company_id', sa.String(), nullable=False),
+    sa.Column('tenant_first_name', sa.String(), nullable=False),
+    sa.Column('tenant_last_name', sa.String(), nullable=False),
+    sa.Column('tenant_phone', sa.String(), nullable=False),
+    sa.Column('rent_price', sa.Integer(), nullable=False),
+    sa.Column('rent_start_date', sa.Date(), nullable=False),
+    sa.Column('rent_end_date', sa.Date(), nullable=False),
+    sa.Column('responsible_user_id', sa.String(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['company_id'], ['users.id'], ),
+    sa.ForeignKeyConstraint(['listing_id'], ['listings.id'], ),
+    sa.ForeignKeyConstraint(['responsible_user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('idx_rent_listing_company', 'rent_listings', ['listing_id', 'company_id'], unique=False)
+    op.create_index('ix_rent_listings_company_id', 'rent_listings', ['company_id'], unique=False)
+    op.create_index('ix_rent_listings_listing_id', 'rent_listings', ['listing_id'], unique=False)
+
+
+
+def downgrade():
+    # Индексы удаляются вместе с таблицами
+    for table in ('rent_listings', 'listing_metadata', 'listing_history', 'favorites', 'users', 'listings'):
+        op.drop_table(table)
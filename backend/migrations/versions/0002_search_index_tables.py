@@ -0,0 +1,41 @@
+"""search index tables
+
+Обратный индекс слов адреса для поиска (listing_search_tokens) и словарь
+токенов (search_vocabulary), см. app/listings/search.py. Базы, поднятые до
+миграций через create_all, могли уже получить эти таблицы - они не пересоздаются.
+Индекс заполняется при старте приложения (ensure_search_index).
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19 13:49:34.208417
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    tables = sa.inspect(op.get_bind()).get_table_names()
+    if 'listing_search_tokens' not in tables:
+        op.create_table('listing_search_tokens',
+        sa.Column('word', sa.String(), nullable=False),
+        sa.Column('listing_id', sa.String(), nullable=False),
+        sa.Column('field', sa.String(), nullable=False),
+        sa.PrimaryKeyConstraint('word', 'listing_id', 'field')
+        )
+        op.create_index('ix_listing_search_tokens_listing_id', 'listing_search_tokens', ['listing_id'], unique=False)
+    if 'search_vocabulary' not in tables:
+        op.create_table('search_vocabulary',
+        sa.Column('word', sa.String(), nullable=False),
+        sa.PrimaryKeyConstraint('word')
+        )
+
+
+def downgrade():
+    op.drop_table('search_vocabulary')
+    op.drop_table('listing_search_tokens')
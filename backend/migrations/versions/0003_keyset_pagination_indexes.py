@@ -0,0 +1,38 @@
+"""keyset pagination indexes
+
+Индексы под страницы ORDER BY created_at DESC, id DESC (курсорная пагинация
+/listings, /favorites и /rent). Базы, поднятые до миграций через create_all,
+могли уже получить их вместе с новыми таблицами - такие индексы не пересоздаются.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19 13:49:30.512044
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+KEYSET_INDEXES = {
+    'idx_listings_created_at_id': ('listings', ['created_at', 'id']),
+    'idx_rent_company_created_at_id': ('rent_listings', ['company_id', 'created_at', 'id']),
+}
+
+
+def _existing_indexes(table: str) -> set:
+    return {index['name'] for index in sa.inspect(op.get_bind()).get_indexes(table)}
+
+
+def upgrade():
+    for name, (table, columns) in KEYSET_INDEXES.items():
+        if name not in _existing_indexes(table):
+            op.create_index(name, table, columns, unique=False)
+
+
+def downgrade():
+    for name, (table, _) in KEYSET_INDEXES.items():
+        op.drop_index(name, table_name=table)
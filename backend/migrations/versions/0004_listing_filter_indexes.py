@@ -0,0 +1,47 @@
+"""listing filter indexes
+
+Индексы под сочетания фильтров /listings, /favorites и /rent, которые реально
+приходят с фронтенда: deal_type (+ source / комнаты / диапазон цены или площади)
+со страницей ORDER BY created_at DESC, id DESC LIMIT n, и фильтры по метаданным
+компании. Проверка планов: python -m benchmarks.query_plans
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19 13:49:39.971714
+"""
+
+from alembic import op
+
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+LISTING_INDEXES = {
+    'idx_listings_deal_type_created_at': ['deal_type', 'created_at', 'id'],
+    'idx_listings_source_created_at': ['source', 'created_at', 'id'],
+    'idx_listings_deal_type_rooms': ['deal_type', 'rooms_count', 'created_at'],
+    'idx_listings_deal_type_price': ['deal_type', 'price'],
+    'idx_listings_deal_type_total_meters': ['deal_type', 'total_meters'],
+    'idx_listings_price': ['price'],
+    'idx_listings_total_meters': ['total_meters'],
+}
+
+METADATA_INDEXES = {
+    'idx_listing_metadata_company_status': ['company_id', 'status', 'listing_id'],
+    'idx_listing_metadata_company_responsible': ['company_id', 'responsible_user_id', 'listing_id'],
+}
+
+
+def upgrade():
+    for name, columns in LISTING_INDEXES.items():
+        op.create_index(name, 'listings', columns, unique=False)
+    for name, columns in METADATA_INDEXES.items():
+        op.create_index(name, 'listing_metadata', columns, unique=False)
+
+
+def downgrade():
+    for name in METADATA_INDEXES:
+        op.drop_index(name, table_name='listing_metadata')
+    for name in LISTING_INDEXES:
+        op.drop_index(name, table_name='listings')
@@ -0,0 +1,24 @@
+"""favorites user listing index
+
+Избранное пользователя выбирается подзапросом по (user_id, listing_id)
+вместо списка всех id в IN. Замер: python -m benchmarks.favorites_query_bench
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19 16:12:07.418530
+"""
+
+from alembic import op
+
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('idx_favorites_user_listing', 'favorites', ['user_id', 'listing_id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('idx_favorites_user_listing', table_name='favorites')
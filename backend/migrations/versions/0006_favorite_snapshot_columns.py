@@ -0,0 +1,108 @@
+"""favorite snapshot columns
+
+Избранное отдается из снимков, а не из listings: поля для фильтров и
+сортировки страницы избранного переносятся в колонки favorites, внешний ключ
+на listings снимается - объявления из избранного удаляются очисткой старых.
+Колонки и снимок заполняются из listings (если объявление еще есть), иначе
+колонки - из listing_snapshot. listing_created_at - ключ курсора страницы
+избранного, поэтому после заполнения он не NULL (без даты объявления - дата
+добавления в избранное).
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-19 17:40:52.106384
+"""
+
+import json
+from datetime import datetime
+
+import sqlalchemy as sa
+from alembic import op
+
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+# Имя для безымянного внешнего ключа SQLite (пересоздание таблицы в batch-режиме)
+NAMING_CONVENTION = {"fk": "fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s"}
+SNAPSHOT_COLUMNS = ('deal_type', 'price', 'total_meters', 'source', 'rooms_count', 'home_type')
+# Поля JSON снимка (см. favorite_snapshot_fields в app/favorites/service.py)
+SNAPSHOT_FIELDS = ('deal_type', 'price', 'total_meters', 'floor', 'location', 'source', 'url', 'phone_number',
+                   'rooms_count', 'home_type', 'images')
+
+
+def _listing_foreign_key():
+    for foreign_key in sa.inspect(op.get_bind()).get_foreign_keys('favorites'):
+        if foreign_key['referred_table'] == 'listings':
+            return foreign_key['name'] or 'fk_favorites_listing_id_listings'
+    return None
+
+
+def _backfill():
+    favorites = sa.table(
+        'favorites', sa.column('id', sa.String), sa.column('listing_id', sa.String),
+        sa.column('listing_snapshot', sa.Text), sa.column('listing_created_at', sa.DateTime),
+        sa.column('created_at', sa.DateTime),
+        *[sa.column(name) for name in SNAPSHOT_COLUMNS],
+    )
+    listings = sa.table(
+        'listings', sa.column('id', sa.String), sa.column('created_at', sa.DateTime),
+        *[sa.column(name) for name in SNAPSHOT_FIELDS],
+    )
+    connection = op.get_bind()
+    rows = connection.execute(
+        sa.select(favorites.c.id.label('favorite_id'), favorites.c.created_at.label('favorite_created_at'),
+                  favorites.c.listing_snapshot, listings)
+        .select_from(favorites.outerjoin(listings, listings.c.id == favorites.c.listing_id))
+    ).mappings().all()
+
+    for row in rows:
+        if row['created_at'] is not None:
+            # Объявление еще в listings - снимок по его текущим данным (формат как в favorite_snapshot_fields)
+            created_at = row['created_at']
+            data = {name: row[name] for name in SNAPSHOT_FIELDS}
+            data['created_at'] = created_at.isoformat()
+            snapshot = json.dumps(data, ensure_ascii=False)
+        elif row['listing_snapshot']:
+            # Объявления уже нет - колонки из JSON снимка
+            snapshot = row['listing_snapshot']
+            data = json.loads(snapshot)
+            created_at = datetime.fromisoformat(data['created_at']) if data.get('created_at') else None
+        else:
+            snapshot, data, created_at = None, {}, None
+        connection.execute(favorites.update().where(favorites.c.id == row['favorite_id']).values(
+            listing_snapshot=snapshot,
+            # listing_created_at - ключ курсора, без даты объявления берется дата добавления в избранное
+            listing_created_at=created_at or row['favorite_created_at'] or datetime.utcnow(),
+            **{name: data.get(name) for name in SNAPSHOT_COLUMNS},
+        ))
+
+
+def upgrade():
+    foreign_key = _listing_foreign_key()
+    with op.batch_alter_table('favorites', naming_convention=NAMING_CONVENTION) as batch_op:
+        batch_op.add_column(sa.Column('listing_created_at', sa.DateTime(), nullable=True))
+        batch_op.add_column(sa.Column('deal_type', sa.String(), nullable=True))
+        batch_op.add_column(sa.Column('price', sa.Float(), nullable=True))
+        batch_op.add_column(sa.Column('total_meters', sa.Float(), nullable=True))
+        batch_op.add_column(sa.Column('source', sa.String(), nullable=True))
+        batch_op.add_column(sa.Column('rooms_count', sa.Float(), nullable=True))
+        batch_op.add_column(sa.Column('home_type', sa.String(), nullable=True))
+        if foreign_key:
+            batch_op.drop_constraint(foreign_key, type_='foreignkey')
+        batch_op.create_index('idx_favorites_user_created_at', ['user_id', 'listing_created_at', 'listing_id'],
+                              unique=False)
+    _backfill()
+    with op.batch_alter_table('favorites', naming_convention=NAMING_CONVENTION) as batch_op:
+        batch_op.alter_column('listing_created_at', existing_type=sa.DateTime(), nullable=False)
+
+
+def downgrade():
+    # Избранное без объявления в listings нарушило бы внешний ключ
+    op.execute("DELETE FROM favorites WHERE listing_id NOT IN (SELECT id FROM listings)")
+    with op.batch_alter_table('favorites', naming_convention=NAMING_CONVENTION) as batch_op:
+        batch_op.drop_index('idx_favorites_user_created_at')
+        batch_op.create_foreign_key('fk_favorites_listing_id_listings', 'listings', ['listing_id'], ['id'])
+        for name in ('home_type', 'rooms_count', 'source', 'total_meters', 'price', 'deal_type', 'listing_created_at'):
+            batch_op.drop_column(name)
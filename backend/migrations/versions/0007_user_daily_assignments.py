@@ -0,0 +1,63 @@
+"""user daily assignments
+
+Статистика сотрудников считается по назначениям, сохраненным по дням в
+user_daily_assignments (одна строка на сотрудника, день и объявление), вместо
+сканирования listing_history на каждый запрос (см. app/users/stats_service.py).
+Таблица заполняется из истории назначений.
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-19 19:05:31.274816
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+revision = '0007'
+down_revision = '0006'
+branch_labels = None
+depends_on = None
+
+
+def _backfill():
+    history = sa.table(
+        'listing_history', sa.column('listing_id', sa.String), sa.column('company_id', sa.String),
+        sa.column('action', sa.String), sa.column('new_value', sa.String), sa.column('created_at', sa.DateTime),
+    )
+    connection = op.get_bind()
+    # Как в record_assignments: одно объявление у сотрудника - одна строка за день
+    rows = {
+        (user_id, created_at.date(), listing_id): company_id
+        for listing_id, company_id, user_id, created_at in connection.execute(
+            sa.select(history.c.listing_id, history.c.company_id, history.c.new_value, history.c.created_at)
+            .where(history.c.action == 'assigned', history.c.new_value.isnot(None), history.c.created_at.isnot(None))
+        )
+        if user_id
+    }
+    if rows:
+        op.bulk_insert(sa.table(
+            'user_daily_assignments', sa.column('user_id', sa.String), sa.column('day', sa.Date),
+            sa.column('listing_id', sa.String), sa.column('company_id', sa.String),
+        ), [
+            {'user_id': user_id, 'day': day, 'listing_id': listing_id, 'company_id': company_id}
+            for (user_id, day, listing_id), company_id in rows.items()
+        ])
+
+
+def upgrade():
+    op.create_table(
+        'user_daily_assignments',
+        sa.Column('user_id', sa.String(), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('listing_id', sa.String(), nullable=False),
+        sa.Column('company_id', sa.String(), nullable=False),
+        sa.PrimaryKeyConstraint('user_id', 'day', 'listing_id'),
+    )
+    op.create_index('idx_user_daily_assignments_listing', 'user_daily_assignments', ['listing_id', 'company_id'],
+                    unique=False)
+    _backfill()
+
+
+def downgrade():
+    op.drop_index('idx_user_daily_assignments_listing', table_name='user_daily_assignments')
+    op.drop_table('user_daily_assignments')
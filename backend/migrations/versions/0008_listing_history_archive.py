@@ -0,0 +1,61 @@
+"""listing history indexes and archive
+
+Составной индекс (action, new_value, created_at, listing_id) для выборок
+назначений сотрудника за период - listing_id в конце, чтобы статистика читала
+только индекс, - и (listing_id, action) для истории объявления вместо
+одиночного индекса по listing_id. Таблица listing_history_archive - архив
+истории, в который записи переносятся помесячно (см. app/listings/history.py).
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-19 19:48:12.630594
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+revision = '0008'
+down_revision = '0007'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('idx_listing_history_action_value_created', 'listing_history',
+                    ['action', 'new_value', 'created_at', 'listing_id'], unique=False)
+    op.create_index('idx_listing_history_listing_action', 'listing_history', ['listing_id', 'action'], unique=False)
+    op.drop_index('ix_listing_history_listing_id', table_name='listing_history')
+
+    op.create_table(
+        'listing_history_archive',
+        sa.Column('id', sa.String(), nullable=False),
+        sa.Column('listing_id', sa.String(), nullable=False),
+        sa.Column('company_id', sa.String(), nullable=False),
+        sa.Column('user_id', sa.String(), nullable=True),
+        sa.Column('action', sa.String(), nullable=False),
+        sa.Column('old_value', sa.String(), nullable=True),
+        sa.Column('new_value', sa.String(), nullable=True),
+        sa.Column('comment', sa.String(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('idx_listing_history_archive_action_value_created', 'listing_history_archive',
+                    ['action', 'new_value', 'created_at', 'listing_id'], unique=False)
+    op.create_index('idx_listing_history_archive_listing_action', 'listing_history_archive',
+                    ['listing_id', 'action'], unique=False)
+
+
+def downgrade():
+    # Архивные записи возвращаются в рабочую таблицу (кроме записей удаленных объявлений)
+    op.execute(
+        "INSERT INTO listing_history (id, listing_id, company_id, user_id, action, old_value, new_value, comment, "
+        "created_at) SELECT id, listing_id, company_id, user_id, action, old_value, new_value, comment, created_at "
+        "FROM listing_history_archive WHERE listing_id IN (SELECT id FROM listings)"
+    )
+    op.drop_index('idx_listing_history_archive_listing_action', table_name='listing_history_archive')
+    op.drop_index('idx_listing_history_archive_action_value_created', table_name='listing_history_archive')
+    op.drop_table('listing_history_archive')
+
+    op.create_index('ix_listing_history_listing_id', 'listing_history', ['listing_id'], unique=False)
+    op.drop_index('idx_listing_history_listing_action', table_name='listing_history')
+    op.drop_index('idx_listing_history_action_value_created', table_name='listing_history')
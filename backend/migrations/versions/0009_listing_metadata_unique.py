@@ -0,0 +1,56 @@
+"""listing metadata unique listing company
+
+Метаданные объявления компании обновляются пачкой через INSERT ... ON CONFLICT
+(см. update_metadata_bulk), для этого (listing_id, company_id) уникальны.
+Дубли, если они успели появиться, удаляются: остается последняя обновленная запись.
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-19 20:21:44.905127
+"""
+
+from datetime import datetime
+
+import sqlalchemy as sa
+from alembic import op
+
+revision = '0009'
+down_revision = '0008'
+branch_labels = None
+depends_on = None
+
+
+def _delete_duplicates():
+    metadata = sa.table(
+        'listing_metadata', sa.column('id', sa.String), sa.column('listing_id', sa.String),
+        sa.column('company_id', sa.String), sa.column('updated_at', sa.DateTime),
+    )
+    connection = op.get_bind()
+    duplicated = sa.select(metadata.c.listing_id, metadata.c.company_id).group_by(
+        metadata.c.listing_id, metadata.c.company_id
+    ).having(sa.func.count() > 1).subquery()
+    rows = connection.execute(
+        sa.select(metadata.c.id, metadata.c.listing_id, metadata.c.company_id, metadata.c.updated_at)
+        .join(duplicated, (metadata.c.listing_id == duplicated.c.listing_id) &
+              (metadata.c.company_id == duplicated.c.company_id))
+    ).all()
+
+    latest = {}
+    for row in sorted(rows, key=lambda row: (row.updated_at or datetime.min, row.id)):
+        latest[(row.listing_id, row.company_id)] = row.id
+    keep = set(latest.values())
+    stale_ids = [row.id for row in rows if row.id not in keep]
+    for start in range(0, len(stale_ids), 500):
+        connection.execute(metadata.delete().where(metadata.c.id.in_(stale_ids[start:start + 500])))
+
+
+def upgrade():
+    _delete_duplicates()
+    op.drop_index('idx_listing_company', table_name='listing_metadata')
+    op.create_index('uq_listing_metadata_listing_company', 'listing_metadata', ['listing_id', 'company_id'],
+                    unique=True)
+
+
+def downgrade():
+    op.drop_index('uq_listing_metadata_listing_company', table_name='listing_metadata')
+    op.create_index('idx_listing_company', 'listing_metadata', ['listing_id', 'company_id'], unique=False)
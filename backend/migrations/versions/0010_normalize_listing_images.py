@@ -0,0 +1,74 @@
+"""normalize listing images
+
+Ответы /listings и /favorites вставляют колонку images в JSON без разбора
+(app/listings/responses.py), а build_listing проверяет ее только при
+сохранении новых объявлений. Уже сохраненные значения приводятся к тому же
+виду: JSON-массив непустых строк или NULL - в listings и в снимках избранного.
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-19 23:12:37.418205
+"""
+
+import json
+
+import sqlalchemy as sa
+from alembic import op
+
+revision = '0010'
+down_revision = '0009'
+branch_labels = None
+depends_on = None
+
+
+def _normalize(images):
+    # Как normalize_images в app/parsers/manager.py
+    if isinstance(images, str):
+        try:
+            images = json.loads(images)
+        except ValueError:
+            return None
+    if not isinstance(images, list):
+        return None
+    urls = [url for url in images if isinstance(url, str) and url]
+    return json.dumps(urls) if urls else None
+
+
+def _normalize_listings(connection):
+    listings = sa.table('listings', sa.column('id', sa.String), sa.column('images', sa.Text))
+    for listing_id, images in connection.execute(
+        sa.select(listings.c.id, listings.c.images).where(listings.c.images.isnot(None))
+    ).all():
+        normalized = _normalize(images)
+        if normalized != images:
+            connection.execute(listings.update().where(listings.c.id == listing_id).values(images=normalized))
+
+
+def _normalize_snapshots(connection):
+    favorites = sa.table('favorites', sa.column('id', sa.String), sa.column('listing_snapshot', sa.Text))
+    for favorite_id, snapshot in connection.execute(
+        sa.select(favorites.c.id, favorites.c.listing_snapshot).where(favorites.c.listing_snapshot.isnot(None))
+    ).all():
+        try:
+            data = json.loads(snapshot)
+        except ValueError:
+            continue
+        if not isinstance(data, dict):
+            continue
+        normalized = _normalize(data.get('images'))
+        if normalized != data.get('images'):
+            data['images'] = normalized
+            connection.execute(favorites.update().where(favorites.c.id == favorite_id).values(
+                listing_snapshot=json.dumps(data, ensure_ascii=False)
+            ))
+
+
+def upgrade():
+    connection = op.get_bind()
+    _normalize_listings(connection)
+    _normalize_snapshots(connection)
+
+
+def downgrade():
+    # Исходные значения не сохраняются, нормализованные подходят и старому коду
+    pass
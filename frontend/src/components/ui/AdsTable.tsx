@@ -33,6 +33,7 @@ import { ICONS } from "@/config/constants";
 import { useFavoritesWebSocket } from "@/shared/hooks/useFavoritesWebSocket";
 import { useUpdateListingMetadata } from "@/shared/hooks/useListingMetadata";
 import { useDownloadPhotos } from "@/shared/hooks/useDownloadPhotos";
+import { useListingPhoto } from "@/shared/hooks/useListingPhoto";
 import { useRemoveFromRent } from "@/shared/hooks/useRent";
 import { useDeleteListing } from "@/shared/hooks/useDeleteListing";
 import { useAuthStore } from "@/store/authStore";
@@ -64,6 +65,16 @@ const sourceColorMap = {
   avito: "success",
 } as const;
 
+function ListingThumbnail({ listingId }: { listingId: string }) {
+  const src = useListingPhoto(listingId, 1);
+
+  return src ? (
+    <img src={src} alt="" className="w-12 h-12 rounded-small object-cover" />
+  ) : (
+    <div className="w-12 h-12 rounded-small bg-default-100" />
+  );
+}
+
 export function AdsTable({
   ads,
   isLoading = false,
@@ -242,9 +253,12 @@ export function AdsTable({
         );
       case "object":
         return (
-          <div className="flex flex-col">
-            <p className="text-bold text-small">{getObjectInfo(ad)}</p>
-            <p className="text-bold text-tiny text-default-400">{ad.area} м²</p>
+          <div className="flex items-center gap-2">
+            {ad.photoCount ? <ListingThumbnail listingId={ad.id.toString()} /> : null}
+            <div className="flex flex-col">
+              <p className="text-bold text-small">{getObjectInfo(ad)}</p>
+              <p className="text-bold text-tiny text-default-400">{ad.area > 0 ? `${ad.area} м²` : "—"}</p>
+            </div>
           </div>
         );
       case "address":
@@ -14,6 +14,7 @@ export interface Ad {
   isFavorite: boolean;
   url?: string;
   phone_number?: string;
+  photoCount?: number;
   isNew?: boolean;
   is_in_rent?: boolean;
 }
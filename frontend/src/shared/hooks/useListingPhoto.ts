@@ -0,0 +1,27 @@
+import { useEffect, useState } from 'react';
+import { useQuery } from '@tanstack/react-query';
+import { listingApi } from '../services/listingService';
+
+// <img> can't send the auth header, so the photo is loaded through apiClient and shown via an object URL
+export const useListingPhoto = (listingId: string, index: number, enabled = true) => {
+  const { data: blob } = useQuery({
+    queryKey: ['listing-photo', listingId, index],
+    queryFn: () => listingApi.getPhoto(listingId, index),
+    enabled: enabled && !!listingId,
+    staleTime: Infinity,
+    retry: false,
+  });
+  const [url, setUrl] = useState<string>();
+
+  useEffect(() => {
+    if (!blob) {
+      setUrl(undefined);
+      return;
+    }
+    const objectUrl = URL.createObjectURL(blob);
+    setUrl(objectUrl);
+    return () => URL.revokeObjectURL(objectUrl);
+  }, [blob]);
+
+  return url;
+};
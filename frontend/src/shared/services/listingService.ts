@@ -17,6 +17,7 @@ export interface Listing {
   phone_number: string;
   rooms_count: number | null;
   is_favorite: boolean;
+  images?: string[] | null;
   responsible?: string | null;
   status?: string;
 }
@@ -153,6 +154,14 @@ export const listingApi = {
     });
     return response.data;
   },
+
+  // Photo of a listing served from the backend image cache (index starts at 1)
+  getPhoto: async (listingId: string, index: number): Promise<Blob> => {
+    const response = await apiClient.get(`/listings/${listingId}/images/${index}`, {
+      responseType: 'blob',
+    });
+    return response.data;
+  },
 };
 
 // Transform Listing to Ad
@@ -172,6 +181,7 @@ export const transformListingToAd = (listing: Listing, isNew = false, isFavorite
     isFavorite: isFavorite !== undefined ? isFavorite : listing.is_favorite,
     phone_number: listing.phone_number,
     url: listing.url,
+    photoCount: listing.images?.length || 0,
     isNew,
   };
 };